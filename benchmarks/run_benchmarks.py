@@ -0,0 +1,273 @@
+"""
+    Benchmarks of the pipeline stages with synthetic data. Each stage is timed (wall-clock time of several repetitions)
+    and memory-profiled (peak of the memory allocated by Python and numpy, measured with tracemalloc in an extra run).
+
+    Results are saved as JSON with the commit of the repository, so results of different commits can be compared with
+    --compare_path. Stages whose dependencies are not installed (e.g., TensorFlow or dtw-python) are reported as
+    skipped, and stages that raise an error as failed.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['run_benchmarks']
+
+import argparse
+import datetime
+import json
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+REPOSITORY_PATH = pathlib.Path(__file__).resolve().parents[1]
+# The modules of each experiment are imported relative to their folders
+for path in [REPOSITORY_PATH, REPOSITORY_PATH.joinpath('vowel_discrimination'),
+             REPOSITORY_PATH.joinpath('ids_preference'),
+             REPOSITORY_PATH.joinpath('ids_preference', 'pc_attentional_score_calculation')]:
+    if str(path) not in sys.path:
+        sys.path.append(str(path))
+
+import numpy as np  # noqa: E402
+
+from benchmarks.synthetic_data import create_synthetic_wavs, create_synthetic_corpus_info, \
+    create_synthetic_features, create_synthetic_h5py_file  # noqa: E402
+
+SIZES = {
+    'small': {'n_wavs': 20, 'n_speakers': 6, 'trials_per_speaker': 40, 'n_features': 39, 'latents_dim': 64,
+              'dtw_speakers': 4, 'dtw_trials_per_speaker': 12, 'n_distances': 10000, 'cpc_samples': 4},
+    'medium': {'n_wavs': 200, 'n_speakers': 20, 'trials_per_speaker': 150, 'n_features': 39, 'latents_dim': 512,
+               'dtw_speakers': 8, 'dtw_trials_per_speaker': 30, 'n_distances': 200000, 'cpc_samples': 16},
+    'large': {'n_wavs': 2000, 'n_speakers': 40, 'trials_per_speaker': 600, 'n_features': 39, 'latents_dim': 512,
+              'dtw_speakers': 16, 'dtw_trials_per_speaker': 60, 'n_distances': 2000000, 'cpc_samples': 64}
+}
+CONTRASTS = {'hc': [('i', 'I'), ('E', '{'), ('u', 'U')], 'oc': [('a', 'a:'), ('E', 'e'), ('i', 'I')],
+             'ivc': [('i', 'I'), ('u', 'y')]}
+CONTRASTS_LANGUAGES = {'hc': [('en', 'en')] * 3, 'oc': [('de', 'de')] * 3, 'ivc': [('en', 'en'), ('fr', 'fr')]}
+
+
+def _get_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPOSITORY_PATH,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _measure(stage: Callable[[], object], repeats: int) -> dict:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        stage()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'status': 'ok', 'times': times, 'min': min(times), 'median': statistics.median(times),
+            'peak_memory_mb': peak / 2 ** 20}
+
+
+def _setup_extract_acoustic_features(size: dict, folder: pathlib.Path) -> Callable[[], object]:
+    from metaeval_core.extract_acoustic_features import extract_acoustic_features
+    wavs = create_synthetic_wavs(folder.joinpath('wavs'), size['n_wavs'])
+    return lambda: extract_acoustic_features(wavs, cmvn=True)
+
+
+def _setup_create_h5py_file(size: dict, folder: pathlib.Path) -> Callable[[], object]:
+    from metaeval_core.extract_acoustic_features import create_h5py_file
+    _, file_mapping, frames = create_synthetic_corpus_info('oc', size['n_speakers'], size['trials_per_speaker'])
+    features = create_synthetic_features(frames, size['n_features'])
+    # create_h5py_file inserts the reset frames in the list given
+    return lambda: create_h5py_file(folder.joinpath('features.h5'), file_mapping, list(features), 200, 100, True)
+
+
+def _setup_trial_segmentation(size: dict, folder: pathlib.Path) -> Callable[[], object]:
+    from metaeval_core.h5_io import read_input_features, get_trials_list
+    _, file_mapping, frames = create_synthetic_corpus_info('oc', size['n_speakers'], size['trials_per_speaker'])
+    create_synthetic_h5py_file(folder.joinpath('segmentation.h5'), file_mapping, frames, size['n_features'])
+    data, _, indices = read_input_features(folder.joinpath('segmentation.h5'))
+    return lambda: get_trials_list(data, indices)
+
+
+def _setup_generate_tests_conditions(corpus: str) -> Callable[[dict, pathlib.Path], Callable[[], object]]:
+    def setup(size: dict, folder: pathlib.Path) -> Callable[[], object]:
+        from evaluation_protocol.tests_setup.create_tests_conditions import generate_tests_conditions
+        corpus_info, file_mapping, _ = create_synthetic_corpus_info(corpus, size['n_speakers'],
+                                                                    size['trials_per_speaker'])
+        return lambda: generate_tests_conditions(corpus_info, file_mapping, CONTRASTS[corpus], {}, corpus,
+                                                 CONTRASTS_LANGUAGES[corpus])
+    return setup
+
+
+def _setup_calculate_dtw_distances(size: dict, folder: pathlib.Path) -> Callable[[], object]:
+    from evaluation_protocol.io_module.read_predictions_and_features import get_predictions_and_time_stamps
+    from evaluation_protocol.tests_setup.calculate_dtw_distances import calculate_dtw_distances
+    from metaeval_core.h5_io import read_input_features
+    corpus_info, file_mapping, frames = create_synthetic_corpus_info('oc', size['dtw_speakers'],
+                                                                     size['dtw_trials_per_speaker'])
+    latents_path = folder.joinpath('latents.h5')
+    create_synthetic_h5py_file(latents_path, file_mapping, frames, size['n_features'], size['latents_dim'])
+    _, _, indices = read_input_features(latents_path)
+    predictions_list, time_stamps_list = get_predictions_and_time_stamps(latents_path, indices)
+    return lambda: calculate_dtw_distances(corpus_info, file_mapping, predictions_list, time_stamps_list,
+                                           CONTRASTS['oc'], {}, 'oc', CONTRASTS_LANGUAGES['oc'],
+                                           vowels_segments=True)
+
+
+def _get_random_distances(size: dict) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    rng = np.random.default_rng(0)
+    n_contrasts = len(CONTRASTS['oc'])
+    same = [rng.gamma(2.0, 0.1, size['n_distances'] // (2 * n_contrasts)) for _ in range(n_contrasts)]
+    different = [rng.gamma(2.2, 0.1, size['n_distances'] // (2 * n_contrasts)) for _ in range(n_contrasts)]
+    return same, different
+
+
+def _setup_get_meta_analysis_statistics(size: dict, folder: pathlib.Path) -> Callable[[], object]:
+    from evaluation_protocol.tests_setup.calculate_meta_analysis_statistics import get_meta_analysis_statistics
+    same, different = _get_random_distances(size)
+    return lambda: get_meta_analysis_statistics(same, different)
+
+
+def _setup_infonce_per_frame(size: dict, folder: pathlib.Path) -> Callable[[], object]:
+    import tensorflow as tf
+    from calculate_pc_attentional_score import _get_infonce_per_frame
+    rng = np.random.default_rng(0)
+    true_latents = tf.constant(rng.standard_normal((size['cpc_samples'], 200, 256)), dtype=tf.float32)
+    pred_latents = tf.constant(rng.standard_normal((size['cpc_samples'], 200, 256, 12)), dtype=tf.float32)
+    return lambda: _get_infonce_per_frame(true_latents, pred_latents, 10, 12)
+
+
+def _get_oc_pairs(same: List[np.ndarray], different: List[np.ndarray], n_trials: int) -> \
+        Tuple[List[np.ndarray], List[np.ndarray]]:
+    rng = np.random.default_rng(0)
+    return ([rng.integers(0, n_trials, (len(distances), 2)) for distances in same],
+            [rng.integers(0, n_trials, (len(distances), 2)) for distances in different])
+
+
+def _setup_distances_file(suffix: str, read: bool) -> Callable[[dict, pathlib.Path], Callable[[], object]]:
+    def setup(size: dict, folder: pathlib.Path) -> Callable[[], object]:
+        from evaluation_protocol.io_module.preprocess_distances_files import write_distances_file, \
+            read_distances_file
+        _, file_mapping, _ = create_synthetic_corpus_info('oc', size['n_speakers'], size['trials_per_speaker'])
+        same, different = _get_random_distances(size)
+        same_pairs, different_pairs = _get_oc_pairs(same, different, len(file_mapping))
+        path = folder.joinpath(f'distances{suffix}')
+        arguments = (path, same_pairs, different_pairs, same, different, CONTRASTS['oc'], CONTRASTS_LANGUAGES['oc'],
+                     file_mapping)
+        if not read:
+            return lambda: write_distances_file(*arguments)
+        write_distances_file(*arguments)
+        return lambda: read_distances_file(path)
+    return setup
+
+
+def _setup_attentional_scores_csv(read: bool) -> Callable[[dict, pathlib.Path], Callable[[], object]]:
+    def setup(size: dict, folder: pathlib.Path) -> Callable[[], object]:
+        from pc_attentional_score_calculation.io_module.preprocess_score_files import \
+            create_csv_attentional_scores, read_csv_attentional_scores
+        _, file_mapping, frames = create_synthetic_corpus_info('ivc', size['n_speakers'], size['trials_per_speaker'])
+        file_mapping = [f'trials/{["IDS", "ADS"][idx % 2]}/{pathlib.Path(path).name}'
+                        for idx, path in enumerate(file_mapping)]
+        features_path = folder.joinpath('ids_features.h5')
+        create_synthetic_h5py_file(features_path, file_mapping, frames, size['n_features'])
+        scores = [np.random.default_rng(idx).random(n_frames) for idx, n_frames in enumerate(frames)]
+        csv_path = folder.joinpath('attentional_scores.csv')
+        if not read:
+            return lambda: create_csv_attentional_scores(scores, features_path, csv_path)
+        create_csv_attentional_scores(scores, features_path, csv_path)
+        return lambda: read_csv_attentional_scores(csv_path)
+    return setup
+
+
+STAGES = {
+    'extract_acoustic_features': _setup_extract_acoustic_features,
+    'create_h5py_file': _setup_create_h5py_file,
+    'trial_segmentation': _setup_trial_segmentation,
+    'generate_tests_conditions_hc': _setup_generate_tests_conditions('hc'),
+    'generate_tests_conditions_oc': _setup_generate_tests_conditions('oc'),
+    'generate_tests_conditions_ivc': _setup_generate_tests_conditions('ivc'),
+    'calculate_dtw_distances': _setup_calculate_dtw_distances,
+    'get_meta_analysis_statistics': _setup_get_meta_analysis_statistics,
+    'infonce_per_frame': _setup_infonce_per_frame,
+    'write_distances_csv': _setup_distances_file('.csv', False),
+    'read_distances_csv': _setup_distances_file('.csv', True),
+    'write_distances_npz': _setup_distances_file('.npz', False),
+    'read_distances_npz': _setup_distances_file('.npz', True),
+    'write_attentional_scores_csv': _setup_attentional_scores_csv(False),
+    'read_attentional_scores_csv': _setup_attentional_scores_csv(True)
+}
+
+
+def run_benchmarks(size_name: str, repeats: int, stages: Optional[List[str]] = None) -> dict:
+    size = SIZES[size_name]
+    results = {}
+    for stage_name in stages if stages else STAGES.keys():
+        print(f'Benchmarking {stage_name}')
+        with tempfile.TemporaryDirectory() as folder:
+            try:
+                stage = STAGES[stage_name](size, pathlib.Path(folder))
+                results[stage_name] = _measure(stage, repeats)
+            except ImportError as error:
+                results[stage_name] = {'status': 'skipped', 'reason': str(error)}
+            except Exception as error:  # The remaining stages are still benchmarked
+                results[stage_name] = {'status': 'failed', 'reason': f'{type(error).__name__}: {error}'}
+
+    return {'commit': _get_commit(), 'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'size': size_name, 'parameters': size, 'repeats': repeats, 'results': results}
+
+
+def _compare_results(current: dict, previous: dict) -> Dict[str, Dict[str, float]]:
+    # Ratios current/previous of the median time and peak memory (> 1 means slower or more memory)
+    comparison = {}
+    for stage_name, result in current['results'].items():
+        previous_result = previous['results'].get(stage_name, {})
+        if result['status'] == 'ok' and previous_result.get('status') == 'ok':
+            comparison[stage_name] = {
+                'time_ratio': result['median'] / previous_result['median'],
+                'memory_ratio': result['peak_memory_mb'] / max(previous_result['peak_memory_mb'], 1e-12)}
+    return comparison
+
+
+def _save_results(results: dict, output_path: Union[str, pathlib.Path]) -> None:
+    pathlib.Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as results_file:
+        json.dump(results, results_file, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to benchmark (time and peak memory) the stages of the '
+                                                 'pipelines with synthetic data. '
+                                                 '\nUsage: python benchmarks/run_benchmarks.py '
+                                                 '[--size small|medium|large] [--repeats number_of_repetitions] '
+                                                 '[--stages stage1 stage2 ...] [--output_path path_json_file] '
+                                                 '[--compare_path path_previous_json_file]')
+
+    parser.add_argument('--size', type=str, choices=list(SIZES.keys()), default='small')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--stages', type=str, nargs='+', choices=list(STAGES.keys()))
+    parser.add_argument('--output_path', type=str)
+    parser.add_argument('--compare_path', type=str)
+
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmarks(args.size, args.repeats, args.stages)
+    if args.compare_path:
+        with open(args.compare_path, 'r') as previous_file:
+            benchmark_results['comparison'] = _compare_results(benchmark_results, json.load(previous_file))
+        for name, ratios in benchmark_results['comparison'].items():
+            print(f'{name}: time x{ratios["time_ratio"]:.2f}, memory x{ratios["memory_ratio"]:.2f}')
+
+    output_path = args.output_path
+    if output_path is None:
+        commit = benchmark_results['commit'][:8] if benchmark_results['commit'] else 'nocommit'
+        output_path = REPOSITORY_PATH.joinpath('benchmarks', 'results', f'{args.size}_{commit}.json')
+    _save_results(benchmark_results, output_path)
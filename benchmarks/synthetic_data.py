@@ -0,0 +1,131 @@
+"""
+    Synthetic data for the benchmarks: wav files, corpus info dictionaries with the schemas of the Hillenbrand's (hc),
+    OLLO (oc) and isolated vowels (ivc) corpora, and h5py files with random input features and latents.
+
+    All the data is generated offline from a seed.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['create_synthetic_wavs', 'create_synthetic_corpus_info', 'create_synthetic_features',
+           'create_synthetic_h5py_file']
+
+import pathlib
+import wave
+from typing import Union, List, Optional, Tuple
+
+import h5py
+import numpy as np
+
+from metaeval_core.extract_acoustic_features import create_h5py_file
+
+HC_VOWELS = {'iy': 'i', 'ih': 'I', 'eh': 'E', 'ae': '{', 'ah': 'A', 'aw': 'O', 'oo': 'U', 'uw': 'u', 'uh': 'V',
+             'er': 'Er', 'ei': 'e', 'oa': 'o'}
+OC_VOWELS = ['a', 'a:', 'E', 'e', 'I', 'i', 'O', 'o', 'U', 'u']
+OC_CONSONANTS = ['b', 'd', 'f', 'g', 'k', 'p', 'S', 's', 't']
+IVC_VOWELS = {
+    'en': ['A', 'i', 'I', 'E', 'u', '{'],
+    'nl': ['I', 'i', 'E', 'u'],
+    'de': ['2:', 'I', 'E', 'a:', 'a', '6', 'u:', 'y:'],
+    'fr': ['u', 'y', 'a', 'a~', 'i'],
+    'jp': ['a', 'u', 'i', 'a:']
+}
+
+
+def create_synthetic_wavs(output_folder: Union[str, pathlib.Path], n_files: int,
+                          duration_range: Optional[Tuple[float, float]] = (0.3, 1.0),
+                          sampling_freq: Optional[int] = 16000, seed: Optional[int] = 0) -> List[pathlib.Path]:
+    # 16-bit PCM files with a few harmonics plus noise
+    rng = np.random.default_rng(seed)
+    output_folder = pathlib.Path(output_folder)
+    output_folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for idx in range(n_files):
+        n_samples = int(rng.uniform(*duration_range) * sampling_freq)
+        time = np.arange(n_samples) / sampling_freq
+        f0 = rng.uniform(100, 250)
+        signal = sum(np.sin(2 * np.pi * f0 * harmonic * time) / harmonic for harmonic in range(1, 6))
+        signal = 0.3 * signal / np.max(np.abs(signal)) + 0.01 * rng.standard_normal(n_samples)
+        path = output_folder.joinpath(f'synthetic_{idx:05d}.wav')
+        with wave.open(str(path), 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sampling_freq)
+            wav_file.writeframes((np.clip(signal, -1, 1) * 32767).astype('<i2').tobytes())
+        paths.append(path)
+    return paths
+
+
+def _get_vowel_timestamps(rng: np.random.Generator, n_frames: int, window_shift: int) -> Tuple[float, float]:
+    duration = n_frames * window_shift
+    onset = float(rng.uniform(0.2, 0.4) * duration)
+    offset = float(rng.uniform(0.6, 0.8) * duration)
+    return onset, offset
+
+
+def create_synthetic_corpus_info(corpus: str, n_speakers: int, trials_per_speaker: int,
+                                 frames_range: Optional[Tuple[int, int]] = (30, 100),
+                                 window_shift: Optional[int] = 10,
+                                 seed: Optional[int] = 0) -> Tuple[dict, List[str], List[int]]:
+    # Returns the corpus info dictionary, the file mapping (one wav path per trial) and the frames of each trial
+    assert corpus in ['hc', 'oc', 'ivc']
+    rng = np.random.default_rng(seed)
+    corpus_info = {}
+    file_mapping = []
+    frames = []
+
+    for speaker_idx in range(n_speakers):
+        for trial_idx in range(trials_per_speaker):
+            n_frames = int(rng.integers(*frames_range))
+            if corpus == 'hc':
+                speaker = f'{"mw"[speaker_idx % 2]}{speaker_idx:02d}'
+                code = list(HC_VOWELS.keys())[trial_idx % len(HC_VOWELS)]
+                # several repetitions of the same vowel are distinguished by a suffix before the vowel code
+                name = f'{speaker}{trial_idx // len(HC_VOWELS):02d}{code}'
+                entry = {'vowel': HC_VOWELS[code], 'speaker': speaker,
+                         'details': {'perceived': [(HC_VOWELS[code], 20)], 'failed_listeners_test': False,
+                                     'language': 'en'}}
+            elif corpus == 'oc':
+                speaker = f'S{speaker_idx + 1:02d}{"FM"[speaker_idx % 2]}'
+                vowel = OC_VOWELS[trial_idx % len(OC_VOWELS)]
+                consonant = OC_CONSONANTS[(trial_idx // len(OC_VOWELS)) % len(OC_CONSONANTS)]
+                logatome = f'L{(trial_idx % 150) + 1:03d}'
+                name = f'{speaker}_{logatome}_V{trial_idx % 6 + 1}_N{trial_idx // 150 + 1}'
+                entry = {'vowel': vowel, 'speaker': speaker,
+                         'details': {'phones': [consonant, vowel, consonant], 'language': 'de',
+                                     'logatome': logatome}}
+            else:  # ivc
+                language = list(IVC_VOWELS.keys())[speaker_idx % len(IVC_VOWELS)]
+                speaker = f'{language}{speaker_idx:02d}'
+                vowel = IVC_VOWELS[language][trial_idx % len(IVC_VOWELS[language])]
+                name = f'{speaker}_{trial_idx:04d}'
+                entry = {'vowel': vowel, 'speaker': speaker, 'details': {'language': language}}
+
+            if corpus != 'ivc':
+                entry['vowel_onset'], entry['vowel_offset'] = _get_vowel_timestamps(rng, n_frames, window_shift)
+            corpus_info[name] = entry
+            file_mapping.append(f'{corpus}/{name}.wav')
+            frames.append(n_frames)
+
+    return corpus_info, file_mapping, frames
+
+
+def create_synthetic_features(frames: List[int], n_features: int, seed: Optional[int] = 0) -> List[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return [rng.standard_normal((n_frames, n_features)) for n_frames in frames]
+
+
+def create_synthetic_h5py_file(output_path: Union[str, pathlib.Path], file_mapping: List[str], frames: List[int],
+                               n_features: int, latents_dim: Optional[int] = None, sample_length: Optional[int] = 200,
+                               reset_dur: Optional[int] = 100, seed: Optional[int] = 0) -> None:
+    # Input features file (data, file_list, indices) with the layout created by create_h5py_file. If latents_dim is
+    # given, a `latents` dataset with the same samples layout is added as the predictions file of a model.
+    pathlib.Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    features = create_synthetic_features(frames, n_features, seed)
+    create_h5py_file(output_path, file_mapping, features, sample_length, reset_dur, True)
+    if latents_dim:
+        with h5py.File(output_path, 'a') as h5_file:
+            samples = h5_file['data'].shape[0]
+            latents = np.random.default_rng(seed + 1).standard_normal((samples, sample_length, latents_dim))
+            h5_file.create_dataset('latents', data=latents.astype(np.float32))
@@ -0,0 +1,131 @@
+"""
+    This script calculates the IDS preference effect sizes of a model from the attentional preference scores per frame,
+    as r_scripts/ids_preference/obtain_effect_sizes.R and obtain_dev_trajectories.R, for all the checkpoints at once.
+
+    The score of each trial is the mean of its frames (segment reductions over the scores of all the trials
+    concatenated). For each checkpoint, d = (mean IDS - mean ADS) / sqrt((sd IDS^2 + sd ADS^2) / 2), its variance
+    (n1 + n2) / (n1 n2) + d^2 / (2 (n1 + n2)), the 95% confidence interval and Welch's t-test are computed with
+    metaeval_core.effect_sizes. The scores are the trials_loss arrays in memory or the score files of the checkpoints
+    (`<results_folder>/<step>/ids/attentional_preference_scores.npz`, or `.csv`), and the trajectory has the columns
+    of apc_large_results_ids.csv.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['get_trials_mean_scores', 'calculate_ids_effect_sizes', 'read_checkpoints_trials_scores',
+           'calculate_ids_trajectory', 'write_ids_trajectory']
+
+import argparse
+import pathlib
+from typing import Union, List, Optional, Tuple
+
+import numpy as np
+
+from io_module.preprocess_score_files import BINARY_SUFFIX, read_attentional_scores_segments
+from metaeval_core.effect_sizes import get_segment_statistics, get_contrasts_statistics
+from metaeval_core.trajectories import TRAJECTORY_COLUMNS, get_checkpoint_steps, get_checkpoints_ages, \
+    write_trajectory_csv
+
+CAPABILITY = 'IDS Preference'
+SCORES_NAME = 'attentional_preference_scores'
+DETAILED_COLUMNS = ['step', 'n_ids', 'n_ads', 'd_var', 'ci_lb', 'ci_ub', 't', 'p_value']
+# Critical value of the 95% confidence interval used in the R scripts
+Z_CRITICAL = 1.959964
+
+
+def get_trials_mean_scores(scores: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    # Mean of the scores of each trial, frames with NaN scores are ignored (mean with na.rm = TRUE in R)
+    finite = np.isfinite(scores)
+    finite_offsets = np.concatenate([[0], np.cumsum(finite)])[offsets]
+    _, means, _ = get_segment_statistics(scores[finite], finite_offsets)
+    return means
+
+
+def calculate_ids_effect_sizes(trials_means: np.ndarray, trials_types: Union[List[str], np.ndarray],
+                               checkpoints: Optional[np.ndarray] = None, n_checkpoints: Optional[int] = None,
+                               alpha: Optional[float] = 0.05) -> dict:
+    # Statistics per checkpoint (checkpoint index of each trial, a single checkpoint by default). ADS trials are the
+    # control group and IDS trials the experimental one; trials of other types are ignored.
+    trials_types = np.asarray(trials_types, dtype=str)
+    checkpoints = np.zeros(len(trials_means), dtype=np.int64) if checkpoints is None else \
+        np.asarray(checkpoints, dtype=np.int64)
+    n_checkpoints = n_checkpoints if n_checkpoints is not None else int(checkpoints.max()) + 1 if len(checkpoints) \
+        else 0
+
+    selected = np.isin(trials_types, ['ADS', 'IDS']) & np.isfinite(trials_means)
+    # Segments ordered as checkpoint 0 ADS, checkpoint 0 IDS, checkpoint 1 ADS, etc.
+    segments = checkpoints[selected] * 2 + (trials_types[selected] == 'IDS')
+    order = np.argsort(segments, kind='stable')
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(segments, minlength=2 * n_checkpoints))]).astype(np.int64)
+    statistics = get_contrasts_statistics(np.asarray(trials_means, dtype=np.float64)[selected][order], offsets,
+                                          ddof=1, se_formula='lipsey_wilson')
+
+    d, d_var = statistics['d'], statistics['se_d'] ** 2
+    return {'n_ids': statistics['n1'], 'n_ads': statistics['n2'], 'mean_ids': statistics['mean1'],
+            'mean_ads': statistics['mean2'], 'sd_ids': statistics['std1'], 'sd_ads': statistics['std2'], 'd': d,
+            'd_var': d_var, 'ci_lb': d - Z_CRITICAL * np.sqrt(d_var), 'ci_ub': d + Z_CRITICAL * np.sqrt(d_var),
+            't': statistics['t'], 'df': statistics['df'], 'p_value': statistics['p_value'],
+            'significant': statistics['p_value'] <= alpha}
+
+
+def _get_scores_path(ids_folder: pathlib.Path) -> pathlib.Path:
+    # The binary scores file is used if available
+    binary_path = ids_folder.joinpath(f'{SCORES_NAME}{BINARY_SUFFIX}')
+    csv_path = ids_folder.joinpath(f'{SCORES_NAME}.csv')
+    assert binary_path.is_file() or csv_path.is_file(), f'No attentional scores file in {ids_folder}'
+    return binary_path if binary_path.is_file() else csv_path
+
+
+def read_checkpoints_trials_scores(results_folder: Union[str, pathlib.Path], steps: List[int]) -> \
+        Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Mean score, type and checkpoint index of the trials of all the checkpoints
+    trials_means, trials_types, checkpoints = [], [], []
+    for checkpoint_idx, step in enumerate(steps):
+        scores, offsets, _, types = read_attentional_scores_segments(
+            _get_scores_path(pathlib.Path(results_folder).joinpath(str(step), 'ids')))
+        trials_means.append(get_trials_mean_scores(scores, offsets))
+        trials_types.append(np.array(types, dtype=str))
+        checkpoints.append(np.full(len(types), checkpoint_idx, dtype=np.int64))
+    if not steps:
+        return np.zeros(0), np.zeros(0, dtype=str), np.zeros(0, dtype=np.int64)
+    return np.concatenate(trials_means), np.concatenate(trials_types), np.concatenate(checkpoints)
+
+
+def calculate_ids_trajectory(results_folder: Union[str, pathlib.Path], alpha: Optional[float] = 0.05,
+                             batch_age: Optional[float] = 0.06, epoch_age: Optional[float] = 0.57) -> List[list]:
+    # Rows of the trajectory (TRAJECTORY_COLUMNS + DETAILED_COLUMNS), the significance is given by Welch's t-test
+    steps, batch_steps, epoch_steps = get_checkpoint_steps(results_folder)
+    trials_means, trials_types, checkpoints = read_checkpoints_trials_scores(results_folder, steps)
+    statistics = calculate_ids_effect_sizes(trials_means, trials_types, checkpoints, len(steps), alpha)
+    ages, labels = get_checkpoints_ages(batch_steps, epoch_steps, batch_age, epoch_age)
+    return [[float(ages[idx]), statistics['d'][idx], bool(statistics['significant'][idx]), labels[idx], CAPABILITY,
+             step] + [statistics[key][idx] for key in DETAILED_COLUMNS[1:]] for idx, step in enumerate(steps)]
+
+
+def write_ids_trajectory(results_folder: Union[str, pathlib.Path], output_csv_path: Union[str, pathlib.Path],
+                         alpha: Optional[float] = 0.05, batch_age: Optional[float] = 0.06,
+                         epoch_age: Optional[float] = 0.57, detailed: Optional[bool] = False) -> None:
+    columns = TRAJECTORY_COLUMNS + (DETAILED_COLUMNS if detailed else [])
+    rows = calculate_ids_trajectory(results_folder, alpha, batch_age, epoch_age)
+    write_trajectory_csv(output_csv_path, columns, [row[:len(columns)] for row in rows])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to calculate the developmental IDS preference trajectory '
+                                                 'of a model from the attentional scores of all its checkpoints. '
+                                                 '\nUsage: python calculate_ids_effect_sizes.py '
+                                                 '--results_folder test_results_large_apc/apc '
+                                                 '--output_csv_path apc_large_results_ids.csv [--alpha alpha] '
+                                                 '[--batch_age months] [--epoch_age months] [--detailed]')
+    parser.add_argument('--results_folder', type=str, required=True)
+    parser.add_argument('--output_csv_path', type=str, required=True)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--batch_age', type=float, default=0.06)
+    parser.add_argument('--epoch_age', type=float, default=0.57)
+    parser.add_argument('--detailed', action='store_true', help='Add the number of trials, variance and confidence '
+                                                                'interval of d and the t-test of each checkpoint')
+    args = parser.parse_args()
+
+    write_ids_trajectory(args.results_folder, args.output_csv_path, args.alpha, args.batch_age, args.epoch_age,
+                         args.detailed)
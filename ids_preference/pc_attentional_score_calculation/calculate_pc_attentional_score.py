@@ -19,8 +19,10 @@ from tensorflow.python.keras.models import load_model, Model
 from cpc_utils import FeatureEncoder, ContrastiveLoss, get_negative_samples
 from io_module.read_predictions_and_features import get_trials_list, \
     read_input_features
+from metaeval_core.instrumentation import stage, instrumented
 
 
+@instrumented('overlap')
 def _get_overlapped_features(input_features: np.ndarray, overlap: float) -> np.ndarray:
     sample_size = input_features.shape[1]
     features_dim = input_features.shape[-1]
@@ -38,6 +40,7 @@ def _get_overlapped_features(input_features: np.ndarray, overlap: float) -> np.n
     return final_features
 
 
+@instrumented('remove_overlap')
 def _remove_overlap(overlapped_features: np.ndarray, overlap: float, original_total_samples: int) -> np.ndarray:
     sample_size = overlapped_features.shape[1]
     features_dim = overlapped_features.shape[-1]
@@ -70,26 +73,33 @@ def _remove_overlap(overlapped_features: np.ndarray, overlap: float, original_to
 
 def calculate_mae_per_frame(model_path: Union[str, pathlib.Path], input_features_path: Union[str, pathlib.Path],
                             overlap: float, apc_shift: float) -> List[np.ndarray]:
-    input_features, _, indices = read_input_features(input_features_path)
+    with stage('read_features') as record:
+        input_features, _, indices = read_input_features(input_features_path)
+        record['frames'] = int(indices.shape[0] * indices.shape[1])
     overlapped_feats = _get_overlapped_features(input_features, overlap)
 
     physical_devices = tf.config.list_physical_devices('GPU')
     for physical_device in physical_devices:
         tf.config.experimental.set_memory_growth(physical_device, enable=True)
 
-    model = load_model(model_path, compile=False)
-    overlapped_predictions = model.predict(overlapped_feats)
+    with stage('load_model'):
+        model = load_model(model_path, compile=False)
+    with stage('predict', samples=len(overlapped_feats)):
+        overlapped_predictions = model.predict(overlapped_feats)
     predictions = _remove_overlap(overlapped_predictions, overlap, input_features.shape[0])
 
     # Obtain features for each trial and then calculate MAE per trial and frame
-    input_trials = get_trials_list(input_features, indices)
-    predicted_trials = get_trials_list(predictions, indices)
-
-    trials_mae = []
-    for trial_idx in range(len(input_trials)):
-        mae_per_frame = tf.keras.metrics.mean_absolute_error(input_trials[trial_idx][apc_shift:, :],
-                                                             predicted_trials[trial_idx][:-apc_shift, :])
-        trials_mae.append(mae_per_frame.numpy())
+    with stage('segment') as record:
+        input_trials = get_trials_list(input_features, indices)
+        predicted_trials = get_trials_list(predictions, indices)
+        record['trials'] = len(input_trials)
+
+    with stage('mae', trials=len(input_trials)):
+        trials_mae = []
+        for trial_idx in range(len(input_trials)):
+            mae_per_frame = tf.keras.metrics.mean_absolute_error(input_trials[trial_idx][apc_shift:, :],
+                                                                 predicted_trials[trial_idx][:-apc_shift, :])
+            trials_mae.append(mae_per_frame.numpy())
 
     return trials_mae
 
@@ -152,31 +162,38 @@ def _get_infonce_per_frame(true_latents: tf.Tensor, pred_latents: tf.Tensor, neg
 
 def calculate_infonce_per_frame(model_path: Union[str, pathlib.Path], input_features_path: Union[str, pathlib.Path],
                                 overlap: float, cpc_neg: int, cpc_steps: int) -> List[np.ndarray]:
-    input_features, _, indices = read_input_features(input_features_path)
+    with stage('read_features') as record:
+        input_features, _, indices = read_input_features(input_features_path)
+        record['frames'] = int(indices.shape[0] * indices.shape[1])
     overlapped_feats = _get_overlapped_features(input_features, overlap)
 
     physical_devices = tf.config.list_physical_devices('GPU')
     for physical_device in physical_devices:
         tf.config.experimental.set_memory_growth(physical_device, enable=True)
 
-    model = load_model(model_path, compile=False, custom_objects={'FeatureEncoder': FeatureEncoder,
-                                                                  'ContrastiveLoss': ContrastiveLoss})
-    input_layer = model.get_layer('input_layer').output
-    # This code fails with tf v 2.4.1 but works with v 2.1.0
-    # related discussion on internet:
-    # https://pretagteam.com/question/attributeerror-layer-has-no-inbound-nodes-occurred-in-tf-24-but-works-in-tf-24
-    projection_layer = model.get_layer('Contrastive_Loss').get_layer('project_latent').output
-    steps_projection_layer = model.get_layer('Contrastive_Loss').get_layer('project_steps').output
+    with stage('load_model'):
+        model = load_model(model_path, compile=False, custom_objects={'FeatureEncoder': FeatureEncoder,
+                                                                      'ContrastiveLoss': ContrastiveLoss})
+        input_layer = model.get_layer('input_layer').output
+        # This code fails with tf v 2.4.1 but works with v 2.1.0
+        # related discussion on internet:
+        # https://pretagteam.com/question/attributeerror-layer-has-no-inbound-nodes-occurred-in-tf-24-but-works-in-tf-24
+        projection_layer = model.get_layer('Contrastive_Loss').get_layer('project_latent').output
+        steps_projection_layer = model.get_layer('Contrastive_Loss').get_layer('project_steps').output
 
-    predictor = Model(input_layer, [projection_layer, steps_projection_layer])
+        predictor = Model(input_layer, [projection_layer, steps_projection_layer])
 
-    true_latents, pred_latents = predictor.predict(overlapped_feats)
+    with stage('predict', samples=len(overlapped_feats)):
+        true_latents, pred_latents = predictor.predict(overlapped_feats)
     # shape: samples x timesteps x 1
-    infonce_per_frame = _get_infonce_per_frame(true_latents, pred_latents, cpc_neg, cpc_steps)
+    with stage('infonce', samples=len(overlapped_feats)):
+        infonce_per_frame = _get_infonce_per_frame(true_latents, pred_latents, cpc_neg, cpc_steps)
     final_infonce_per_frame = _remove_overlap(infonce_per_frame.numpy(), overlap, input_features.shape[0])
 
     # Arrange InfoNCE for each frame and trial
-    trials_infonce = get_trials_list(final_infonce_per_frame, indices)
-    for idx in range(len(trials_infonce)):
-        trials_infonce[idx] = trials_infonce[idx].reshape(-1)
+    with stage('segment') as record:
+        trials_infonce = get_trials_list(final_infonce_per_frame, indices)
+        for idx in range(len(trials_infonce)):
+            trials_infonce[idx] = trials_infonce[idx].reshape(-1)
+        record['trials'] = len(trials_infonce)
     return trials_infonce
@@ -1,29 +1,44 @@
 """
     This script reads and write csv files with the attentional preference score per frame for each IDS preference trial.
 
+    The scores can also be stored in a binary file (.npz): the scores of all the trials concatenated (float32), the
+    offsets of each trial, and the file name and type (IDS or ADS) of each trial.
+
     @date 12.11.2021
 """
 
 __docformat__ = ['reStructuredText']
-__all__ = ['create_csv_attentional_scores', 'read_csv_attentional_scores']
+__all__ = ['create_csv_attentional_scores', 'read_csv_attentional_scores', 'get_trials_names_and_types',
+           'create_binary_attentional_scores', 'read_binary_attentional_scores', 'create_attentional_scores_file',
+           'read_attentional_scores_segments']
 
 import csv
 import pathlib
-from typing import Union, List, Tuple
+from typing import Union, List, Tuple, Optional
 
 import numpy as np
 import pandas as pd
 from pc_attentional_score_calculation.io_module.read_predictions_and_features import read_input_features
 
+BINARY_SUFFIX = '.npz'
+
+
+def get_trials_names_and_types(mapping: List[str]) -> Tuple[List[str], List[str]]:
+    # e.g. names path_to_wav/<IDS|ADS>/filename.wav
+    mapping = [file_path.decode() if isinstance(file_path, bytes) else file_path for file_path in mapping]
+    return [pathlib.Path(file_path).stem for file_path in mapping], \
+        [pathlib.Path(file_path).parent.stem for file_path in mapping]
+
 
 def create_csv_attentional_scores(trials_loss: List[np.ndarray], input_features_path: Union[str, pathlib.Path],
                                   output_csv_path: Union[str, pathlib.Path]) -> None:
     _, mapping, _ = read_input_features(input_features_path)
+    # Names of the h5py file are read as bytes with h5py 3
+    trials_names, trials_types = get_trials_names_and_types(mapping[:len(trials_loss)])
     csv_lines = [['file_name', 'trial_type', 'frame', 'attentional_preference_score']]
     for trial_idx in range(len(trials_loss)):
-        trial_file_name = pathlib.Path(mapping[trial_idx]).stem
-        # e.g. names path_to_wav/<IDS|ADS>/filename.wav
-        trial_type = pathlib.Path(mapping[trial_idx]).parent.stem  # IDS or ADS
+        trial_file_name = trials_names[trial_idx]
+        trial_type = trials_types[trial_idx]  # IDS or ADS
         loss_per_frame = trials_loss[trial_idx]
         for frame_idx in range(len(loss_per_frame)):
             csv_lines.append([trial_file_name, trial_type, frame_idx, loss_per_frame[frame_idx]])
@@ -46,3 +61,50 @@ def read_csv_attentional_scores(csv_path: Union[str, pathlib.Path]) -> Tuple[Lis
             'attentional_preference_score'].to_numpy()
         trials.append(scores)
     return trials, trials_name
+
+
+def create_binary_attentional_scores(trials_loss: List[np.ndarray], output_path: Union[str, pathlib.Path],
+                                     input_features_path: Optional[Union[str, pathlib.Path]] = None,
+                                     mapping: Optional[List[str]] = None) -> None:
+    if mapping is None:
+        _, mapping, _ = read_input_features(input_features_path)
+    trials_names, trials_types = get_trials_names_and_types(mapping[:len(trials_loss)])
+    offsets = np.concatenate([[0], np.cumsum([len(loss_per_frame) for loss_per_frame in trials_loss])])
+    scores = np.concatenate([np.asarray(loss_per_frame, dtype=np.float32).reshape(-1)
+                             for loss_per_frame in trials_loss]) if trials_loss else np.zeros(0, dtype=np.float32)
+
+    pathlib.Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    # A file object is used so numpy does not append the .npz extension to the path given
+    with open(output_path, 'wb') as data_file:
+        np.savez(data_file, scores=scores, offsets=offsets.astype(np.int64),
+                 file_names=np.array(trials_names, dtype=str), trial_types=np.array(trials_types, dtype=str))
+
+
+def read_binary_attentional_scores(binary_path: Union[str, pathlib.Path]) -> \
+        Tuple[np.ndarray, np.ndarray, List[str], List[str]]:
+    # Concatenated scores, offsets, file name and type of each trial
+    with np.load(binary_path, allow_pickle=False) as data:
+        return data['scores'], data['offsets'], data['file_names'].tolist(), data['trial_types'].tolist()
+
+
+def create_attentional_scores_file(trials_loss: List[np.ndarray], input_features_path: Union[str, pathlib.Path],
+                                   output_path: Union[str, pathlib.Path]) -> None:
+    # The format is chosen by the extension of the file: .npz for binary, csv otherwise
+    if pathlib.Path(output_path).suffix == BINARY_SUFFIX:
+        create_binary_attentional_scores(trials_loss, output_path, input_features_path)
+    else:
+        create_csv_attentional_scores(trials_loss, input_features_path, output_path)
+
+
+def read_attentional_scores_segments(scores_path: Union[str, pathlib.Path]) -> \
+        Tuple[np.ndarray, np.ndarray, List[str], List[str]]:
+    # Same output as read_binary_attentional_scores for both formats (trials in order of first appearance in csv files)
+    if pathlib.Path(scores_path).suffix == BINARY_SUFFIX:
+        return read_binary_attentional_scores(scores_path)
+    all_attentional_scores = pd.read_csv(scores_path, sep=';', dtype={'file_name': str, 'trial_type': str})
+    codes, trials = pd.factorize(pd.MultiIndex.from_arrays([all_attentional_scores['file_name'],
+                                                            all_attentional_scores['trial_type']]))
+    order = np.argsort(codes, kind='stable')
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(trials)))]).astype(np.int64)
+    scores = all_attentional_scores['attentional_preference_score'].to_numpy(dtype=np.float64)[order]
+    return scores, offsets, [str(name) for name, _ in trials], [str(trial_type) for _, trial_type in trials]
@@ -1,6 +1,7 @@
 """
     This is the main script to obtain the attentional preference score per frame for each IDS preference trial and
-    to create csv files with the measurements.
+    to create csv files with the measurements (binary file if the output path ends in .npz). The IDS preference effect
+    size can be calculated directly from the scores in memory.
 
     @date 12.11.2021
 """
@@ -10,24 +11,47 @@ __all__ = ['']
 
 import argparse
 import pathlib
-from typing import Union, Optional
+from typing import Union, Optional, List
+
+import numpy as np
 
 from calculate_pc_attentional_score import calculate_mae_per_frame, \
     calculate_infonce_per_frame
-from io_module.preprocess_score_files import create_csv_attentional_scores
+from calculate_ids_effect_sizes import DETAILED_COLUMNS, get_trials_mean_scores, calculate_ids_effect_sizes
+from io_module.preprocess_score_files import create_attentional_scores_file, get_trials_names_and_types
+from io_module.read_predictions_and_features import read_input_features
+from metaeval_core.effect_sizes import get_segments_offsets
+from metaeval_core.instrumentation import RunReport, stage
+from metaeval_core.trajectories import write_trajectory_csv
+
+
+def write_ids_effect_size(trials_loss: List[np.ndarray], input_features_path: Union[str, pathlib.Path],
+                          effect_size_csv_path: Union[str, pathlib.Path], alpha: Optional[float] = 0.05) -> None:
+    # IDS preference effect size of the model from the scores of the trials (no csv round trip)
+    _, mapping, _ = read_input_features(input_features_path)
+    _, trials_types = get_trials_names_and_types(mapping[:len(trials_loss)])
+    trials_means = get_trials_mean_scores(*get_segments_offsets(trials_loss))
+    statistics = calculate_ids_effect_sizes(trials_means, trials_types, alpha=alpha)
+    columns = ['d', 'significant'] + DETAILED_COLUMNS[1:]
+    write_trajectory_csv(effect_size_csv_path, columns, [[statistics[key][0] for key in columns]])
 
 
 def obtain_scores_for_trials(model_path: Union[str, pathlib.Path], input_features_path: Union[str, pathlib.Path],
                              output_csv_path: Union[str, pathlib.Path], model_type: str,
                              overlap: Optional[float] = 0.5, apc_shift: Optional[int] = 5,
-                             cpc_neg: Optional[int] = 10, cpc_steps: Optional[int] = 12) -> None:
+                             cpc_neg: Optional[int] = 10, cpc_steps: Optional[int] = 12,
+                             effect_size_csv_path: Optional[Union[str, pathlib.Path]] = None) -> None:
     assert 1 >= overlap >= 0
     if model_type == 'apc':
         trials_loss = calculate_mae_per_frame(model_path, input_features_path, overlap, apc_shift)
     else:  # cpc
         trials_loss = calculate_infonce_per_frame(model_path, input_features_path, overlap, cpc_neg, cpc_steps)
 
-    create_csv_attentional_scores(trials_loss, input_features_path, output_csv_path)
+    with stage('write_scores', trials=len(trials_loss)):
+        create_attentional_scores_file(trials_loss, input_features_path, output_csv_path)
+    if effect_size_csv_path:
+        with stage('effect_size', trials=len(trials_loss)):
+            write_ids_effect_size(trials_loss, input_features_path, effect_size_csv_path)
 
 
 if __name__ == '__main__':
@@ -37,7 +61,10 @@ if __name__ == '__main__':
                                                  '--input_path path_to_h5py_input_features '
                                                  '--output_csv_path path_output_csv_file '
                                                  '--model_type [apc|cpc] --overlap percentage --apc_shift shift '
-                                                 '--cpc_neg negative_samples --cpc_steps steps')
+                                                 '--cpc_neg negative_samples --cpc_steps steps '
+                                                 '[--effect_size_csv_path path_output_csv_effect_size] '
+                                                 '[--report_path path_json_run_report] '
+                                                 '[--profile_folder path_folder_cprofile_stats]')
     parser.add_argument('--model_path', type=str, required=True)
     parser.add_argument('--input_path', type=str, required=True)
     parser.add_argument('--output_csv_path', type=str, required=True)
@@ -46,8 +73,19 @@ if __name__ == '__main__':
     parser.add_argument('--apc_shift', type=int, default=5)
     parser.add_argument('--cpc_neg', type=int, default=10)
     parser.add_argument('--cpc_steps', type=int, default=12)
+    parser.add_argument('--effect_size_csv_path', type=str)
+    parser.add_argument('--report_path', type=str)
+    parser.add_argument('--profile_folder', type=str)
 
     args = parser.parse_args()
 
-    obtain_scores_for_trials(args.model_path, args.input_path, args.output_csv_path, args.model_type, args.overlap,
-                             args.apc_shift, args.cpc_neg, args.cpc_steps)
+    report_path = args.report_path
+    if report_path is None:
+        # The run report is saved next to the output csv file by default
+        output_csv_path = pathlib.Path(args.output_csv_path)
+        report_path = output_csv_path.with_name(f'{output_csv_path.stem}_run_report.json')
+
+    with RunReport('obtain_attentional_scores', report_path, args.profile_folder):
+        obtain_scores_for_trials(args.model_path, args.input_path, args.output_csv_path, args.model_type,
+                                 args.overlap, args.apc_shift, args.cpc_neg, args.cpc_steps,
+                                 args.effect_size_csv_path)
@@ -1,5 +1,6 @@
 """
-    It creates the input features for PC models. Overlapped samples of trials
+    It creates the input features for PC models. Overlapped samples of trials. Optionally, the features are normalised
+    per utterance, corpus or globally (metaeval_core.feature_normalisation) while the h5py file is written.
     @date 11.11.2021
 """
 
@@ -10,15 +11,26 @@ import argparse
 import pathlib
 from typing import Union, Optional
 
-from trial_processing.extract_acoustic_features import extract_acoustic_features, create_h5py_file
+from metaeval_core.feature_normalisation import get_frames_keys, create_normalised_h5py_file
+from trial_processing.extract_acoustic_features import iter_acoustic_features, create_h5py_file
+
+# The speakers of the trials are not known
+NORMALISATION_SCHEMES = ['utterance', 'corpus', 'global']
 
 
 def obtain_features_ids_preference_trials(trials_paths: Union[str, pathlib.Path],
-                                          output_h5py_path: Union[str, pathlib.Path], cmvn: Optional[bool] = True):
+                                          output_h5py_path: Union[str, pathlib.Path], cmvn: Optional[bool] = True,
+                                          normalisation: Optional[str] = None,
+                                          statistics_path: Optional[Union[str, pathlib.Path]] = None):
     files = list(pathlib.Path(trials_paths).rglob('*.wav'))
     files = sorted(files)
-    features = extract_acoustic_features(files, cmvn=cmvn)
-    create_h5py_file(output_h5py_path, files, features, 200, 50, True)  # 200 sample size, 50 reset between samples
+    features = iter_acoustic_features(files, cmvn=cmvn)
+    if normalisation is None:
+        create_h5py_file(output_h5py_path, files, features, 200, 50, True)  # 200 sample size, 50 reset between samples
+    else:
+        assert normalisation in NORMALISATION_SCHEMES
+        keys = get_frames_keys([str(file) for file in files], normalisation, pathlib.Path(output_h5py_path).stem)
+        create_normalised_h5py_file(output_h5py_path, files, features, 200, 50, keys, normalisation, statistics_path)
 
 
 if __name__ == '__main__':
@@ -26,14 +38,19 @@ if __name__ == '__main__':
                                                  ' APC and CPC models.\nUsage: python create_input_features.py '
                                                  '--trials_path path_wav_files_trials '
                                                  '--output_path path_h5py_output_file  '
-                                                 '[--cmvn| --no-cmvn] ')
+                                                 '[--cmvn| --no-cmvn] '
+                                                 '[--normalisation utterance|corpus|global] '
+                                                 '[--statistics_path path_statistics_file]')
     parser.add_argument('--trials_path', type=str, required=True)
     parser.add_argument('--output_path', type=str, required=True)
     parser.add_argument('--cmvn', dest='cmvn', action='store_true')
     parser.add_argument('--no-cmvn', dest='cmvn', action='store_false')
+    parser.add_argument('--normalisation', type=str, choices=NORMALISATION_SCHEMES)
+    parser.add_argument('--statistics_path', type=str)
     parser.set_defaults(cmvn=False)
 
     args = parser.parse_args()
 
-    obtain_features_ids_preference_trials(args.trials_path, args.output_path, args.cmvn)
-
+    assert not (args.cmvn and args.normalisation), 'Features normalised with cmvn cannot be normalised again'
+    obtain_features_ids_preference_trials(args.trials_path, args.output_path, args.cmvn, args.normalisation,
+                                          args.statistics_path)
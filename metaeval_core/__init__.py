@@ -0,0 +1,6 @@
+"""
+    Modules shared by the IDS preference and vowel discrimination experiments: audio loading and acoustic feature
+    extraction, h5py input/output and trial segmentation, and the objects needed for loading CPC models.
+
+    The package is installed with `pip install -e .` from the main folder of the repository.
+"""
@@ -0,0 +1,248 @@
+"""
+    Vectorised meta-analysis statistics over ragged arrays of measurements (e.g., DTW distances).
+
+    The measurements of all the groups (contrasts, checkpoints, ...) are concatenated in one array, with `offsets`
+    giving the boundaries of each segment. Segments are arranged in pairs (control, experimental), i.e., same and
+    different conditions for the vowel discrimination test: group 0 same, group 0 different, group 1 same, etc. (the
+    layout of the binary distances files). Counts, means and sums of squared deviations are obtained with segment
+    reductions, and effect sizes, standard errors, weights and Welch's t-tests are computed for all the groups at once.
+    Mean effect sizes of groups of effect sizes (e.g., the contrasts of each checkpoint) are obtained with fixed-effect
+    or random-effects models (between-study variance estimated with DerSimonian-Laird or REML, as rma in metafor).
+
+    Formulae from Practical Meta-Analysis, Mark W. Lipsey and David B. Wilson, SAGE Publications, 2001. The standard
+    error can be computed as in the Python test (eq. 3.23) or as in the R scripts (r_scripts/*/obtain_effect_sizes.R).
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['get_segments_offsets', 'get_segment_statistics', 'get_standard_error', 'get_effect_sizes',
+           'get_welch_t_test', 'get_contrasts_statistics', 'get_weighted_mean_effect_sizes', 'get_significance_codes',
+           'get_heterogeneity', 'get_between_study_variance', 'get_random_effects_mean_effect_sizes',
+           'get_developmental_trajectory_table']
+
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import scipy.stats
+
+SE_FORMULAS = ['lipsey_wilson', 'r_scripts']
+META_ANALYSIS_METHODS = ['FE', 'DL', 'REML']
+
+
+def get_segments_offsets(segments: List[Union[List[float], np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    # Concatenated values and offsets of a list of segments
+    values = np.concatenate([np.asarray(segment, dtype=np.float64).reshape(-1) for segment in segments]) \
+        if segments else np.zeros(0)
+    offsets = np.concatenate([[0], np.cumsum([len(segment) for segment in segments])]).astype(np.int64)
+    return values, offsets
+
+
+def _segment_sums(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    # np.add.reduceat does not handle empty segments, so only the starts of non-empty segments are reduced
+    counts = np.diff(offsets)
+    sums = np.zeros(len(counts))
+    non_empty = counts > 0
+    if np.any(non_empty):
+        sums[non_empty] = np.add.reduceat(values, offsets[:-1][non_empty])
+    return sums
+
+
+def get_segment_statistics(values: np.ndarray, offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Count, mean and sum of squared deviations (M2) per segment. The variance with any ddof is M2 / (n - ddof).
+    assert offsets[0] == 0 and offsets[-1] == len(values)
+    counts = np.diff(offsets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = _segment_sums(values, offsets) / counts
+    deviations = (values - np.repeat(means, counts)) ** 2
+    m2 = _segment_sums(deviations, offsets)
+    return counts, means, m2
+
+
+def get_standard_error(n1: np.ndarray, n2: np.ndarray, effect_size: np.ndarray,
+                       se_formula: Optional[str] = 'lipsey_wilson') -> np.ndarray:
+    assert se_formula in SE_FORMULAS
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if se_formula == 'lipsey_wilson':
+            return np.sqrt(((n1 + n2) / (n1 * n2)) + ((effect_size ** 2) / (2 * (n1 + n2))))  # (eq. 3.23)
+        return np.sqrt(((n1 + n2) / (n1 * n2)) + ((effect_size ** 2) / (2 * n1 * n2)))
+
+
+def get_effect_sizes(n1: np.ndarray, n2: np.ndarray, mean1: np.ndarray, mean2: np.ndarray, std1: np.ndarray,
+                     std2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Standardised mean difference (d) and Hedges' g. Group 1 is the experimental group (different condition), group
+    # 2 the control group (same condition).
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s_pooled = np.sqrt((std1 * std1 + std2 * std2) / 2)
+        d = (mean1 - mean2) / s_pooled
+        g = (1 - (3 / (4 * (n1 + n2) - 9))) * d  # (eq. 3.22)
+    return d, g
+
+
+def get_welch_t_test(n1: np.ndarray, n2: np.ndarray, mean1: np.ndarray, mean2: np.ndarray, var1: np.ndarray,
+                     var2: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Two-sided Welch's t-test (unequal variances) with sample variances (ddof=1), as R's t.test
+    with np.errstate(invalid='ignore', divide='ignore'):
+        se1, se2 = var1 / n1, var2 / n2
+        t = (mean1 - mean2) / np.sqrt(se1 + se2)
+        df = (se1 + se2) ** 2 / (se1 ** 2 / (n1 - 1) + se2 ** 2 / (n2 - 1))
+        p_value = 2 * scipy.stats.t.sf(np.abs(t), df)
+    return t, df, p_value
+
+
+def get_contrasts_statistics(values: np.ndarray, offsets: np.ndarray, ddof: Optional[int] = 0,
+                             se_formula: Optional[str] = 'lipsey_wilson') -> dict:
+    # Statistics per group (pair of segments control/experimental). The standard deviations of the effect sizes use
+    # ddof (0 in the Python test, 1 in the R scripts); the t-test always uses sample variances.
+    assert (len(offsets) - 1) % 2 == 0
+    counts, means, m2 = get_segment_statistics(values, offsets)
+    n2, n1 = counts[0::2], counts[1::2]
+    mean2, mean1 = means[0::2], means[1::2]
+    m2_2, m2_1 = m2[0::2], m2[1::2]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std1, std2 = np.sqrt(m2_1 / (n1 - ddof)), np.sqrt(m2_2 / (n2 - ddof))
+        var1, var2 = m2_1 / (n1 - 1), m2_2 / (n2 - 1)
+    d, g = get_effect_sizes(n1, n2, mean1, mean2, std1, std2)
+    se_d, se_g = get_standard_error(n1, n2, d, se_formula), get_standard_error(n1, n2, g, se_formula)
+    t, df, p_value = get_welch_t_test(n1, n2, mean1, mean2, var1, var2)
+
+    with np.errstate(divide='ignore'):
+        # inverse variance weights (eq. 3.24)
+        w_d, w_g = 1 / (se_d ** 2), 1 / (se_g ** 2)
+    return {'n1': n1, 'n2': n2, 'mean1': mean1, 'mean2': mean2, 'std1': std1, 'std2': std2, 'd': d, 'g': g,
+            'se_d': se_d, 'se_g': se_g, 'w_d': w_d, 'w_g': w_g, 't': t, 'df': df, 'p_value': p_value}
+
+
+def get_significance_codes(p_values: np.ndarray) -> np.ndarray:
+    # Same codes as get_p_value_significance_test
+    p_values = np.asarray(p_values)
+    codes = np.full(p_values.shape, ' ', dtype='<U3')
+    for threshold, code in [(0.1, '.'), (0.05, '*'), (0.01, '**'), (0.001, '***')]:
+        codes[p_values < threshold] = code
+    return codes
+
+
+def get_weighted_mean_effect_sizes(effect_sizes: np.ndarray, weights: np.ndarray, groups: np.ndarray,
+                                   alpha: Optional[float] = 0.05, n_groups: Optional[int] = None) -> dict:
+    # Fixed-effect (inverse variance weighted) mean effect size per group, with its standard error, confidence
+    # interval and significance test (Lipsey and Wilson, 2001, Ch. 6)
+    groups = np.asarray(groups, dtype=np.int64)
+    n_groups = n_groups if n_groups is not None else int(groups.max()) + 1 if len(groups) else 0
+    sum_weights = np.bincount(groups, weights, n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_es = np.bincount(groups, np.asarray(effect_sizes) * weights, n_groups) / sum_weights
+        se_mean_es = np.sqrt(1 / sum_weights)
+        z = np.abs(mean_es) / se_mean_es
+    z_critical = scipy.stats.norm.ppf(1 - alpha / 2)
+    p_value = scipy.stats.norm.sf(z)
+    return {'mean_es': mean_es, 'se': se_mean_es, 'ci_lb': mean_es - z_critical * se_mean_es,
+            'ci_ub': mean_es + z_critical * se_mean_es, 'z': z, 'p_value': p_value, 'significant': z > z_critical,
+            'significance_code': get_significance_codes(p_value)}
+
+
+def _group_sums(values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    return np.bincount(groups, values, n_groups)
+
+
+def get_heterogeneity(effect_sizes: np.ndarray, weights: np.ndarray, groups: np.ndarray,
+                      n_groups: Optional[int] = None) -> dict:
+    # Q statistic, degrees of freedom and p-value per group with fixed-effect weights, and the typical within-study
+    # variance used for I^2 (as metafor)
+    groups = np.asarray(groups, dtype=np.int64)
+    effect_sizes, weights = np.asarray(effect_sizes, dtype=np.float64), np.asarray(weights, dtype=np.float64)
+    n_groups = n_groups if n_groups is not None else int(groups.max()) + 1 if len(groups) else 0
+    sum_weights = _group_sums(weights, groups, n_groups)
+    sum_weights_2 = _group_sums(weights ** 2, groups, n_groups)
+    df = np.bincount(groups, minlength=n_groups) - 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_es = _group_sums(weights * effect_sizes, groups, n_groups) / sum_weights
+        q = _group_sums(weights * (effect_sizes - mean_es[groups]) ** 2, groups, n_groups)
+        c = sum_weights - sum_weights_2 / sum_weights
+        typical_variance = df / c
+    p_value = np.where(df > 0, scipy.stats.chi2.sf(q, np.maximum(df, 1)), np.nan)
+    return {'q': q, 'df': df, 'p_value': p_value, 'c': c, 'typical_variance': typical_variance}
+
+
+def get_between_study_variance(effect_sizes: np.ndarray, weights: np.ndarray, groups: np.ndarray,
+                               method: Optional[str] = 'REML', n_groups: Optional[int] = None,
+                               max_iter: Optional[int] = 100, threshold: Optional[float] = 1e-10) -> np.ndarray:
+    # tau^2 per group of effect sizes with within-study variances 1 / weights. DerSimonian-Laird in closed form; REML
+    # with Fisher scoring (intercept-only model, truncated at 0) for all the groups at once, starting from DL.
+    assert method in ['DL', 'REML']
+    groups = np.asarray(groups, dtype=np.int64)
+    effect_sizes, weights = np.asarray(effect_sizes, dtype=np.float64), np.asarray(weights, dtype=np.float64)
+    n_groups = n_groups if n_groups is not None else int(groups.max()) + 1 if len(groups) else 0
+    heterogeneity = get_heterogeneity(effect_sizes, weights, groups, n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tau2 = np.maximum(0, (heterogeneity['q'] - heterogeneity['df']) / heterogeneity['c'])
+    # A single effect size has no between-study variance
+    tau2[heterogeneity['df'] < 1] = 0
+    if method == 'DL':
+        return tau2
+
+    variances = 1 / weights
+    active = np.isfinite(tau2) & (heterogeneity['df'] > 0)
+    for _ in range(max_iter):
+        if not np.any(active):
+            break
+        with np.errstate(invalid='ignore', divide='ignore'):
+            w = 1 / (variances + tau2[groups])
+            sum_w = _group_sums(w, groups, n_groups)
+            sum_w_2 = _group_sums(w ** 2, groups, n_groups)
+            sum_w_3 = _group_sums(w ** 3, groups, n_groups)
+            mean_es = _group_sums(w * effect_sizes, groups, n_groups) / sum_w
+            # y'PPy, tr(P) and tr(PP) of the intercept-only model
+            y_p_p_y = _group_sums(w ** 2 * (effect_sizes - mean_es[groups]) ** 2, groups, n_groups)
+            trace_p = sum_w - sum_w_2 / sum_w
+            trace_p_p = sum_w_2 - 2 * sum_w_3 / sum_w + (sum_w_2 / sum_w) ** 2
+            new_tau2 = np.maximum(0, tau2 + (y_p_p_y - trace_p) / trace_p_p)
+        new_tau2 = np.where(active, new_tau2, tau2)
+        active &= np.abs(new_tau2 - tau2) > threshold
+        tau2 = new_tau2
+    return tau2
+
+
+def get_random_effects_mean_effect_sizes(effect_sizes: np.ndarray, weights: np.ndarray, groups: np.ndarray,
+                                         method: Optional[str] = 'REML', alpha: Optional[float] = 0.05,
+                                         n_groups: Optional[int] = None) -> dict:
+    # Mean effect size per group with fixed-effect (FE) or random-effects (DL, REML) weights 1 / (v + tau^2), v being
+    # the within-study variance (1 / weights), plus the heterogeneity statistics (tau^2, Q and I^2 in %)
+    assert method in META_ANALYSIS_METHODS
+    groups = np.asarray(groups, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    n_groups = n_groups if n_groups is not None else int(groups.max()) + 1 if len(groups) else 0
+    heterogeneity = get_heterogeneity(effect_sizes, weights, groups, n_groups)
+    if method == 'FE':
+        tau2 = np.zeros(n_groups)
+    else:
+        tau2 = get_between_study_variance(effect_sizes, weights, groups, method, n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        statistics = get_weighted_mean_effect_sizes(effect_sizes, 1 / (1 / weights + tau2[groups]), groups, alpha,
+                                                    n_groups)
+        i2 = 100 * tau2 / (heterogeneity['typical_variance'] + tau2) if method != 'FE' else \
+            100 * np.maximum(0, (heterogeneity['q'] - heterogeneity['df']) / heterogeneity['q'])
+    statistics.update({'tau2': tau2, 'q': heterogeneity['q'], 'q_df': heterogeneity['df'],
+                       'q_p_value': heterogeneity['p_value'], 'i2': i2, 'k': heterogeneity['df'] + 1})
+    return statistics
+
+
+def get_developmental_trajectory_table(values: np.ndarray, offsets: np.ndarray, checkpoints: np.ndarray,
+                                       effect: Optional[str] = 'g', alpha: Optional[float] = 0.05,
+                                       ddof: Optional[int] = 1,
+                                       se_formula: Optional[str] = 'r_scripts', method: Optional[str] = 'FE',
+                                       n_checkpoints: Optional[int] = None) -> Tuple[dict, dict]:
+    # Effect sizes per contrast and mean effect size per checkpoint in a single call. checkpoints gives the
+    # checkpoint index of each group (pair of segments). By default the statistics follow the R scripts (sample
+    # standard deviations, fixed-effect mean of g); method DL or REML fits random-effects models instead.
+    assert effect in ['d', 'g'] and method in META_ANALYSIS_METHODS
+    contrasts_statistics = get_contrasts_statistics(values, offsets, ddof, se_formula)
+    if method == 'FE':
+        checkpoints_statistics = get_weighted_mean_effect_sizes(contrasts_statistics[effect],
+                                                                contrasts_statistics[f'w_{effect}'], checkpoints,
+                                                                alpha, n_checkpoints)
+    else:
+        checkpoints_statistics = get_random_effects_mean_effect_sizes(contrasts_statistics[effect],
+                                                                      contrasts_statistics[f'w_{effect}'],
+                                                                      checkpoints, method, alpha, n_checkpoints)
+    return contrasts_statistics, checkpoints_statistics
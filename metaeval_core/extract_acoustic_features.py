@@ -0,0 +1,143 @@
+"""
+    @date 03.03.2021
+    It extracts the acoustic features from audio files and it creates h5py files for training the PC models.
+
+    The features can be generated file by file (iter_acoustic_features) and the h5py file is written in blocks of
+    samples, so long recordings are processed with the memory of the features of a file and a block of samples.
+"""
+
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Union, Iterable, Iterator
+
+import h5py
+import numpy as np
+
+from metaeval_core.audio_loading import AudioLoader
+from metaeval_core.feature_front_end import compute_features_batch
+from metaeval_core.instrumentation import stage
+
+__docformat__ = ['reStructuredText']
+__all__ = ['iter_acoustic_features', 'extract_acoustic_features', 'create_h5py_file']
+
+# Samples written to the h5py file at once
+BLOCK_SAMPLES = 500
+
+
+def _extract_features_chunk(file_paths: Union[List[pathlib.Path], List[str]],
+                            zip_path: Optional[Union[pathlib.Path, str]], params: dict) -> List[np.ndarray]:
+    # The signals of a chunk are loaded (opening the zip file once) and their features computed in one batch
+    with AudioLoader(zip_path) as loader:
+        signals = [loader.load(file, params['sampling_freq']) for file in file_paths]
+    return compute_features_batch(signals, **params)
+
+
+def iter_acoustic_features(file_paths: Union[List[pathlib.Path], List[str]],
+                           zip_path: Optional[Union[pathlib.Path, str]] = None,
+                           window_length: Optional[float] = 0.025, window_shift: Optional[float] = 0.01,
+                           num_features: Optional[int] = 13, deltas: Optional[bool] = True,
+                           deltas_deltas: Optional[bool] = True, cmvn: Optional[bool] = True,
+                           name: Optional[str] = 'mfcc',
+                           target_sampling_freq: Optional[int] = 16000,
+                           n_jobs: Optional[int] = 1, chunk_size: Optional[int] = 200) -> Iterator[np.ndarray]:
+    # Features of each file in the order of file_paths, computed chunk by chunk
+    params = {'sampling_freq': target_sampling_freq, 'n_fft': int(target_sampling_freq * window_length),
+              'hop_length': int(target_sampling_freq * window_shift), 'num_features': num_features,
+              'deltas': deltas, 'deltas_deltas': deltas_deltas, 'cmvn': cmvn, 'name': name}
+
+    chunks = [file_paths[i:i + chunk_size] for i in range(0, len(file_paths), chunk_size)]
+    arguments = (chunks, [zip_path] * len(chunks), [params] * len(chunks))
+    processed_files = 0
+
+    executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs != 1 else None
+    try:
+        for chunk_features in (executor.map if executor else map)(_extract_features_chunk, *arguments):
+            processed_files += len(chunk_features)
+            print('{}/{} files processed'.format(processed_files, len(file_paths)))
+            yield from chunk_features
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def extract_acoustic_features(file_paths: Union[List[pathlib.Path], List[str]],
+                              zip_path: Optional[Union[pathlib.Path, str]] = None,
+                              window_length: Optional[float] = 0.025, window_shift: Optional[float] = 0.01,
+                              num_features: Optional[int] = 13, deltas: Optional[bool] = True,
+                              deltas_deltas: Optional[bool] = True, cmvn: Optional[bool] = True,
+                              name: Optional[str] = 'mfcc',
+                              target_sampling_freq: Optional[int] = 16000,
+                              n_jobs: Optional[int] = 1, chunk_size: Optional[int] = 200) -> List[np.ndarray]:
+    with stage('extract_acoustic_features', files=len(file_paths)) as record:
+        features = list(iter_acoustic_features(file_paths, zip_path, window_length, window_shift, num_features,
+                                               deltas, deltas_deltas, cmvn, name, target_sampling_freq, n_jobs,
+                                               chunk_size))
+        record['frames'] = sum(len(feature) for feature in features)
+
+    return features
+
+
+class _SamplesWriter:
+    # Frames are appended to the data and indices datasets in blocks of whole samples
+    def __init__(self, out_file: h5py.File, sample_length: int, include_indices: bool):
+        self.out_file = out_file
+        self.sample_length = sample_length
+        self.include_indices = include_indices
+        self.pending = []
+        self.pending_frames = 0
+
+    def _write(self, name: str, values: np.ndarray) -> None:
+        values = values.reshape((-1, self.sample_length, values.shape[-1]))
+        if name not in self.out_file:
+            self.out_file.create_dataset(name, data=values, maxshape=(None,) + values.shape[1:], chunks=True)
+            return
+        dataset = self.out_file[name]
+        dataset.resize(dataset.shape[0] + values.shape[0], axis=0)
+        dataset[-values.shape[0]:] = values
+
+    def flush(self, complete: Optional[bool] = False) -> None:
+        # Whole samples are written, the remaining frames are kept (or padded to a sample if complete)
+        data = np.concatenate([frames for frames, _ in self.pending]).astype(np.float64)
+        indices = np.concatenate([frames_indices for _, frames_indices in self.pending]).astype(np.float64)
+        n_frames = len(data) // self.sample_length * self.sample_length
+        if complete:
+            extra_frames = self.sample_length - (len(data) - n_frames)
+            data = np.concatenate((data, np.zeros((extra_frames, data.shape[-1]))))
+            indices = np.concatenate((indices, np.stack([np.full(extra_frames, -1.0), np.zeros(extra_frames)],
+                                                        axis=1)))
+            n_frames = len(data)
+        self._write('data', data[:n_frames])
+        if self.include_indices:
+            self._write('indices', indices[:n_frames])
+        self.pending = [(data[n_frames:], indices[n_frames:])]
+        self.pending_frames = len(data) - n_frames
+
+    def append(self, frames: np.ndarray, frames_indices: np.ndarray) -> None:
+        self.pending.append((frames, frames_indices))
+        self.pending_frames += len(frames)
+        if self.pending_frames >= BLOCK_SAMPLES * self.sample_length:
+            self.flush()
+
+
+def create_h5py_file(output_path: str, file_paths: Union[List[pathlib.Path], List[str]],
+                     features: Iterable[np.ndarray], sample_length: int, reset_dur: Optional[int] = 0,
+                     include_indices: Optional[bool] = False) -> None:
+    # features can be a generator, the frames are written as they come. The last sample is padded (a whole padding
+    # sample is added when the frames fill the samples exactly).
+    file_mapping = []
+
+    with h5py.File(pathlib.Path(output_path), 'w') as out_file:
+        writer = _SamplesWriter(out_file, sample_length, include_indices)
+        for file, feature in zip(file_paths, features):
+            frames = feature.shape[0]
+            writer.append(feature, np.stack([np.full(frames, len(file_mapping)), np.arange(0, frames, 1)], axis=1))
+            if reset_dur > 0:
+                writer.append(np.zeros((reset_dur, feature.shape[-1])),
+                              np.stack([np.full(reset_dur, -1), np.zeros(reset_dur)], axis=1))
+            file_mapping.append(file)
+        assert file_mapping, 'No features to write'
+        writer.flush(complete=True)
+
+        if include_indices:
+            file_mapping = np.array([str(file) for file in file_mapping], dtype=h5py.special_dtype(vlen=str))
+            out_file.create_dataset('file_list', data=file_mapping)
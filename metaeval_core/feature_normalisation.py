@@ -0,0 +1,223 @@
+"""
+    Normalisation of input features with running statistics (mean and variance) accumulated per utterance, speaker,
+    corpus or globally.
+
+    The statistics are accumulated in a single streaming pass, merging the statistics of each block of frames with the
+    ones accumulated so far (Chan et al. parallel version of Welford's algorithm), and saved in a .npz file. They are
+    accumulated over h5py feature files (created without cmvn) or while the features are extracted, and applied on the
+    fly while the h5py file is written (create_normalised_h5py_file) or block by block to an existing h5py file, so the
+    memory used does not depend on the length of the recordings. The `utterance` scheme is equivalent to the cmvn
+    option of the feature extraction.
+
+    The keys of the statistics are given per file; the speaker of each file comes from the corpus (e.g., the corpus info
+    of the vowel discrimination corpora).
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['RunningStatistics', 'get_frames_keys', 'accumulate_h5py_statistics', 'normalise_h5py_file',
+           'save_statistics', 'load_statistics', 'accumulate_features_statistics', 'normalise_features',
+           'create_normalised_h5py_file']
+
+import itertools
+import pathlib
+from typing import Union, List, Optional, Tuple, Dict, Iterable, Iterator
+
+import h5py
+import numpy as np
+
+from metaeval_core.extract_acoustic_features import create_h5py_file
+
+SCHEMES = ['utterance', 'speaker', 'corpus', 'global']
+BLOCK_SAMPLES = 500
+
+
+class RunningStatistics:
+    def __init__(self, keys: List[str], n_features: int):
+        self.keys = list(keys)
+        self.counts = np.zeros(len(self.keys), dtype=np.int64)
+        self.means = np.zeros((len(self.keys), n_features))
+        self.m2 = np.zeros((len(self.keys), n_features))
+
+    def _merge_arrays(self, positions: np.ndarray, counts: np.ndarray, means: np.ndarray, m2: np.ndarray) -> None:
+        total = self.counts[positions] + counts
+        safe_total = np.maximum(total, 1)[:, None]
+        delta = means - self.means[positions]
+        self.means[positions] += delta * (counts[:, None] / safe_total)
+        self.m2[positions] += m2 + delta ** 2 * (self.counts[positions] * counts)[:, None] / safe_total
+        self.counts[positions] = total
+
+    def update(self, frames: np.ndarray, groups: np.ndarray) -> None:
+        # frames (n_frames, n_features) and groups (n_frames,) positions of their keys. Only the groups of the frames
+        # are reduced and merged, so the cost does not depend on the number of keys.
+        if len(groups) == 0:
+            return
+        positions, codes = np.unique(groups, return_inverse=True)
+        codes = codes.reshape(-1)
+        n_groups = len(positions)
+        counts = np.bincount(codes, minlength=n_groups)
+        means = np.stack([np.bincount(codes, frames[:, j], n_groups) for j in range(frames.shape[1])], axis=1)
+        means /= counts[:, None]
+        deviations = (frames - means[codes]) ** 2
+        m2 = np.stack([np.bincount(codes, deviations[:, j], n_groups) for j in range(frames.shape[1])], axis=1)
+        self._merge_arrays(positions, counts, means, m2)
+
+    def merge(self, other: 'RunningStatistics') -> None:
+        current_keys = set(self.keys)
+        new_keys = [key for key in other.keys if key not in current_keys]
+        if new_keys:
+            self.keys += new_keys
+            self.counts = np.concatenate([self.counts, np.zeros(len(new_keys), dtype=np.int64)])
+            self.means = np.concatenate([self.means, np.zeros((len(new_keys), self.means.shape[1]))])
+            self.m2 = np.concatenate([self.m2, np.zeros((len(new_keys), self.m2.shape[1]))])
+        key_positions = {key: idx for idx, key in enumerate(self.keys)}
+        positions = np.array([key_positions[key] for key in other.keys], dtype=np.int64)
+        self._merge_arrays(positions, other.counts, other.means, other.m2)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.m2 / np.maximum(self.counts, 1)[:, None])
+
+    def normalise(self, frames: np.ndarray, groups: np.ndarray) -> np.ndarray:
+        # Standard deviations of the groups of the frames only
+        positions, codes = np.unique(groups, return_inverse=True)
+        std = np.sqrt(self.m2[positions] / np.maximum(self.counts[positions], 1)[:, None])
+        return (frames - self.means[groups]) / std[codes.reshape(-1)]
+
+
+def save_statistics(statistics: RunningStatistics, scheme: str, output_path: Union[str, pathlib.Path]) -> None:
+    pathlib.Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'wb') as data_file:
+        np.savez(data_file, scheme=scheme, keys=np.array(statistics.keys, dtype=str), counts=statistics.counts,
+                 means=statistics.means, m2=statistics.m2)
+
+
+def load_statistics(statistics_path: Union[str, pathlib.Path]) -> Tuple[RunningStatistics, str]:
+    with np.load(statistics_path, allow_pickle=False) as data:
+        statistics = RunningStatistics(data['keys'].tolist(), data['means'].shape[1])
+        statistics.counts = data['counts']
+        statistics.means = data['means']
+        statistics.m2 = data['m2']
+        return statistics, str(data['scheme'])
+
+
+def get_frames_keys(file_list: List[str], scheme: str, corpus_name: Optional[str] = None,
+                    speakers: Optional[Dict[str, str]] = None) -> List[str]:
+    # Key of the statistics for each file of the h5py file, speakers maps the names of the files (without extension) to
+    # their speakers
+    assert scheme in SCHEMES
+    if scheme == 'utterance':
+        return list(file_list)
+    if scheme == 'corpus':
+        assert corpus_name
+        return [corpus_name] * len(file_list)
+    if scheme == 'global':
+        return ['global'] * len(file_list)
+    # speaker
+    assert speakers is not None, 'The speakers of the files are required for the speaker normalisation'
+    return [speakers[pathlib.Path(file_path).stem] for file_path in file_list]
+
+
+def _iter_h5py_blocks(h5_file: h5py.File, block_samples: int):
+    for start in range(0, h5_file['data'].shape[0], block_samples):
+        data = h5_file['data'][start:start + block_samples]
+        indices = h5_file['indices'][start:start + block_samples]
+        yield start, data, indices[..., 0].astype(np.int64)
+
+
+def accumulate_h5py_statistics(h5_path: Union[str, pathlib.Path], keys: List[str],
+                               statistics: Optional[RunningStatistics] = None,
+                               block_samples: Optional[int] = BLOCK_SAMPLES) -> RunningStatistics:
+    # keys are given per file of the h5py file (see get_frames_keys). Statistics of several h5py files can be
+    # accumulated by passing the statistics obtained previously.
+    unique_keys, file_groups = np.unique(np.array(keys, dtype=str), return_inverse=True)
+    file_groups = file_groups.reshape(-1)
+
+    with h5py.File(h5_path, 'r') as h5_file:
+        current = RunningStatistics(unique_keys.tolist(), h5_file['data'].shape[-1])
+        for _, data, file_ids in _iter_h5py_blocks(h5_file, block_samples):
+            valid = file_ids >= 0  # reset and padding frames are excluded
+            current.update(data[valid], file_groups[file_ids[valid]])
+
+    if statistics is None:
+        return current
+    statistics.merge(current)
+    return statistics
+
+
+def _get_key_positions(statistics: RunningStatistics, keys: List[str]) -> np.ndarray:
+    key_positions = {key: idx for idx, key in enumerate(statistics.keys)}
+    assert all(key in key_positions for key in keys), 'Keys without statistics'
+    return np.array([key_positions[key] for key in keys], dtype=np.int64)
+
+
+def normalise_h5py_file(input_path: Union[str, pathlib.Path], output_path: Union[str, pathlib.Path],
+                        statistics: RunningStatistics, keys: List[str],
+                        block_samples: Optional[int] = BLOCK_SAMPLES) -> None:
+    # Reset and padding frames keep their values (zeros). If output_path is input_path, the file is normalised in place.
+    file_groups = _get_key_positions(statistics, keys)
+
+    if pathlib.Path(output_path).resolve() == pathlib.Path(input_path).resolve():
+        with h5py.File(input_path, 'r+') as h5_file:
+            for start, data, file_ids in _iter_h5py_blocks(h5_file, block_samples):
+                valid = file_ids >= 0
+                data[valid] = statistics.normalise(data[valid], file_groups[file_ids[valid]])
+                h5_file['data'][start:start + len(data)] = data
+        return
+
+    pathlib.Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with h5py.File(input_path, 'r') as in_file, h5py.File(output_path, 'w') as out_file:
+        out_data = out_file.create_dataset('data', shape=in_file['data'].shape, dtype=in_file['data'].dtype)
+        for start, data, file_ids in _iter_h5py_blocks(in_file, block_samples):
+            valid = file_ids >= 0
+            data[valid] = statistics.normalise(data[valid], file_groups[file_ids[valid]])
+            out_data[start:start + len(data)] = data
+        for name in ['file_list', 'indices']:
+            in_file.copy(name, out_file)
+
+
+def accumulate_features_statistics(features: Iterable[np.ndarray], keys: List[str],
+                                   statistics: RunningStatistics) -> Iterator[np.ndarray]:
+    # The features of each file (in the order of keys) are passed through while their statistics are accumulated
+    file_groups = _get_key_positions(statistics, keys)
+    for file_features, group in zip(features, file_groups.tolist()):
+        statistics.update(file_features, np.full(len(file_features), group, dtype=np.int64))
+        yield file_features
+
+
+def normalise_features(features: Iterable[np.ndarray], keys: List[str],
+                       statistics: RunningStatistics) -> Iterator[np.ndarray]:
+    # The features of each file (in the order of keys) are normalised as they are generated
+    file_groups = _get_key_positions(statistics, keys)
+    for file_features, group in zip(features, file_groups.tolist()):
+        yield statistics.normalise(file_features, np.full(len(file_features), group, dtype=np.int64))
+
+
+def create_normalised_h5py_file(output_path: Union[str, pathlib.Path],
+                                file_paths: Union[List[pathlib.Path], List[str]], features: Iterable[np.ndarray],
+                                sample_length: int, reset_dur: int, keys: List[str], scheme: str,
+                                statistics_path: Optional[Union[str, pathlib.Path]] = None) -> RunningStatistics:
+    # If statistics_path exists, its statistics are applied to the features (e.g., a generator of the extraction) while
+    # the h5py file is written. Otherwise, the statistics are accumulated while the features are written, saved in
+    # statistics_path (if given) and the file is normalised in place. The memory used is the one of the features of a
+    # file plus a block of samples.
+    assert scheme in SCHEMES
+    if statistics_path and pathlib.Path(statistics_path).is_file():
+        statistics, statistics_scheme = load_statistics(statistics_path)
+        assert statistics_scheme == scheme, f'The statistics of {statistics_path} are per {statistics_scheme}'
+        create_h5py_file(output_path, file_paths, normalise_features(features, keys, statistics), sample_length,
+                         reset_dur, True)
+        return statistics
+
+    # The number of features is known from the features of the first file
+    features = iter(features)
+    first_features = next(features)
+    statistics = RunningStatistics(sorted(set(keys)), first_features.shape[-1])
+    create_h5py_file(output_path, file_paths, accumulate_features_statistics(
+        itertools.chain([first_features], features), keys, statistics), sample_length, reset_dur, True)
+    if statistics_path:
+        save_statistics(statistics, scheme, statistics_path)
+    normalise_h5py_file(output_path, output_path, statistics, keys)
+    return statistics
+
@@ -0,0 +1,42 @@
+"""
+    It reads h5py input features files and splits the frames (input features or predictions) into trials.
+
+    Frames are arranged in samples with the indices (file id, frame) of each frame; reset and padding frames have file
+    id -1.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['read_input_features', 'get_trials_list', 'get_trials_boundaries']
+
+import pathlib
+from typing import Union, Tuple, List
+
+import h5py
+import numpy as np
+
+
+def read_input_features(input_features_path: Union[str, pathlib.Path]) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    with h5py.File(input_features_path, 'r') as data_file:
+        input_data = np.array(data_file['data'])
+        file_mapping = list(data_file['file_list'])
+        indices = np.array(data_file['indices'])
+    return input_data, file_mapping, indices
+
+
+def get_trials_boundaries(indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Start and end frames of each run of consecutive frames with the same file id (excluding reset frames)
+    file_ids = indices.reshape(-1, 2)[:, 0]
+    changes = np.flatnonzero(file_ids[1:] != file_ids[:-1]) + 1
+    starts = np.concatenate([[0], changes])
+    ends = np.concatenate([changes, [len(file_ids)]])
+    selected = file_ids[starts] != -1
+    return starts[selected], ends[selected]
+
+
+def get_trials_list(features: np.ndarray, indices: np.ndarray) -> List[np.ndarray]:
+    # Trials are views of the reshaped frames matrix
+    features = features.reshape(-1, features.shape[-1])
+    starts, ends = get_trials_boundaries(indices)
+    return [features[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
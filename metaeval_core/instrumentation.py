@@ -0,0 +1,154 @@
+"""
+    Lightweight instrumentation of the pipeline stages.
+
+    A `RunReport` is opened per invocation of a script. Stages are marked with the `stage` context manager or the
+    `instrumented` decorator, which record the wall-clock time, CPU time of the process, peak resident set size (RSS)
+    of the process so far, and counts given by the stage (e.g., pairs, frames, trials). Stages can be nested; their
+    names are joined with '/'. When no report is active, stages only yield a dictionary for the counts, so the
+    instrumented code runs unchanged.
+
+    The report is saved as JSON and CSV. Optionally, each stage (or the stages listed) is profiled with cProfile and the
+    statistics are dumped to `<profile_folder>/<stage>.prof` (e.g., for snakeviz). Sampling profilers such as py-spy
+    can be attached to the process without any change, the hot loops are in named functions.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['RunReport', 'stage', 'instrumented', 'get_active_report']
+
+import contextlib
+import cProfile
+import csv
+import datetime
+import functools
+import json
+import pathlib
+import sys
+import time
+from typing import Union, Optional, List, Iterator, Callable
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_ACTIVE_REPORTS = []
+
+
+def _get_peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class RunReport:
+    def __init__(self, name: str, output_path: Optional[Union[str, pathlib.Path]] = None,
+                 profile_folder: Optional[Union[str, pathlib.Path]] = None,
+                 profile_stages: Optional[List[str]] = None):
+        self.name = name
+        self.output_path = output_path
+        self.profile_folder = profile_folder
+        self.profile_stages = profile_stages
+        self.records = []
+        self._current_stages = []
+        self._profiling = False
+        self._start = None
+        self._cpu_start = None
+        self.started = None
+        self.wall_time = None
+        self.cpu_time = None
+
+    def __enter__(self) -> 'RunReport':
+        self.started = datetime.datetime.now().isoformat(timespec='seconds')
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        _ACTIVE_REPORTS.append(self)
+        return self
+
+    def __exit__(self, *args) -> None:
+        _ACTIVE_REPORTS.remove(self)
+        self.wall_time = time.perf_counter() - self._start
+        self.cpu_time = time.process_time() - self._cpu_start
+        if self.output_path:
+            self.save(self.output_path)
+
+    def _get_profiler(self, stage_name: str) -> Optional[cProfile.Profile]:
+        # Only one profiler can be active, nested stages are included in the profile of the outer stage
+        if not self.profile_folder or self._profiling:
+            return None
+        if self.profile_stages is not None and stage_name not in self.profile_stages:
+            return None
+        return cProfile.Profile()
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **counts) -> Iterator[dict]:
+        self._current_stages.append(name)
+        stage_name = '/'.join(self._current_stages)
+        record = {'stage': stage_name, 'start': time.perf_counter() - self._start, **counts}
+        self.records.append(record)
+
+        profiler = self._get_profiler(stage_name)
+        if profiler:
+            self._profiling = True
+            profiler.enable()
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_time'] = time.perf_counter() - start
+            record['cpu_time'] = time.process_time() - cpu_start
+            record['peak_rss_mb'] = _get_peak_rss_mb()
+            if profiler:
+                profiler.disable()
+                self._profiling = False
+                profile_path = pathlib.Path(self.profile_folder).joinpath(f'{stage_name.replace("/", "__")}.prof')
+                profile_path.parent.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(str(profile_path))
+            self._current_stages.pop()
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'started': self.started, 'wall_time': self.wall_time, 'cpu_time': self.cpu_time,
+                'peak_rss_mb': _get_peak_rss_mb(), 'stages': self.records}
+
+    def save(self, output_path: Union[str, pathlib.Path]) -> None:
+        # JSON report in output_path and the table of stages in a csv file with the same name
+        output_path = pathlib.Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w') as json_file:
+            json.dump(self.to_dict(), json_file, indent=2)
+
+        fields = ['stage', 'start', 'wall_time', 'cpu_time', 'peak_rss_mb']
+        fields += sorted(set(key for record in self.records for key in record.keys()).difference(fields))
+        with open(output_path.with_suffix('.csv'), 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=fields, delimiter=';')
+            writer.writeheader()
+            writer.writerows(self.records)
+
+
+def get_active_report() -> Optional[RunReport]:
+    return _ACTIVE_REPORTS[-1] if _ACTIVE_REPORTS else None
+
+
+@contextlib.contextmanager
+def stage(name: str, **counts) -> Iterator[dict]:
+    # The dictionary yielded can be updated with counts known at the end of the stage
+    report = get_active_report()
+    if report is None:
+        yield dict(counts)
+        return
+    with report.stage(name, **counts) as record:
+        yield record
+
+
+def instrumented(name: Optional[str] = None) -> Callable:
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name if name else function.__name__):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,127 @@
+"""
+    Bootstrap and permutation intervals of the effect size (Hedges' g) per contrast, by resampling precomputed
+    distances (no DTW recomputation).
+
+    The distances of all contrasts are given as one array plus offsets (same/different segments per contrast, as in
+    metaeval_core.effect_sizes). Pairs share trials, so they are not independent: the bootstrap resamples clusters
+    (trials or speakers) with replacement, and each pair is weighted by the product of the multiplicities of its two
+    trials. The permutation test shuffles the condition labels of the pairs within each contrast. Resamples are
+    processed in batches of weight/index matrices, the batches are seeded from a single seed and can be distributed
+    over a process pool; the results do not depend on the number of processes.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['get_weighted_hedges_g', 'get_bootstrap_intervals', 'get_permutation_intervals']
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Callable
+
+import numpy as np
+
+from metaeval_core.effect_sizes import get_contrasts_statistics, get_effect_sizes
+
+# Data shared by the workers of the process pool, set once per worker by the initializer
+_SHARED = {}
+
+
+def _set_shared_data(values: np.ndarray, offsets: np.ndarray, pairs: Optional[np.ndarray],
+                     clusters: Optional[np.ndarray], ddof: int) -> None:
+    _SHARED.update(values=values, offsets=offsets, pairs=pairs, clusters=clusters, ddof=ddof)
+
+
+def _segment_sums(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    # Sums along the last axis of a (resamples, values) matrix, empty segments sum to zero
+    counts = np.diff(offsets)
+    sums = np.zeros((values.shape[0], len(counts)))
+    non_empty = counts > 0
+    if np.any(non_empty):
+        sums[:, non_empty] = np.add.reduceat(values, offsets[:-1][non_empty], axis=1)
+    return sums
+
+
+def get_weighted_hedges_g(values: np.ndarray, offsets: np.ndarray, weights: Optional[np.ndarray] = None,
+                          ddof: Optional[int] = 0) -> np.ndarray:
+    # Hedges' g per contrast for each row of values (resamples x values). Weights are frequency weights (e.g.,
+    # multiplicities of a bootstrap resample), so the sample size of a segment is the sum of its weights.
+    if weights is None:
+        weights = np.ones(values.shape)
+    counts = _segment_sums(weights, offsets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = _segment_sums(weights * values, offsets) / counts
+        deviations = values - np.repeat(means, np.diff(offsets), axis=1)
+        stds = np.sqrt(_segment_sums(weights * deviations ** 2, offsets) / (counts - ddof))
+    _, g = get_effect_sizes(counts[:, 1::2], counts[:, 0::2], means[:, 1::2], means[:, 0::2], stds[:, 1::2],
+                            stds[:, 0::2])
+    return g
+
+
+def _bootstrap_batch(seed: np.random.SeedSequence, n_resamples: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    clusters, pairs = _SHARED['clusters'], _SHARED['pairs']
+    n_clusters = int(clusters.max()) + 1
+    # Multiplicity of each cluster in each resample, and the weight of each pair is the product of the
+    # multiplicities of its trials
+    cluster_counts = rng.multinomial(n_clusters, np.full(n_clusters, 1 / n_clusters), size=n_resamples)
+    trial_counts = cluster_counts[:, clusters].astype(np.float64)
+    weights = trial_counts[:, pairs[:, 0]] * trial_counts[:, pairs[:, 1]]
+    values = np.broadcast_to(_SHARED['values'], weights.shape)
+    return get_weighted_hedges_g(values, _SHARED['offsets'], weights, _SHARED['ddof'])
+
+
+def _permutation_batch(seed: np.random.SeedSequence, n_resamples: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    values, offsets = _SHARED['values'], _SHARED['offsets']
+    # Random keys shifted by the contrast index, so sorting shuffles the values within each contrast only. The
+    # permuted values keep the segment sizes, hence the same offsets apply.
+    contrasts = np.repeat(np.arange(len(offsets) - 1) // 2, np.diff(offsets))
+    keys = rng.random((n_resamples, len(values))) + contrasts
+    permuted_values = values[np.argsort(keys, axis=1)]
+    return get_weighted_hedges_g(permuted_values, offsets, ddof=_SHARED['ddof'])
+
+
+def _run_batches(batch_function: Callable, n_resamples: int, seed: int, n_jobs: int, batch_size: int,
+                 shared_data: tuple) -> np.ndarray:
+    n_batches = int(np.ceil(n_resamples / batch_size))
+    seeds = np.random.SeedSequence(seed).spawn(n_batches)
+    sizes = [min(batch_size, n_resamples - idx * batch_size) for idx in range(n_batches)]
+
+    if n_jobs == 1:
+        _set_shared_data(*shared_data)
+        return np.concatenate([batch_function(batch_seed, size) for batch_seed, size in zip(seeds, sizes)])
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_set_shared_data, initargs=shared_data) as executor:
+        return np.concatenate(list(executor.map(batch_function, seeds, sizes)))
+
+
+def get_bootstrap_intervals(values: np.ndarray, offsets: np.ndarray, pairs: np.ndarray,
+                            clusters: Optional[np.ndarray] = None, n_resamples: Optional[int] = 1000,
+                            alpha: Optional[float] = 0.05, seed: Optional[int] = 0, n_jobs: Optional[int] = 1,
+                            batch_size: Optional[int] = 100, ddof: Optional[int] = 0) -> dict:
+    # Percentile cluster bootstrap. pairs are the trial ids of each distance, clusters the cluster id of each trial
+    # (e.g., speaker). By default each trial is a cluster.
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    assert len(pairs) == len(values)
+    if clusters is None:
+        clusters = np.arange(int(pairs.max()) + 1 if len(pairs) else 0)
+    clusters = np.unique(np.asarray(clusters), return_inverse=True)[1]
+
+    resamples = _run_batches(_bootstrap_batch, n_resamples, seed, n_jobs, batch_size,
+                             (values, offsets, pairs, clusters, ddof))
+    lower, upper = np.nanpercentile(resamples, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    return {'g': get_contrasts_statistics(values, offsets, ddof)['g'], 'se': np.nanstd(resamples, axis=0, ddof=1),
+            'ci_lb': lower, 'ci_ub': upper}
+
+
+def get_permutation_intervals(values: np.ndarray, offsets: np.ndarray, n_resamples: Optional[int] = 1000,
+                              alpha: Optional[float] = 0.05, seed: Optional[int] = 0, n_jobs: Optional[int] = 1,
+                              batch_size: Optional[int] = 100, ddof: Optional[int] = 0) -> dict:
+    # Null distribution of g per contrast (same/different labels exchangeable): central interval and two-sided
+    # p-value of the observed g
+    resamples = _run_batches(_permutation_batch, n_resamples, seed, n_jobs, batch_size,
+                             (values, offsets, None, None, ddof))
+    g = get_contrasts_statistics(values, offsets, ddof)['g']
+    lower, upper = np.nanpercentile(resamples, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    p_value = (np.sum(np.abs(resamples) >= np.abs(g), axis=0) + 1) / (n_resamples + 1)
+    return {'g': g, 'null_lb': lower, 'null_ub': upper, 'p_value': p_value}
@@ -0,0 +1,57 @@
+"""
+    Checkpoints of a model's developmental trajectory and the trajectory tables, shared by the IDS preference and
+    vowel discrimination experiments.
+
+    Checkpoints are the numbered folders of a model's results (`<results_folder>/<step>/...`). As in the R scripts
+    (obtain_dev_trajectories.R), steps below MAX_EPOCH_STEP are epochs (100 h of speech) and the others batches (10 h
+    of speech); the tables have the columns of apc_large_results_*.csv (age, d, significant, checkpoint, capability)
+    and are written in the format of write_csv in R.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['get_checkpoint_steps', 'get_checkpoints_ages', 'format_r_value', 'write_trajectory_csv']
+
+import csv
+import pathlib
+from typing import Union, List, Tuple
+
+import numpy as np
+
+TRAJECTORY_COLUMNS = ['age', 'd', 'significant', 'checkpoint', 'capability']
+MAX_EPOCH_STEP = 19
+
+
+def get_checkpoint_steps(results_folder: Union[str, pathlib.Path]) -> Tuple[List[int], int, int]:
+    # Steps of the checkpoints folders: batches (step 0 included) first and then epochs, both in increasing order
+    steps = sorted(int(folder.name) for folder in pathlib.Path(results_folder).iterdir()
+                   if folder.is_dir() and folder.name.isdigit())
+    batch_steps = [step for step in steps if step == 0 or step >= MAX_EPOCH_STEP]
+    epoch_steps = [step for step in steps if 0 < step < MAX_EPOCH_STEP]
+    return batch_steps + epoch_steps, len(batch_steps), len(epoch_steps)
+
+
+def get_checkpoints_ages(batch_steps: int, epoch_steps: int, batch_age: float,
+                         epoch_age: float) -> Tuple[np.ndarray, List[str]]:
+    # Simulated age (months) and type of each checkpoint. The first checkpoint (untrained model) is labelled as epoch.
+    ages = np.concatenate([np.arange(batch_steps) * batch_age, np.arange(1, epoch_steps + 1) * epoch_age])
+    labels = (['epoch'] + ['batch'] * (batch_steps - 1))[:batch_steps] + ['epoch'] * epoch_steps
+    return ages, labels
+
+
+def format_r_value(value) -> str:
+    # Same format as write_csv in R for logical and numeric values
+    if isinstance(value, (bool, np.bool_)):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (float, np.floating)):
+        return 'NA' if np.isnan(value) else f'{value:.15g}'
+    return str(value)
+
+
+def write_trajectory_csv(output_csv_path: Union[str, pathlib.Path], columns: List[str], rows: List[list]) -> None:
+    pathlib.Path(output_csv_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_csv_path, 'w', newline='') as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(columns)
+        writer.writerows([[format_r_value(value) for value in row] for row in rows])
@@ -0,0 +1,406 @@
+"""
+    Local multi-process scheduler for the corpus x feature type x checkpoint grid of the experiments.
+
+    A grid specification (JSON) is expanded into jobs: input features per corpus (create_input_features, only when the
+    audio of the corpus is given), inference per checkpoint and corpus (calculate_pc_predictions), vowel
+    discrimination test per checkpoint, corpus and test type (test_vowel_discrimination, DTW distances and statistics)
+    and attentional preference scores per checkpoint (obtain_attentional_scores). The outputs follow the
+    layout used by the R scripts: `<output_folder>/<model_type>/<checkpoint>/vowel_disc/dtw_distances_hc_native.csv`,
+    `<output_folder>/<model_type>/<checkpoint>/ids/attentional_preference_scores.csv`, etc.
+
+    {"output_folder": "test_results_large_apc", "model_type": "apc",
+     "checkpoints": {"0": "models/apc_0.h5", "1": "models/apc_1.h5"},
+     "vowel_discrimination": {"hc": {"input_features_path": "hc/input_features.h5",
+                                     "corpus_info_path": "hc/corpus_info.npz", "audio_path": "hc/audio",
+                                     "cmvn": false}},
+     "ids_preference": {"input_features_path": "ids/input_features.h5", "trials_path": "ids/trials"},
+     "memory_gb": {"features": 4, "inference": 8, "vowel_test": 4, "ids": 8}, "retries": 2}
+
+    Besides the command, each job lists its input files, parameters and code (source files or folders of the
+    repository), which the pipeline uses to rebuild only what changed.
+
+    Relative paths are relative to the grid file. The queue is a folder (`jobs/<job_id>.json`, `state/`, `logs/`) and a
+    job is claimed by creating its lock file with O_CREAT | O_EXCL, so several nodes sharing the filesystem can run
+    workers on the same queue. Workers refresh their locks while the jobs run, locks of dead processes (same node) or
+    not refreshed within lock_timeout seconds are broken. Jobs run when their dependencies are done, in dependency
+    order, while the memory estimates of the running jobs fit in max_memory_gb. Failed jobs are retried.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['expand_grid', 'submit_jobs', 'set_jobs_done', 'get_queue_status', 'run_worker']
+
+import argparse
+import json
+import os
+import pathlib
+import socket
+import subprocess
+import sys
+import time
+from typing import Union, List, Optional, Dict
+
+REPOSITORY_PATH = pathlib.Path(__file__).resolve().parents[1]
+VOWEL_PATH = REPOSITORY_PATH.joinpath('vowel_discrimination')
+IDS_PATH = REPOSITORY_PATH.joinpath('ids_preference', 'pc_attentional_score_calculation')
+# Test types run per corpus (only the Isolated Vowels Corpus has non native contrasts)
+VOWEL_TESTS = {'hc': ['basic'], 'oc': ['basic'], 'ivc': ['basic', 'basic_non_native']}
+TESTS_NAMES = {'basic': 'native', 'basic_non_native': 'non_native'}
+DEFAULT_MEMORY_GB = {'features': 4, 'inference': 8, 'vowel_test': 4, 'ids': 8}
+# Source code (relative to the repository) used by the jobs of each stage, including the modules imported by their
+# scripts (e.g., the fused inference of the vowel test)
+STAGES_CODE = {
+    'features_vowel': ['vowel_discrimination/corpus_processing', 'metaeval_core'],
+    'features_ids': ['ids_preference/trial_processing', 'metaeval_core'],
+    'inference': ['vowel_discrimination/pc_predictions_calculation',
+                  'vowel_discrimination/evaluation_protocol/io_module', 'metaeval_core'],
+    'vowel_test': ['vowel_discrimination/evaluation_protocol', 'vowel_discrimination/pc_predictions_calculation',
+                   'vowel_discrimination/corpus_processing/corpus_info_store.py', 'metaeval_core'],
+    'ids': ['ids_preference/pc_attentional_score_calculation', 'metaeval_core']
+}
+DEFAULT_RETRIES = 2
+STATES = ['done', 'failed', 'running', 'ready', 'waiting', 'blocked']
+
+
+def _get_job(job_id: str, command: List[str], cwd: pathlib.Path, dependencies: List[str], memory_gb: float,
+             retries: int, outputs: List[str], inputs: Optional[List[str]] = None, params: Optional[dict] = None,
+             code: Optional[List[str]] = None) -> dict:
+    # Modules are imported relative to the working directory (e.g., trial_processing), the vowel_discrimination folder
+    # and the main folder of the repository (metaeval_core)
+    python_path = list(dict.fromkeys([str(cwd), str(VOWEL_PATH), str(REPOSITORY_PATH)]))
+    return {'id': job_id, 'command': command, 'cwd': str(cwd), 'python_path': python_path,
+            'dependencies': dependencies, 'memory_gb': memory_gb, 'retries': retries, 'outputs': outputs,
+            'inputs': inputs if inputs else [], 'params': params if params else {}, 'code': code if code else []}
+
+
+def expand_grid(grid_path: Union[str, pathlib.Path]) -> List[dict]:
+    grid_path = pathlib.Path(grid_path).resolve()
+    with open(grid_path) as grid_file:
+        grid = json.load(grid_file)
+    assert {'output_folder', 'model_type', 'checkpoints'}.issubset(set(grid.keys()))
+    assert grid['model_type'] in ['apc', 'cpc']
+    assert isinstance(grid['checkpoints'], dict)
+
+    def path(value: str) -> str:
+        return str(grid_path.parent.joinpath(value))
+
+    memory_gb = {**DEFAULT_MEMORY_GB, **grid.get('memory_gb', {})}
+    retries = grid.get('retries', DEFAULT_RETRIES)
+    model_type = grid['model_type']
+    corpora = grid.get('vowel_discrimination', {})
+    assert set(corpora.keys()).issubset(set(VOWEL_TESTS.keys()))
+
+    jobs = []
+    features_jobs = {}
+    for corpus, corpus_paths in corpora.items():
+        assert {'input_features_path', 'corpus_info_path'}.issubset(set(corpus_paths.keys()))
+        if 'audio_path' in corpus_paths:
+            features_path = path(corpus_paths['input_features_path'])
+            command = [sys.executable, 'corpus_processing/create_input_features.py', '--corpus', corpus,
+                       '--audio_path', path(corpus_paths['audio_path']), '--output_path', features_path,
+                       '--corpus_info_path', path(corpus_paths['corpus_info_path']),
+                       '--cmvn' if corpus_paths.get('cmvn', False) else '--no-cmvn']
+            features_jobs[corpus] = f'features_{corpus}'
+            jobs.append(_get_job(features_jobs[corpus], command, VOWEL_PATH, [], memory_gb['features'], retries,
+                                 [features_path], [path(corpus_paths['audio_path']),
+                                                   path(corpus_paths['corpus_info_path'])],
+                                 {'corpus': corpus, 'cmvn': corpus_paths.get('cmvn', False)},
+                                 STAGES_CODE['features_vowel']))
+    if 'trials_path' in grid.get('ids_preference', {}):
+        ids_paths = grid['ids_preference']
+        command = [sys.executable, 'trial_processing/create_input_features.py', '--trials_path',
+                   path(ids_paths['trials_path']), '--output_path', path(ids_paths['input_features_path']),
+                   '--cmvn' if ids_paths.get('cmvn', False) else '--no-cmvn']
+        features_jobs['ids'] = 'features_ids'
+        jobs.append(_get_job('features_ids', command, REPOSITORY_PATH.joinpath('ids_preference'), [],
+                             memory_gb['features'], retries, [path(ids_paths['input_features_path'])],
+                             [path(ids_paths['trials_path'])], {'cmvn': ids_paths.get('cmvn', False)},
+                             STAGES_CODE['features_ids']))
+
+    for checkpoint, model_path in grid['checkpoints'].items():
+        checkpoint_folder = pathlib.Path(path(grid['output_folder'])).joinpath(model_type, str(checkpoint))
+        for corpus, corpus_paths in corpora.items():
+            features_path = path(corpus_paths['input_features_path'])
+            predictions_path = str(checkpoint_folder.joinpath('predictions', f'{model_type}_{corpus}.h5'))
+            inference_id = f'{checkpoint}_inference_{corpus}'
+            jobs.append(_get_job(inference_id,
+                                 [sys.executable, 'pc_predictions_calculation/calculate_pc_predictions.py',
+                                  '--input_features_path', features_path,
+                                  '--output_path', predictions_path, '--model_path', path(model_path),
+                                  '--pc_model', model_type],
+                                 VOWEL_PATH, [features_jobs[corpus]] if corpus in features_jobs else [],
+                                 memory_gb['inference'], retries, [predictions_path],
+                                 [features_path, path(model_path)], {'model_type': model_type},
+                                 STAGES_CODE['inference']))
+
+            for test_type in VOWEL_TESTS[corpus]:
+                test_name = f'{corpus}_{TESTS_NAMES[test_type]}'
+                vowel_folder = checkpoint_folder.joinpath('vowel_disc')
+                config_path = vowel_folder.joinpath(f'config_{test_name}.json')
+                config = {'input_features_path': path(corpus_paths['input_features_path']),
+                          'corpus_info_path': path(corpus_paths['corpus_info_path']),
+                          'predictions_path': predictions_path, 'corpus': corpus, 'type': test_type,
+                          'dtw_distances_csv_files': {
+                              model_type: str(vowel_folder.joinpath(f'dtw_distances_{test_name}.csv'))},
+                          'output_csv_path': str(vowel_folder.joinpath(f'statistics_{test_name}.csv')),
+                          'feature_types': [model_type]}
+                jobs.append(_get_job(f'{checkpoint}_vowel_{test_name}',
+                                     [sys.executable, 'evaluation_protocol/tests_setup/test_vowel_discrimination.py',
+                                      '--config', str(config_path)],
+                                     VOWEL_PATH, [inference_id], memory_gb['vowel_test'], retries,
+                                     [config['dtw_distances_csv_files'][model_type], config['output_csv_path']],
+                                     [features_path, path(corpus_paths['corpus_info_path']), predictions_path],
+                                     config, STAGES_CODE['vowel_test']))
+                jobs[-1]['config'] = {'path': str(config_path), 'content': config}
+
+        if 'ids_preference' in grid:
+            features_path = path(grid['ids_preference']['input_features_path'])
+            output_csv_path = str(checkpoint_folder.joinpath('ids', 'attentional_preference_scores.csv'))
+            jobs.append(_get_job(f'{checkpoint}_ids',
+                                 [sys.executable, 'obtain_attentional_scores.py', '--model_path', path(model_path),
+                                  '--input_path', features_path, '--output_csv_path', output_csv_path,
+                                  '--model_type', model_type],
+                                 IDS_PATH, [features_jobs['ids']] if 'ids' in features_jobs else [], memory_gb['ids'],
+                                 retries, [output_csv_path], [features_path, path(model_path)],
+                                 {'model_type': model_type}, STAGES_CODE['ids']))
+    return jobs
+
+
+def _sort_jobs(jobs: List[dict]) -> List[dict]:
+    # Dependency (topological) order, keeping the order of the grid otherwise
+    jobs_by_id = {job['id']: job for job in jobs}
+    ordered, visited = [], set()
+
+    def visit(job_id: str, path: tuple) -> None:
+        assert job_id not in path, f'Dependency cycle: {path + (job_id,)}'
+        if job_id in visited:
+            return
+        for dependency in jobs_by_id[job_id]['dependencies']:
+            assert dependency in jobs_by_id, f'Unknown dependency {dependency} of {job_id}'
+            visit(dependency, path + (job_id,))
+        visited.add(job_id)
+        ordered.append(jobs_by_id[job_id])
+
+    for job in jobs:
+        visit(job['id'], ())
+    return ordered
+
+
+def _write_json(path: pathlib.Path, content: Union[dict, list]) -> None:
+    # Atomic replacement, readers on other nodes never see partial files
+    tmp_path = path.with_name(f'{path.name}.{socket.gethostname()}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w') as json_file:
+        json.dump(content, json_file, indent=1)
+    os.replace(tmp_path, path)
+
+
+def submit_jobs(jobs: List[dict], queue_folder: Union[str, pathlib.Path]) -> None:
+    # Jobs already in the queue are replaced, their state (done, attempts) is kept
+    queue_folder = pathlib.Path(queue_folder)
+    for folder in ['jobs', 'state', 'logs']:
+        queue_folder.joinpath(folder).mkdir(parents=True, exist_ok=True)
+    jobs = _sort_jobs(jobs)
+    for position, job in enumerate(jobs):
+        _write_json(queue_folder.joinpath('jobs', f'{job["id"]}.json'), {**job, 'position': position})
+
+
+def set_jobs_done(queue_folder: Union[str, pathlib.Path], job_ids: List[str], done: bool) -> None:
+    # Marks jobs as done (e.g., their outputs are up to date) or clears their state so they run again
+    queue_folder = pathlib.Path(queue_folder)
+    for job_id in job_ids:
+        if done:
+            _write_json(_state_path(queue_folder, job_id, 'done'), {'time': time.time(), 'host': socket.gethostname()})
+        else:
+            for suffix in ['done', 'failed', 'attempts']:
+                if _state_path(queue_folder, job_id, suffix).is_file():
+                    _state_path(queue_folder, job_id, suffix).unlink()
+
+
+def _read_jobs(queue_folder: pathlib.Path) -> List[dict]:
+    jobs = []
+    for job_path in queue_folder.joinpath('jobs').glob('*.json'):
+        with open(job_path) as job_file:
+            jobs.append(json.load(job_file))
+    return _sort_jobs(sorted(jobs, key=lambda job: (job['position'], job['id'])))
+
+
+def _state_path(queue_folder: pathlib.Path, job_id: str, suffix: str) -> pathlib.Path:
+    return queue_folder.joinpath('state', f'{job_id}.{suffix}')
+
+
+def _get_attempts(queue_folder: pathlib.Path, job_id: str) -> int:
+    attempts_path = _state_path(queue_folder, job_id, 'attempts')
+    return int(attempts_path.read_text()) if attempts_path.is_file() else 0
+
+
+def _get_states(queue_folder: pathlib.Path, jobs: List[dict]) -> Dict[str, str]:
+    states = {}
+    for job in jobs:  # dependency order
+        job_id = job['id']
+        if _state_path(queue_folder, job_id, 'done').is_file():
+            states[job_id] = 'done'
+        elif _state_path(queue_folder, job_id, 'failed').is_file():
+            states[job_id] = 'failed'
+        elif _state_path(queue_folder, job_id, 'lock').is_file():
+            states[job_id] = 'running'
+        elif any(states.get(dependency) in ['failed', 'blocked'] for dependency in job['dependencies']):
+            states[job_id] = 'blocked'
+        elif all(states.get(dependency) == 'done' for dependency in job['dependencies']):
+            states[job_id] = 'ready'
+        else:
+            states[job_id] = 'waiting'
+    return states
+
+
+def get_queue_status(queue_folder: Union[str, pathlib.Path]) -> Dict[str, int]:
+    queue_folder = pathlib.Path(queue_folder)
+    states = list(_get_states(queue_folder, _read_jobs(queue_folder)).values())
+    return {state: states.count(state) for state in STATES}
+
+
+def _try_lock(lock_path: pathlib.Path) -> bool:
+    try:
+        lock_file = os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(lock_file, 'w') as lock:
+        json.dump({'host': socket.gethostname(), 'pid': os.getpid(), 'time': time.time()}, lock)
+    return True
+
+
+def _is_stale_lock(lock_path: pathlib.Path, lock_timeout: float) -> bool:
+    try:
+        modified = lock_path.stat().st_mtime
+        with open(lock_path) as lock_file:
+            owner = json.load(lock_file)
+    except (OSError, ValueError):  # removed meanwhile or being written
+        return False
+    if time.time() - modified > lock_timeout:
+        return True
+    if owner['host'] == socket.gethostname() and owner['pid'] != os.getpid():
+        try:
+            os.kill(owner['pid'], 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            return False
+    return False
+
+
+def _finish_job(queue_folder: pathlib.Path, job: dict, return_code: int) -> None:
+    # Called by the lock holder only
+    job_id = job['id']
+    if return_code == 0:
+        _write_json(_state_path(queue_folder, job_id, 'done'), {'time': time.time(), 'host': socket.gethostname()})
+    else:
+        attempts = _get_attempts(queue_folder, job_id) + 1
+        _state_path(queue_folder, job_id, 'attempts').write_text(str(attempts))
+        if attempts > job['retries']:
+            _write_json(_state_path(queue_folder, job_id, 'failed'), {'time': time.time(), 'return_code': return_code,
+                                                                       'attempts': attempts})
+    _state_path(queue_folder, job_id, 'lock').unlink()
+
+
+def _start_job(queue_folder: pathlib.Path, job: dict) -> subprocess.Popen:
+    if 'config' in job:
+        config_path = pathlib.Path(job['config']['path'])
+        config_path.parent.mkdir(parents=True, exist_ok=True)
+        _write_json(config_path, job['config']['content'])
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(job['python_path'] + ([environment['PYTHONPATH']]
+                                                                      if environment.get('PYTHONPATH') else []))
+    log_file = open(queue_folder.joinpath('logs', f'{job["id"]}.log'), 'a')
+    log_file.write(f'\n# {time.strftime("%Y-%m-%d %H:%M:%S")} {socket.gethostname()} {" ".join(job["command"])}\n')
+    log_file.flush()
+    process = subprocess.Popen(job['command'], cwd=job['cwd'], env=environment, stdout=log_file,
+                               stderr=subprocess.STDOUT)
+    log_file.close()
+    return process
+
+
+def _get_total_memory_gb() -> float:
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024 ** 3
+
+
+def run_worker(queue_folder: Union[str, pathlib.Path], n_workers: Optional[int] = 1,
+               max_memory_gb: Optional[float] = None, lock_timeout: Optional[float] = 600,
+               poll_interval: Optional[float] = 5) -> Dict[str, int]:
+    # Runs jobs of the queue until all of them are done, failed or blocked by failed dependencies. A job larger than
+    # max_memory_gb runs alone.
+    queue_folder = pathlib.Path(queue_folder)
+    max_memory_gb = max_memory_gb if max_memory_gb else _get_total_memory_gb()
+    running = {}
+    last_summary = None
+    try:
+        while True:
+            jobs = _read_jobs(queue_folder)
+            jobs_by_id = {job['id']: job for job in jobs}
+            for job_id, process in list(running.items()):
+                if process.poll() is not None:
+                    _finish_job(queue_folder, jobs_by_id[job_id], process.returncode)
+                    del running[job_id]
+                else:  # heartbeat
+                    os.utime(_state_path(queue_folder, job_id, 'lock'))
+
+            states = _get_states(queue_folder, jobs)
+            for job_id, state in states.items():
+                lock_path = _state_path(queue_folder, job_id, 'lock')
+                if state == 'running' and job_id not in running and _is_stale_lock(lock_path, lock_timeout):
+                    print(f'Breaking stale lock of {job_id}')
+                    lock_path.unlink()
+                    states = _get_states(queue_folder, jobs)
+
+            for job in jobs:
+                memory_gb = sum(jobs_by_id[job_id]['memory_gb'] for job_id in running)
+                if len(running) >= n_workers:
+                    break
+                if states[job['id']] != 'ready' or (running and memory_gb + job['memory_gb'] > max_memory_gb):
+                    continue
+                lock_path = _state_path(queue_folder, job['id'], 'lock')
+                if _try_lock(lock_path):
+                    # The job may have been finished by another worker since the states were read
+                    if _state_path(queue_folder, job['id'], 'done').is_file() or \
+                            _state_path(queue_folder, job['id'], 'failed').is_file():
+                        lock_path.unlink()
+                        continue
+                    running[job['id']] = _start_job(queue_folder, job)
+                    states[job['id']] = 'running'
+
+            summary = {state: list(states.values()).count(state) for state in STATES}
+            if summary != last_summary:
+                print(', '.join(f'{count} {state}' for state, count in summary.items()), flush=True)
+                last_summary = summary
+            if not running and summary['running'] == summary['ready'] == summary['waiting'] == 0:
+                return summary
+            time.sleep(poll_interval)
+    finally:
+        for job_id, process in running.items():  # interrupted
+            process.terminate()
+            process.wait()
+            _state_path(queue_folder, job_id, 'lock').unlink()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to run the jobs of an experiments grid (inference, DTW '
+                                                 'distances per corpus, attentional scores) on a local pool of '
+                                                 'workers with a file-based queue.\nUsage: python job_scheduler.py '
+                                                 '--queue_folder path_queue_folder [--grid path_json_grid] '
+                                                 '[--n_workers processes] [--max_memory_gb memory] '
+                                                 '[--lock_timeout seconds] [--status] [--submit_only]')
+    parser.add_argument('--queue_folder', type=str, required=True)
+    parser.add_argument('--grid', type=str)
+    parser.add_argument('--n_workers', type=int, default=1)
+    parser.add_argument('--max_memory_gb', type=float)
+    parser.add_argument('--lock_timeout', type=float, default=600)
+    parser.add_argument('--status', action='store_true')
+    parser.add_argument('--submit_only', action='store_true')
+    args = parser.parse_args()
+
+    if args.grid:
+        submit_jobs(expand_grid(args.grid), args.queue_folder)
+    if args.status:
+        print(json.dumps(get_queue_status(args.queue_folder), indent=1))
+    elif not args.submit_only:
+        final_summary = run_worker(args.queue_folder, args.n_workers, args.max_memory_gb, args.lock_timeout)
+        sys.exit(1 if final_summary['failed'] or final_summary['blocked'] else 0)
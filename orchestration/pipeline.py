@@ -0,0 +1,222 @@
+"""
+    Incremental pipeline over the jobs of an experiments grid (see job_scheduler): features, inference, vowel
+    discrimination tests and attentional scores.
+
+    When a job succeeds, a manifest with the hashes of its inputs (files or folders), parameters and code (the source
+    files of its stage) and the size and modification time of its outputs is saved in `<output_folder>/.pipeline`. A job
+    is rebuilt only when it has no manifest, its parameters or code changed, an input changed (content hash, which is
+    only recomputed when the size or modification time differ), an output is missing or was modified, or a job it
+    depends on is rebuilt. Hence, changing the contrasts (test code) reruns the tests but not the features or the
+    inference, and a new checkpoint only runs its own jobs. The outputs of a job are removed before it runs again, so
+    that scripts which reuse existing outputs (e.g., the distances files of the vowel discrimination test) recompute
+    them.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['hash_path', 'get_code_hash', 'plan_pipeline', 'run_pipeline']
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+from typing import Union, List, Optional, Dict, Tuple
+
+from job_scheduler import REPOSITORY_PATH, expand_grid, submit_jobs, set_jobs_done, run_worker
+
+PIPELINE_PATH = pathlib.Path(__file__).resolve()
+MANIFESTS_FOLDER = '.pipeline'
+CODE_SUFFIXES = ['.py', '.R', '.json']
+CHUNK_SIZE = 1 << 20
+
+
+def _get_files(path: pathlib.Path, suffixes: Optional[List[str]] = None) -> List[pathlib.Path]:
+    if path.is_file():
+        return [path]
+    files = sorted(file_path for file_path in path.rglob('*') if file_path.is_file() and
+                   '__pycache__' not in file_path.parts)
+    return [file_path for file_path in files if suffixes is None or file_path.suffix in suffixes]
+
+
+def hash_path(path: Union[str, pathlib.Path], suffixes: Optional[List[str]] = None) -> str:
+    # Content of a file, or relative names and contents of the files of a folder
+    path = pathlib.Path(path)
+    digest = hashlib.sha256()
+    for file_path in _get_files(path, suffixes):
+        digest.update(str(file_path.relative_to(path) if path.is_dir() else '').encode())
+        with open(file_path, 'rb') as input_file:
+            for chunk in iter(lambda: input_file.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _get_stat(path: Union[str, pathlib.Path]) -> Optional[List[int]]:
+    # Size and modification time (ns) of a file, number of files, total size and last modification of a folder
+    path = pathlib.Path(path)
+    if not path.exists():
+        return None
+    stats = [file_path.stat() for file_path in _get_files(path)]
+    if path.is_file():
+        return [stats[0].st_size, stats[0].st_mtime_ns]
+    return [len(stats), sum(stat.st_size for stat in stats), max([stat.st_mtime_ns for stat in stats], default=0)]
+
+
+def get_code_hash(code: List[str]) -> str:
+    digest = hashlib.sha256()
+    for code_path in sorted(code):
+        digest.update(code_path.encode())
+        digest.update(hash_path(REPOSITORY_PATH.joinpath(code_path), CODE_SUFFIXES).encode())
+    return digest.hexdigest()
+
+
+def _get_params_hash(params: dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def _read_manifest(manifest_path: pathlib.Path) -> Optional[dict]:
+    if not manifest_path.is_file():
+        return None
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def _get_input_record(input_path: str, previous: Optional[dict]) -> Optional[dict]:
+    # The hash of the previous record is kept when the size and modification time have not changed
+    stat = _get_stat(input_path)
+    if stat is None:
+        return None
+    if previous is not None and previous['stat'] == stat:
+        return previous
+    return {'stat': stat, 'hash': hash_path(input_path)}
+
+
+def _get_stale_reason(job: dict, manifest: Optional[dict], code_hash: str) -> Optional[str]:
+    if manifest is None:
+        return 'no manifest'
+    if manifest['code'] != code_hash:
+        return 'code changed'
+    if manifest['params'] != _get_params_hash(job['params']):
+        return 'parameters changed'
+    for output_path in job['outputs']:
+        if _get_stat(output_path) != manifest['outputs'].get(output_path):
+            return f'output missing or modified: {output_path}'
+    for input_path in job['inputs']:
+        previous = manifest['inputs'].get(input_path)
+        record = _get_input_record(input_path, previous)
+        if previous is None or record is None or record['hash'] != previous['hash']:
+            return f'input changed: {input_path}'
+    return None
+
+
+def plan_pipeline(jobs: List[dict], manifests_folder: Union[str, pathlib.Path]) -> Dict[str, str]:
+    # Jobs to rebuild (in dependency order) and the reason
+    manifests_folder = pathlib.Path(manifests_folder)
+    code_hashes = {}
+    stale = {}
+    for job in jobs:
+        code_key = tuple(sorted(job['code']))
+        if code_key not in code_hashes:
+            code_hashes[code_key] = get_code_hash(job['code'])
+        dependencies = [dependency for dependency in job['dependencies'] if dependency in stale]
+        if dependencies:
+            stale[job['id']] = f'dependency rebuilt: {dependencies[0]}'
+            continue
+        reason = _get_stale_reason(job, _read_manifest(manifests_folder.joinpath(f'{job["id"]}.json')),
+                                   code_hashes[code_key])
+        if reason:
+            stale[job['id']] = reason
+    return stale
+
+
+def _record_manifest(job: dict, manifest_path: pathlib.Path) -> None:
+    previous = _read_manifest(manifest_path)
+    previous_inputs = previous['inputs'] if previous else {}
+    manifest = {'job': job['id'], 'code': get_code_hash(job['code']), 'params': _get_params_hash(job['params']),
+                'inputs': {input_path: _get_input_record(input_path, previous_inputs.get(input_path))
+                           for input_path in job['inputs']},
+                'outputs': {output_path: _get_stat(output_path) for output_path in job['outputs']}}
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_name(f'{manifest_path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+
+def _clear_outputs(job: dict) -> None:
+    # The outputs of a stale job are out of date, they are removed so that the job does not read them back
+    for output_path in map(pathlib.Path, job['outputs']):
+        if output_path.is_dir():
+            shutil.rmtree(output_path)
+        elif output_path.exists():
+            output_path.unlink()
+
+
+def _run_job(job_path: Union[str, pathlib.Path]) -> int:
+    # Runs the command of a job (already in its working directory and environment) and saves its manifest if it
+    # succeeds
+    with open(job_path) as job_file:
+        job = json.load(job_file)
+    _clear_outputs(job)
+    return_code = subprocess.call(job['pipeline']['command'])
+    if return_code == 0:
+        _record_manifest(job, pathlib.Path(job['pipeline']['manifest_path']))
+    return return_code
+
+
+def run_pipeline(grid_path: Union[str, pathlib.Path], queue_folder: Union[str, pathlib.Path],
+                 n_workers: Optional[int] = 1, max_memory_gb: Optional[float] = None,
+                 lock_timeout: Optional[float] = 600, dry_run: Optional[bool] = False) -> Tuple[List[str], List[str]]:
+    # Returns the ids of the jobs rebuilt and of those up to date
+    grid_path = pathlib.Path(grid_path).resolve()
+    with open(grid_path) as grid_file:
+        manifests_folder = grid_path.parent.joinpath(json.load(grid_file)['output_folder'], MANIFESTS_FOLDER)
+    queue_folder = pathlib.Path(queue_folder).resolve()
+
+    jobs = expand_grid(grid_path)
+    stale = plan_pipeline(jobs, manifests_folder)
+    for job_id, reason in stale.items():
+        print(f'{job_id}: {reason}')
+    print(f'{len(stale)} jobs to run, {len(jobs) - len(stale)} up to date')
+    up_to_date = [job['id'] for job in jobs if job['id'] not in stale]
+    if dry_run:
+        return list(stale.keys()), up_to_date
+
+    for job in jobs:
+        if job['id'] in stale:
+            job['pipeline'] = {'command': job['command'],
+                               'manifest_path': str(manifests_folder.joinpath(f'{job["id"]}.json'))}
+            job['command'] = [sys.executable, str(PIPELINE_PATH), '--run_job',
+                              str(queue_folder.joinpath('jobs', f'{job["id"]}.json'))]
+    submit_jobs(jobs, queue_folder)
+    set_jobs_done(queue_folder, up_to_date, True)
+    set_jobs_done(queue_folder, list(stale.keys()), False)
+    run_worker(queue_folder, n_workers, max_memory_gb, lock_timeout)
+    return list(stale.keys()), up_to_date
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to run the jobs of an experiments grid whose inputs, '
+                                                 'parameters or code changed since their outputs were created.'
+                                                 '\nUsage: python pipeline.py --grid path_json_grid '
+                                                 '--queue_folder path_queue_folder [--n_workers processes] '
+                                                 '[--max_memory_gb memory] [--lock_timeout seconds] [--dry_run]')
+    parser.add_argument('--grid', type=str)
+    parser.add_argument('--queue_folder', type=str)
+    parser.add_argument('--n_workers', type=int, default=1)
+    parser.add_argument('--max_memory_gb', type=float)
+    parser.add_argument('--lock_timeout', type=float, default=600)
+    parser.add_argument('--dry_run', action='store_true')
+    # Used by the workers to run a job and save its manifest
+    parser.add_argument('--run_job', type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_job:
+        sys.exit(_run_job(args.run_job))
+    if args.grid is None or args.queue_folder is None:
+        parser.error('--grid and --queue_folder are required')
+    run_pipeline(args.grid, args.queue_folder, args.n_workers, args.max_memory_gb, args.lock_timeout, args.dry_run)
@@ -0,0 +1,11 @@
+from setuptools import setup, find_packages
+
+setup(
+    name='metaeval_core',
+    version='0.1.0',
+    description='Shared feature extraction, h5py input/output and CPC utilities of the metaeval experiments',
+    packages=find_packages(include=['metaeval_core', 'metaeval_core.*']),
+    python_requires='>=3.7',
+    install_requires=['numpy', 'scipy', 'h5py', 'librosa'],
+    extras_require={'cpc': ['tensorflow']}
+)
@@ -9,44 +9,58 @@ import seaborn as sns
 from scipy import stats
 from sklearn.metrics import mean_squared_error
 
+from infant_data import load_table, get_age_bins
+
 sns.set_theme()
 
 
+BATCH_CHECKPOINTS = ['0.06', '0.12', '0.18', '0.24', '0.3', '0.36', '0.42', '0.48', '0.54']
+
+
+def _get_age_groups(df, group_size, upper_limit):
+    # Age group (left-closed bins of group_size days) of each effect size, NaN outside [0, upper_limit)
+    codes, labels = get_age_bins(df['mean_age_1'], group_size, upper_limit)
+    return pd.Series(pd.Categorical.from_codes(codes, labels), index=df.index)
+
+
 def get_sample_size(csv_file, group_size, upper_limit=900):
-    df = pd.read_csv(csv_file)
-    age_groups = np.arange(0, int(upper_limit / group_size) + 1) * group_size
-    results = []
-    for i in range(len(age_groups) - 1):
-        tpm_df = df[df['mean_age_1'].between(age_groups[i], age_groups[i + 1], inclusive='left')]
-        n_effects = len(tpm_df)
-        n_participants = tpm_df.drop_duplicates(subset=['same_infant'])['n_1'].sum()
-        results.append({'age_group': f'{age_groups[i]}-{age_groups[i + 1]}',
-                        'n_es': n_effects,
-                        'n_participants': n_participants})
-    return pd.DataFrame(results)
+    # The cached table is copied (one block per data type) before the age groups are added, so it is not fragmented
+    df = load_table(csv_file, 'metalab').copy()
+    df['age_group'] = _get_age_groups(df, group_size, upper_limit)
+    n_effects = df.groupby('age_group', observed=False).size()
+    # Participants are counted once per group of effect sizes from the same infants
+    n_participants = df.drop_duplicates(subset=['age_group', 'same_infant']).groupby(
+        'age_group', observed=False)['n_1'].sum()
+    return pd.DataFrame({'age_group': n_effects.index.astype(str), 'n_es': n_effects.to_numpy(),
+                         'n_participants': n_participants.to_numpy()})
 
 
 def get_sample_size_matrix(meta_analysis_paths, age_group_size, age_upper_limit=900):
-    age_groups = np.arange(0, int(age_upper_limit / age_group_size) + 1) * age_group_size
     matrix = []
     for meta_analysis in meta_analysis_paths:
-        df = pd.read_csv(meta_analysis)
-        tmp_results = {'capability': meta_analysis.stem}
-        for i in range(len(age_groups) - 1):
-            tmp_df = df[df['mean_age_1'].between(age_groups[i], age_groups[i + 1], inclusive='left')]
-            n_effects = len(tmp_df)
-            tmp_results[f'{age_groups[i]}-{age_groups[i + 1]}'] = n_effects
-        matrix.append(tmp_results)
+        df = load_table(meta_analysis, 'metalab')
+        n_effects = _get_age_groups(df, age_group_size, age_upper_limit).value_counts(sort=False)
+        matrix.append({'capability': meta_analysis.stem, **{str(group): n for group, n in n_effects.items()}})
     return pd.DataFrame(matrix)
 
 
-def get_heatmap(csv_path):
+def get_model_results_matrix(model_results_csv_path, capabilities, checkpoint='epoch'):
+    # Effect sizes and significance of the model as capability x checkpoint matrices (checkpoints in file order)
+    df_model = pd.read_csv(model_results_csv_path, keep_default_na=False)
+    df_model = df_model.loc[df_model.checkpoint == checkpoint].copy()
+    df_model['checkpoint_idx'] = df_model.groupby('capability').cumcount()
+    pivot = df_model.pivot(index='capability', columns='checkpoint_idx', values=['d', 'significant'])
+    return pivot['d'].loc[capabilities].to_numpy(dtype=np.float64), \
+        pivot['significant'].loc[capabilities].to_numpy(dtype=bool)
+
+
+def get_infants_matrices(csv_path):
+    # Effect sizes to plot and their labels as capability x age DataFrames
     df = pd.read_csv(csv_path, keep_default_na=False)
     df_tmp = df.loc[:, df.columns != 'Capability']
 
     # Remove batch checkpoints
-    batch_cp = ['0.06', '0.12', '0.18', '0.24', '0.3', '0.36', '0.42', '0.48', '0.54']
-    df_tmp = df_tmp.loc[:, ~df_tmp.columns.isin(batch_cp)]
+    df_tmp = df_tmp.loc[:, ~df_tmp.columns.isin(BATCH_CHECKPOINTS)]
 
     df_np = df_tmp.to_numpy()
 
@@ -61,48 +75,60 @@ def get_heatmap(csv_path):
     labels = (np.asarray([f"{l}" if l in ['N/A', 'n.s.'] else f"{float(l):.2f}" for l in df_np.flatten()])).reshape(
         df_np.shape)
 
+    caps = df.loc[:, 'Capability'].to_list()
+    return pd.DataFrame(df_heatmap, index=caps, columns=df_tmp.columns), \
+        pd.DataFrame(labels, index=caps, columns=df_tmp.columns)
+
+
+def plot_heatmap(df_heatmap, labels, output_path='summary_table.pdf'):
     # Formatting
     fig, ax = plt.subplots(figsize=(20, 13))
     title = "Infants' data\n"
 
     ax.set_title(title, fontsize=24, fontweight='bold')
 
-    heatmap = sns.heatmap(df_heatmap, linewidths=0.5, annot=labels, fmt='', vmax=0.4, ax=ax,
+    heatmap = sns.heatmap(df_heatmap.to_numpy(), linewidths=0.5, annot=labels.to_numpy(), fmt='', vmax=0.4, ax=ax,
                 cbar_kws={'label': 'Effect size', 'fraction': 0.05, 'pad': 0.01},
                 annot_kws={"fontsize": 20})
     heatmap.figure.axes[-1].yaxis.label.set_size(20)
 
     ax.set_xticks(ax.get_xticks())
-    ax.set_xticklabels(df_tmp.columns.to_list(), rotation=45, ha='right', size=20)
+    ax.set_xticklabels(df_heatmap.columns.to_list(), rotation=45, ha='right', size=20)
     ax.set_yticks(ax.get_yticks())
-    caps = df.loc[:, 'Capability'].to_list()
+    caps = df_heatmap.index.to_list()
     ax.set_yticklabels(caps)
     ax.set_yticklabels(caps, size=20, rotation=90)
 
     plt.xlabel("\nInfants' Age (Months)", fontsize=20, fontweight='bold')
 
     fig.tight_layout()
-    plt.savefig('summary_table.pdf')
+    plt.savefig(output_path)
+    plt.close(fig)
+
+
+def get_heatmap(csv_path, output_path='summary_table.pdf'):
+    plot_heatmap(*get_infants_matrices(csv_path), output_path)
 
 
-def get_heatmap_model(model_results_csv_path, infants_csv_path, infants_es_csv_path):
+def get_compatibility_matrices(model_results_csv_path, infants_csv_path, infants_es_csv_path):
+    # Compatibility of model and infants' effect sizes (result type) and the annotations of both as capability x age
+    # DataFrames
     df_inf = pd.read_csv(infants_csv_path, keep_default_na=False)
-    df_model = pd.read_csv(model_results_csv_path, keep_default_na=False)
     df_inf_es = pd.read_csv(infants_es_csv_path, keep_default_na=False)
 
     df_inf_tmp = df_inf.loc[:, df_inf.columns != 'Capability']
     df_inf_es_tmp = df_inf_es.loc[:, df_inf_es.columns != 'Capability']
 
     # Remove batch checkpoints
-    batch_cp = ['0.06', '0.12', '0.18', '0.24', '0.3', '0.36', '0.42', '0.48', '0.54']
-    df_inf_tmp = df_inf_tmp.loc[:, ~df_inf_tmp.columns.isin(batch_cp)]
-    df_inf_es_tmp = df_inf_es_tmp.loc[:, ~df_inf_es_tmp.columns.isin(batch_cp)]
+    df_inf_tmp = df_inf_tmp.loc[:, ~df_inf_tmp.columns.isin(BATCH_CHECKPOINTS)]
+    df_inf_es_tmp = df_inf_es_tmp.loc[:, ~df_inf_es_tmp.columns.isin(BATCH_CHECKPOINTS)]
     age = [float(x) for x in df_inf_tmp.columns.to_list()]
 
     df_inf_np = df_inf_tmp.to_numpy()
     df_inf_es_np = df_inf_es_tmp.to_numpy()
 
-    df_model = df_model.loc[df_model.checkpoint == 'epoch']
+    # One row per capability (same order as the infants' table) and one column per epoch checkpoint
+    es_models, es_models_sig = get_model_results_matrix(model_results_csv_path, df_inf.loc[:, 'Capability'].to_list())
 
     # Formatting & data
     # Basic format
@@ -120,14 +146,8 @@ def get_heatmap_model(model_results_csv_path, infants_csv_path, infants_es_csv_p
             es_inf_lb = df_inf_np[i, j]
             es_inf = df_inf_es_np[i, j]
 
-            if i == 0:
-                cap = 'IDS Preference'
-            elif i == 1:
-                cap = 'Vowel discr. (native)'
-            else:
-                cap = 'Vowel discr. (non-native)'
-            es_model = df_model.loc[df_model.capability == cap].iat[j, 1]
-            es_model_sig = df_model.loc[df_model.capability == cap].iat[j, 2]
+            es_model = es_models[i, j]
+            es_model_sig = es_models_sig[i, j]
             significance = '*' if es_model_sig else ''
             if not es_model_sig:
                 es_model = 0
@@ -171,6 +191,13 @@ def get_heatmap_model(model_results_csv_path, infants_csv_path, infants_es_csv_p
                     else:
                         result_type[i, j] = 2  # Non compatible effect
 
+    caps = df_inf.loc[:, 'Capability'].to_list()
+    return pd.DataFrame(result_type, index=caps, columns=df_inf_tmp.columns), \
+        pd.DataFrame(annotations, index=caps, columns=df_inf_tmp.columns), \
+        pd.DataFrame(annotations_inf, index=caps, columns=df_inf_tmp.columns)
+
+
+def plot_heatmap_model(result_type, annotations, annotations_inf, output_path='summary_table_model.pdf'):
     # Plot
     fig, (ax, ax2) = plt.subplots(1, 2, figsize=(20, 13), gridspec_kw={'width_ratios': [1, 0.05]})
     title = "APC model's data\n"
@@ -178,7 +205,7 @@ def get_heatmap_model(model_results_csv_path, infants_csv_path, infants_es_csv_p
     ax.set_title(title, fontsize=24, fontweight='bold')
 
     colours = ['#fdebde', '#9EC3D8', '#edc1bb', '#f7f5f4']
-    sns.heatmap(result_type, linewidths=0.5, annot=annotations, fmt='',
+    sns.heatmap(result_type.to_numpy(), linewidths=0.5, annot=annotations.to_numpy(), fmt='',
                 cmap=sns.color_palette(colours, as_cmap=True),
                 vmax=3,
                 vmin=0,
@@ -186,7 +213,7 @@ def get_heatmap_model(model_results_csv_path, infants_csv_path, infants_es_csv_p
                 cbar=False,
                 annot_kws={"fontsize":20})
 
-    sns.heatmap(result_type, linewidths=0.5, annot=annotations_inf, fmt='',
+    sns.heatmap(result_type.to_numpy(), linewidths=0.5, annot=annotations_inf.to_numpy(), fmt='',
                 cmap=sns.color_palette(colours, as_cmap=True),
                 vmax=3,
                 vmin=0,
@@ -201,17 +228,25 @@ def get_heatmap_model(model_results_csv_path, infants_csv_path, infants_es_csv_p
                 xticklabels=False, yticklabels=False)
 
     ax.set_xticks(ax.get_xticks())
-    ax.set_xticklabels(df_inf_tmp.columns.to_list(), rotation=45, ha='right', size=20)
+    ax.set_xticklabels(result_type.columns.to_list(), rotation=45, ha='right', size=20)
     ax.set_yticks(ax.get_yticks())
-    caps = df_inf.loc[:, 'Capability'].to_list()
+    caps = result_type.index.to_list()
     ax.set_yticklabels(caps, size=20, rotation=90)
 
     ax.set_xlabel("\nSimulated Age (Months)", fontsize=20, fontweight='bold')
 
     fig.tight_layout()
-    plt.savefig('summary_table_model.pdf')
+    plt.savefig(output_path)
+    plt.close(fig)
+
+
+def get_heatmap_model(model_results_csv_path, infants_csv_path, infants_es_csv_path,
+                      output_path='summary_table_model.pdf'):
+    plot_heatmap_model(*get_compatibility_matrices(model_results_csv_path, infants_csv_path, infants_es_csv_path),
+                       output_path)
 
 
-get_heatmap('./summary_table_lb.csv')
-get_heatmap_model('./apc_results.csv', './summary_table_lb.csv', './summary_table_es.csv')
+if __name__ == '__main__':
+    get_heatmap('./summary_table_lb.csv')
+    get_heatmap_model('./apc_results.csv', './summary_table_lb.csv', './summary_table_es.csv')
 
@@ -0,0 +1,232 @@
+"""
+    Typed columnar loading of the infants' data (ManyBabies 1 trials, MetaLab meta-analysis tables) and vectorised
+    binning by age of their effect sizes.
+
+    The csv files are parsed once with fixed dtypes (categorical columns for labs, subjects, methods, studies, ...)
+    and cached as Parquet files named after the hash of their content, so later loads skip the parsing. Ages are
+    binned with left-closed bins as get_overall_table, and the reference effect size of each age group (fixed-effect
+    or random-effects mean, number of effect sizes and participants) is computed for all the groups at once, for any
+    number of bin sizes.
+
+    The MB1 effect sizes per lab, age group, method and language follow r_scripts/ids_preference/replication_analyses.R:
+    IDS - ADS looking time per pair of trials (same stimulus), mean per infant, d_z = mean / sd per lab (labs with at
+    least 10 infants) and variance 2 / n + d_z^2 / (4 n).
+
+    @date 19.10.2026
+"""
+
+import argparse
+import hashlib
+import os
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+from metaeval_core.effect_sizes import META_ANALYSIS_METHODS, get_random_effects_mean_effect_sizes
+
+NA_VALUES = ['NA', 'N/A']
+MB1_AGE_GROUPS = ['3-6 mo', '6-9 mo', '9-12 mo', '12-15 mo']
+MB1_DTYPES = {'lab': 'category', 'subid': 'category', 'subid_unique': 'category', 'trial_order': 'Int8',
+              'trial_num': 'int8', 'trial_type': 'category', 'stimulus_num': 'Int8', 'method': 'category',
+              'age_days': 'int16', 'age_mo': 'float64', 'age_group': 'category', 'nae': 'bool', 'gender': 'category',
+              'second_session': 'boolean', 'looking_time': 'float64', 'missing': 'bool'}
+MB1_GROUPS = ['lab', 'age_group', 'method', 'nae']
+MB1_MIN_SUBJECTS = 10
+# Numeric columns of the MetaLab tables, the other text columns are categorical
+METALAB_NUMERIC = ['mean_age_1', 'mean_age_2', 'n_1', 'n_2', 'x_1', 'x_2', 'SD_1', 'SD_2', 't', 'F', 'r', 'corr',
+                   'd_calc', 'd_var_calc', 'g_calc', 'g_var_calc', 'r_calc', 'r_var_calc', 'es_variance_calc',
+                   'mean_age', 'n', 'weights_d', 'weights_g', 'age_days', 'age_mo']
+TABLE_KINDS = ['mb1', 'metalab']
+# Increased when the parsing changes, so the cached files are not reused
+SCHEMA_VERSION = 1
+CACHE_FOLDER = '.infant_data_cache'
+
+
+def read_mb1_trials(csv_path):
+    trials = pd.read_csv(csv_path, na_values=NA_VALUES, keep_default_na=False,
+                         dtype={column: dtype for column, dtype in MB1_DTYPES.items() if dtype == 'category'})
+    for column in ['trial_order', 'stimulus_num']:
+        trials[column] = trials[column].astype(MB1_DTYPES[column])
+    for column in ['trial_num', 'age_days']:
+        trials[column] = trials[column].astype(MB1_DTYPES[column])
+    for column in ['nae', 'missing']:
+        trials[column] = trials[column].astype(str).str.upper().eq('TRUE')
+    trials['second_session'] = trials['second_session'].map({True: True, False: False, 'TRUE': True,
+                                                             'FALSE': False}).astype('boolean')
+    trials['age_group'] = trials['age_group'].cat.set_categories(MB1_AGE_GROUPS, ordered=True)
+    return trials
+
+
+def read_metalab_table(csv_path):
+    table = pd.read_csv(csv_path, na_values=NA_VALUES, keep_default_na=False, low_memory=False)
+    for column in table.columns:
+        if column in METALAB_NUMERIC:
+            table[column] = pd.to_numeric(table[column], errors='coerce')
+        elif table[column].dtype == object:
+            table[column] = table[column].astype('category')
+    return table
+
+
+def _get_cache_path(csv_path, kind, cache_folder):
+    digest = hashlib.sha256(f'{kind}:{SCHEMA_VERSION}:'.encode())
+    with open(csv_path, 'rb') as csv_file:
+        digest.update(csv_file.read())
+    return pathlib.Path(cache_folder).joinpath(f'{pathlib.Path(csv_path).stem}_{digest.hexdigest()[:16]}.parquet')
+
+
+def load_table(csv_path, kind='metalab', cache_folder=None):
+    # Parquet needs pyarrow (or fastparquet), without it the csv file is parsed every time
+    assert kind in TABLE_KINDS
+    cache_folder = pathlib.Path(cache_folder) if cache_folder else pathlib.Path(csv_path).parent.joinpath(CACHE_FOLDER)
+    cache_path = _get_cache_path(csv_path, kind, cache_folder)
+    if cache_path.is_file():
+        return pd.read_parquet(cache_path)
+
+    table = read_mb1_trials(csv_path) if kind == 'mb1' else read_metalab_table(csv_path)
+    try:
+        cache_folder.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f'{cache_path.name}.{os.getpid()}.tmp')
+        table.to_parquet(tmp_path)
+        os.replace(tmp_path, cache_path)
+    except ImportError:
+        pass
+    return table
+
+
+def get_age_bins(ages, group_size, upper_limit, lower_limit=0):
+    # Left-closed bins of group_size from lower_limit (the last bin ends at or below upper_limit). Returns the bin of
+    # each age (-1 outside the bins or NaN) and the labels of the bins.
+    n_bins = int((upper_limit - lower_limit) / group_size)
+    edges = lower_limit + np.arange(n_bins + 1) * group_size
+    ages = np.asarray(ages, dtype=np.float64)
+    codes = np.searchsorted(edges, ages, side='right') - 1
+    codes[~(ages >= edges[0]) | ~(ages < edges[-1])] = -1
+    labels = [f'{edges[idx]:g}-{edges[idx + 1]:g}' for idx in range(n_bins)]
+    return codes.astype(np.int64), labels
+
+
+def get_mb1_subject_differences(trials):
+    # Mean IDS - ADS looking time per infant (pairs of trials with the same stimulus, NaN if none is complete), number
+    # of complete pairs and mean age, one row per infant with IDS or ADS trials
+    trials = trials.loc[trials['trial_type'].isin(['IDS', 'ADS']) & trials['stimulus_num'].notna()]
+    subjects, subject_codes = np.unique(trials['subid_unique'].cat.codes.to_numpy(), return_inverse=True)
+    stimuli = trials['stimulus_num'].to_numpy(dtype=np.int64)
+    n_stimuli = int(stimuli.max()) + 1 if len(stimuli) else 0
+    # Looking times as (infant x stimulus) matrices
+    looking_times = {}
+    for trial_type in ['IDS', 'ADS']:
+        selected = (trials['trial_type'] == trial_type).to_numpy()
+        matrix = np.full((len(subjects), n_stimuli), np.nan)
+        matrix[subject_codes[selected], stimuli[selected]] = trials['looking_time'].to_numpy()[selected]
+        looking_times[trial_type] = matrix
+    differences = looking_times['IDS'] - looking_times['ADS']
+    n_pairs = np.sum(np.isfinite(differences), axis=1)
+    with np.errstate(invalid='ignore'):
+        mean_differences = np.nansum(differences, axis=1) / n_pairs
+
+    first_trials = pd.Series(np.arange(len(trials))).groupby(subject_codes).first().to_numpy()
+    subject_table = trials.iloc[first_trials][['subid_unique'] + MB1_GROUPS].reset_index(drop=True)
+    for column in ['age_mo', 'age_days']:
+        subject_table[column] = np.bincount(subject_codes, trials[column].to_numpy(dtype=np.float64)) / \
+            np.bincount(subject_codes)
+    subject_table['diff'] = mean_differences
+    subject_table['n_pairs'] = n_pairs
+    return subject_table
+
+
+def get_mb1_effect_sizes(trials, min_subjects=MB1_MIN_SUBJECTS):
+    # d_z, number of infants, variance and mean age per lab, age group, method and language (nae)
+    subjects = get_mb1_subject_differences(trials)
+    grouped = subjects.groupby(MB1_GROUPS, observed=True, sort=True)
+    effect_sizes = grouped['diff'].agg(['mean', 'std']).join(grouped.size().rename('n'))
+    effect_sizes = effect_sizes.join(grouped[['age_mo', 'age_days']].mean()).reset_index()
+    effect_sizes['d_z'] = effect_sizes['mean'] / effect_sizes['std']
+    effect_sizes['d_z_var'] = 2 / effect_sizes['n'] + effect_sizes['d_z'] ** 2 / (4 * effect_sizes['n'])
+    effect_sizes = effect_sizes.loc[(effect_sizes['n'] >= min_subjects) & effect_sizes['d_z'].notna()]
+    return effect_sizes.drop(columns=['mean', 'std']).reset_index(drop=True)
+
+
+def aggregate_effect_sizes(table, group_size, upper_limit, lower_limit=0, age_column='mean_age_1',
+                           effect_column='g_calc', variance_column='g_var_calc', n_column='n_1',
+                           same_infant_column='same_infant', method='REML', alpha=0.05):
+    # Reference effect size per age group: number of effect sizes and participants (counted once per group of effect
+    # sizes from the same infants, when the column is available) and mean effect size with method FE, DL or REML
+    assert method in META_ANALYSIS_METHODS
+    codes, labels = get_age_bins(table[age_column], group_size, upper_limit, lower_limit)
+    selected = codes >= 0
+    effect_sizes = table[effect_column].to_numpy(dtype=np.float64)[selected]
+    variances = table[variance_column].to_numpy(dtype=np.float64)[selected]
+    valid = np.isfinite(effect_sizes) & np.isfinite(variances) & (variances > 0)
+    statistics = get_random_effects_mean_effect_sizes(effect_sizes[valid], 1 / variances[valid],
+                                                      codes[selected][valid], method, alpha, len(labels))
+
+    participants = table.loc[selected, [n_column]].assign(age_group=codes[selected])
+    if same_infant_column in table.columns:
+        participants[same_infant_column] = table.loc[selected, same_infant_column].to_numpy()
+        participants = participants.drop_duplicates(subset=['age_group', same_infant_column])
+    n_participants = np.bincount(participants['age_group'].to_numpy(),
+                                 participants[n_column].fillna(0).to_numpy(dtype=np.float64), len(labels))
+
+    n_es = np.bincount(codes[selected][valid], minlength=len(labels))
+    for key in ['se', 'tau2']:
+        statistics[key][n_es == 0] = np.nan
+    return pd.DataFrame({'age_group': labels, 'age_start': lower_limit + np.arange(len(labels)) * group_size,
+                         'n_es': n_es, 'n_participants': n_participants, 'mean_es': statistics['mean_es'],
+                         'se': statistics['se'], 'ci_lb': statistics['ci_lb'], 'ci_ub': statistics['ci_ub'],
+                         'p_value': statistics['p_value'], 'significant': statistics['significant'],
+                         'tau2': statistics['tau2'], 'i2': statistics['i2']})
+
+
+def get_reference_effect_sizes(tables, group_sizes, upper_limit, lower_limit=0, method='REML', alpha=0.05):
+    # Reference effect sizes of several tables ({capability: (table, columns of aggregate_effect_sizes)}) for every
+    # bin size, in a single table
+    results = []
+    for capability, (table, columns) in tables.items():
+        for group_size in group_sizes:
+            result = aggregate_effect_sizes(table, group_size, upper_limit, lower_limit, method=method, alpha=alpha,
+                                            **columns)
+            result.insert(0, 'group_size', group_size)
+            result.insert(0, 'capability', capability)
+            results.append(result)
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+
+def get_mb1_columns():
+    # Columns of the MB1 effect sizes for aggregate_effect_sizes (ages in days as the MetaLab tables)
+    return {'age_column': 'age_days', 'effect_column': 'd_z', 'variance_column': 'd_z_var', 'n_column': 'n',
+            'same_infant_column': None}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to calculate the reference effect sizes of the infants per '
+                                                 'age group for several bin sizes (days). '
+                                                 '\nUsage: python infant_data.py --output_csv_path path_csv_file '
+                                                 '[--mb1_trials_path 03_data_trial_main.csv] [--mb1_nae_only] '
+                                                 '[--metalab_paths metalab_csv_files] [--group_sizes 30 90 180] '
+                                                 '[--upper_limit 900] [--method FE|DL|REML] [--cache_folder folder]')
+    parser.add_argument('--output_csv_path', type=str, required=True)
+    parser.add_argument('--mb1_trials_path', type=str)
+    parser.add_argument('--mb1_nae_only', action='store_true', help='Only the North American English labs')
+    parser.add_argument('--metalab_paths', type=str, nargs='*', default=[])
+    parser.add_argument('--group_sizes', type=float, nargs='+', default=[90])
+    parser.add_argument('--upper_limit', type=float, default=900)
+    parser.add_argument('--method', type=str, choices=META_ANALYSIS_METHODS, default='REML')
+    parser.add_argument('--cache_folder', type=str)
+    args = parser.parse_args()
+
+    reference_tables = {}
+    if args.mb1_trials_path:
+        mb1_effect_sizes = get_mb1_effect_sizes(load_table(args.mb1_trials_path, 'mb1', args.cache_folder))
+        if args.mb1_nae_only:
+            mb1_effect_sizes = mb1_effect_sizes.loc[mb1_effect_sizes['nae']]
+        reference_tables['IDS Preference'] = (mb1_effect_sizes, get_mb1_columns())
+    for metalab_path in args.metalab_paths:
+        reference_tables[pathlib.Path(metalab_path).stem] = (load_table(metalab_path, 'metalab', args.cache_folder),
+                                                             {})
+    assert reference_tables, 'No infants data given'
+
+    reference_effect_sizes = get_reference_effect_sizes(reference_tables, args.group_sizes, args.upper_limit,
+                                                        method=args.method)
+    pathlib.Path(args.output_csv_path).parent.mkdir(parents=True, exist_ok=True)
+    reference_effect_sizes.to_csv(args.output_csv_path, index=False)
@@ -0,0 +1,142 @@
+"""
+    Headless rendering of the summary figures listed in a manifest (JSON):
+
+    {"figures": [{"type": "model", "model_results": "apc_results.csv", "infants_lb": "summary_table_lb.csv",
+                  "infants_es": "summary_table_es.csv", "output_path": "summary_table_model.pdf"},
+                 {"type": "infants", "infants_lb": "summary_table_lb.csv", "output_path": "summary_table.pdf"}]}
+
+    Relative paths are relative to the manifest. The matrices of each figure (compatibility or effect sizes and
+    annotations) are computed once per set of inputs and cached as Parquet files. Figures are rendered with the Agg
+    backend in a process pool, and a figure is skipped when its inputs and the plotting code have not changed since it
+    was rendered (hashes kept in `<cache_folder>/rendered.json`).
+
+    @date 19.10.2026
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+
+import pandas as pd
+
+FIGURE_INPUTS = {'model': ['model_results', 'infants_lb', 'infants_es'], 'infants': ['infants_lb']}
+MATRICES_NAMES = {'model': ['result_type', 'annotations', 'annotations_inf'], 'infants': ['effect_sizes', 'labels']}
+CODE_PATH = pathlib.Path(__file__).with_name('get_overall_table.py')
+STATE_FILE = 'rendered.json'
+
+
+def read_manifest(manifest_path):
+    manifest_path = pathlib.Path(manifest_path)
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    assert 'figures' in manifest and isinstance(manifest['figures'], list)
+
+    figures = []
+    for figure in manifest['figures']:
+        assert figure.get('type') in FIGURE_INPUTS
+        assert set(FIGURE_INPUTS[figure['type']] + ['output_path']).issubset(set(figure.keys()))
+        figure = dict(figure)
+        for field in FIGURE_INPUTS[figure['type']] + ['output_path']:
+            figure[field] = str(manifest_path.parent.joinpath(figure[field]))
+        figures.append(figure)
+
+    output_paths = [figure['output_path'] for figure in figures]
+    assert len(output_paths) == len(set(output_paths))
+    return figures
+
+
+def get_inputs_hash(figure):
+    # Hash of the type of figure, the content of its inputs and the code computing and plotting the matrices
+    digest = hashlib.sha256(figure['type'].encode())
+    for path in [figure[field] for field in FIGURE_INPUTS[figure['type']]] + [CODE_PATH]:
+        with open(path, 'rb') as input_file:
+            digest.update(input_file.read())
+    return digest.hexdigest()
+
+
+def _compute_matrices(figure):
+    # seaborn and pyplot are only imported when a figure has to be rendered
+    from get_overall_table import get_infants_matrices, get_compatibility_matrices
+    if figure['type'] == 'model':
+        return get_compatibility_matrices(figure['model_results'], figure['infants_lb'], figure['infants_es'])
+    return get_infants_matrices(figure['infants_lb'])
+
+
+def _get_matrices(figure, inputs_hash, cache_folder):
+    # Matrices are shared by figures with the same inputs. Parquet needs pyarrow (or fastparquet), without it the
+    # matrices are computed every time.
+    paths = [cache_folder.joinpath(f'{inputs_hash}_{name}.parquet') for name in MATRICES_NAMES[figure['type']]]
+    if all(path.is_file() for path in paths):
+        return [pd.read_parquet(path) for path in paths]
+
+    matrices = _compute_matrices(figure)
+    try:
+        for matrix, path in zip(matrices, paths):
+            tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            matrix.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+    except ImportError:
+        pass
+    return matrices
+
+
+def _render_figure(figure, inputs_hash, cache_folder):
+    from get_overall_table import plot_heatmap, plot_heatmap_model
+    matrices = _get_matrices(figure, inputs_hash, cache_folder)
+    pathlib.Path(figure['output_path']).parent.mkdir(parents=True, exist_ok=True)
+    if figure['type'] == 'model':
+        plot_heatmap_model(*matrices, figure['output_path'])
+    else:
+        plot_heatmap(*matrices, figure['output_path'])
+    return figure['output_path'], inputs_hash
+
+
+def render_figures(manifest_path, cache_folder=None, n_jobs=1, force=False):
+    figures = read_manifest(manifest_path)
+    cache_folder = pathlib.Path(cache_folder) if cache_folder else \
+        pathlib.Path(manifest_path).parent.joinpath('.figures_cache')
+    cache_folder.mkdir(parents=True, exist_ok=True)
+
+    state_path = cache_folder.joinpath(STATE_FILE)
+    rendered = {}
+    if state_path.is_file():
+        with open(state_path) as state_file:
+            rendered = json.load(state_file)
+
+    hashes = [get_inputs_hash(figure) for figure in figures]
+    pending = [(figure, inputs_hash) for figure, inputs_hash in zip(figures, hashes)
+               if force or rendered.get(figure['output_path']) != inputs_hash or
+               not pathlib.Path(figure['output_path']).is_file()]
+    print(f'{len(pending)} figures to render, {len(figures) - len(pending)} unchanged')
+
+    arguments = [[figure for figure, _ in pending], [inputs_hash for _, inputs_hash in pending],
+                 [cache_folder] * len(pending)]
+    executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs != 1 and len(pending) > 1 else None
+    try:
+        for output_path, inputs_hash in (executor.map if executor else map)(_render_figure, *arguments):
+            rendered[output_path] = inputs_hash
+    finally:
+        if executor:
+            executor.shutdown()
+        with open(state_path, 'w') as state_file:
+            json.dump(rendered, state_file, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to render the summary figures of a manifest, skipping '
+                                                 'those whose inputs have not changed.\nUsage: python '
+                                                 'render_figures.py --manifest path_json_manifest '
+                                                 '[--cache_folder path_cache_folder] [--n_jobs processes] [--force]')
+    parser.add_argument('--manifest', type=str, required=True)
+    parser.add_argument('--cache_folder', type=str)
+    parser.add_argument('--n_jobs', type=int, default=1)
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+
+    render_figures(args.manifest, args.cache_folder, args.n_jobs, args.force)
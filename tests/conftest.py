@@ -0,0 +1,17 @@
+"""
+    The tests import metaeval_core and the benchmarks' synthetic data from the main folder of the repository, also when
+    the package is not installed, and the vowel discrimination modules from their folder (as its scripts do).
+
+    @date 19.10.2026
+"""
+
+import pathlib
+import sys
+
+REPOSITORY_PATH = pathlib.Path(__file__).resolve().parents[1]
+if str(REPOSITORY_PATH) not in sys.path:
+    sys.path.insert(0, str(REPOSITORY_PATH))
+
+VOWEL_DISCRIMINATION_PATH = REPOSITORY_PATH.joinpath('vowel_discrimination')
+if str(VOWEL_DISCRIMINATION_PATH) not in sys.path:
+    sys.path.append(str(VOWEL_DISCRIMINATION_PATH))
@@ -0,0 +1,8 @@
+"""
+    Implementations of the experiments before they were moved to metaeval_core, used as references by the equivalence
+    tests: trial segmentation (ids_preference/pc_attentional_score_calculation/io_module), acoustic feature extraction
+    (ids_preference/trial_processing) and CPC utilities (ids_preference/pc_attentional_score_calculation).
+
+    The code is unchanged except for the librosa calls of extract_acoustic_features, which use keyword arguments and
+    the STFT padding of librosa 0.7.2 (reflect) so that they also run with newer versions, and its progress prints.
+"""
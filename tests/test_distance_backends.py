@@ -0,0 +1,36 @@
+"""
+    The DTW backends leave the segments untouched: the segments are views of the features or latents buffer shared by
+    all the pairs, so the random frames that replace the zero frames (cosine distance) are drawn in a copy.
+
+    @date 19.10.2026
+"""
+
+import numpy as np
+import pytest
+
+from evaluation_protocol.tests_setup.distance_backends import calculate_dtw, get_distance_backend
+
+
+def _get_buffer_segments():
+    # Segments as slices of one buffer, with zero frames (e.g., reset or padding frames, or silent latents)
+    buffer = np.random.default_rng(0).standard_normal((40, 6))
+    buffer[[3, 4, 25]] = 0
+    return buffer, [buffer[0:10], buffer[10:22], buffer[22:40]]
+
+
+def test_calculate_dtw_does_not_modify_the_segments():
+    buffer, segments = _get_buffer_segments()
+    original = buffer.copy()
+    distance = calculate_dtw(segments[0], segments[2])
+    np.testing.assert_array_equal(buffer, original)
+    assert np.isfinite(distance)
+
+
+@pytest.mark.parametrize('metric', ['dtw_cosine', 'dtw_euclidean'])
+def test_dtw_backend_does_not_modify_the_segments(metric):
+    buffer, segments = _get_buffer_segments()
+    original = buffer.copy()
+    pairs = np.array([[0, 1], [0, 2], [1, 2]])
+    distances = get_distance_backend(metric)(segments, pairs, {})
+    np.testing.assert_array_equal(buffer, original)
+    assert np.all(np.isfinite(distances))
@@ -0,0 +1,46 @@
+"""
+    A saved distance matrix is reused when the segments of its trials are unchanged, also when the segments contain zero
+    frames (replaced by random frames for the cosine distance), and calculated again when they change.
+
+    @date 19.10.2026
+"""
+
+import numpy as np
+
+from evaluation_protocol.tests_setup import distance_matrix as distance_matrix_module
+from evaluation_protocol.tests_setup.distance_matrix import get_distance_matrix
+
+
+def _get_segments():
+    # Segments as slices of one buffer, the first one with a zero frame
+    buffer = np.random.default_rng(0).standard_normal((60, 4)).astype(np.float32)
+    buffer[2] = 0
+    return [buffer[start:start + 10] for start in range(0, 60, 10)]
+
+
+def test_distance_matrix_with_zero_frames_is_reused(tmp_path, monkeypatch):
+    file_mapping = [f'corpus/trial_{idx}.wav' for idx in range(6)]
+    matrix_path = tmp_path.joinpath('distance_matrix.npz')
+    trial_ids = np.arange(6)
+    first = get_distance_matrix(_get_segments(), trial_ids, file_mapping, 'dtw_cosine', matrix_path)
+
+    def calculate_distance_matrix(*args, **kwargs):
+        raise AssertionError('The saved distance matrix is calculated again')
+
+    monkeypatch.setattr(distance_matrix_module, 'calculate_distance_matrix', calculate_distance_matrix)
+    second = get_distance_matrix(_get_segments(), trial_ids, file_mapping, 'dtw_cosine', matrix_path)
+    np.testing.assert_array_equal(second.distances, first.distances)
+    assert second.fingerprint == first.fingerprint
+
+
+def test_distance_matrix_of_changed_segments_is_calculated_again(tmp_path):
+    file_mapping = [f'corpus/trial_{idx}.wav' for idx in range(6)]
+    matrix_path = tmp_path.joinpath('distance_matrix.npz')
+    trial_ids = np.arange(6)
+    first = get_distance_matrix(_get_segments(), trial_ids, file_mapping, 'dtw_euclidean', matrix_path)
+
+    segments = _get_segments()
+    segments[3] = segments[3] * 2
+    second = get_distance_matrix(segments, trial_ids, file_mapping, 'dtw_euclidean', matrix_path)
+    assert second.fingerprint != first.fingerprint
+    assert not np.array_equal(second.distances, first.distances)
@@ -0,0 +1,86 @@
+"""
+    The batched MFCC/log-mel front end matches the previous per-utterance librosa pipeline (mfcc or melspectrogram,
+    delta, zero replacement, log and cmvn) on synthetic signals.
+
+    The reference uses the STFT padding of the librosa version in requirements.yml (reflect), which newer versions no
+    longer use by default.
+
+    @date 19.10.2026
+"""
+
+import librosa
+import numpy as np
+import pytest
+
+from metaeval_core.feature_front_end import compute_features_batch
+
+SAMPLING_FREQ = 16000
+N_FFT = 400
+HOP_LENGTH = 160
+# Maximum absolute difference relative to the largest absolute value of the features of each utterance
+TOLERANCE = 1e-5
+
+
+def _get_signals(lengths, seed=0):
+    rng = np.random.default_rng(seed)
+    signals = []
+    for n_samples in lengths:
+        time = np.arange(n_samples) / SAMPLING_FREQ
+        f0 = rng.uniform(100, 250)
+        signal = sum(np.sin(2 * np.pi * f0 * harmonic * time) / harmonic for harmonic in range(1, 6))
+        signal = 0.3 * signal / np.max(np.abs(signal)) + 0.01 * rng.standard_normal(n_samples)
+        signals.append(signal.astype(np.float32))
+    return signals
+
+
+def _librosa_features(signal, num_features, deltas, deltas_deltas, cmvn, name):
+    # Previous extraction of one utterance (extract_acoustic_features before the batched front end)
+    if name == 'mfcc':
+        tmp_feats = librosa.feature.mfcc(y=signal, sr=SAMPLING_FREQ, n_mfcc=num_features, n_fft=N_FFT,
+                                         hop_length=HOP_LENGTH, pad_mode='reflect')
+    else:
+        tmp_feats = librosa.feature.melspectrogram(y=signal, sr=SAMPLING_FREQ, n_fft=N_FFT, hop_length=HOP_LENGTH,
+                                                   n_mels=num_features, pad_mode='reflect')
+
+    if name == 'mfcc' and deltas:
+        mfcc_tmp = tmp_feats
+        tmp_feats = np.concatenate([tmp_feats, librosa.feature.delta(mfcc_tmp)])
+        if deltas_deltas:
+            tmp_feats = np.concatenate([tmp_feats, librosa.feature.delta(mfcc_tmp, order=2)])
+
+    tmp_feats = np.transpose(tmp_feats)
+    min_feats = np.min(np.abs(tmp_feats[np.nonzero(tmp_feats)]))
+    tmp_feats = np.where(tmp_feats == 0, min_feats, tmp_feats)
+
+    if name == 'logmel':
+        tmp_feats = 10 * np.log10(tmp_feats)
+
+    if cmvn:
+        tmp_feats = (tmp_feats - np.mean(tmp_feats, axis=0)) / np.std(tmp_feats, axis=0)
+    return tmp_feats
+
+
+@pytest.mark.parametrize('name, num_features, deltas, deltas_deltas', [('mfcc', 13, True, True),
+                                                                       ('mfcc', 13, True, False),
+                                                                       ('mfcc', 20, False, False),
+                                                                       ('logmel', 40, False, False)])
+@pytest.mark.parametrize('cmvn', [True, False])
+def test_compute_features_batch_matches_librosa(name, num_features, deltas, deltas_deltas, cmvn):
+    signals = _get_signals([2000, 4000, 9000, 16000])
+    features = compute_features_batch(signals, SAMPLING_FREQ, N_FFT, HOP_LENGTH, num_features, deltas,
+                                      deltas_deltas, cmvn, name)
+
+    assert len(features) == len(signals)
+    for signal, utterance_features in zip(signals, features):
+        expected = _librosa_features(signal, num_features, deltas, deltas_deltas, cmvn, name)
+        assert utterance_features.shape == expected.shape
+        np.testing.assert_allclose(utterance_features, expected, rtol=0,
+                                   atol=TOLERANCE * np.max(np.abs(expected)))
+
+
+def test_compute_features_batch_is_independent_of_the_batch():
+    signals = _get_signals([3000, 5000, 7000], seed=1)
+    batch_features = compute_features_batch(signals, SAMPLING_FREQ, N_FFT, HOP_LENGTH)
+    for signal, utterance_features in zip(signals, batch_features):
+        single_features, = compute_features_batch([signal], SAMPLING_FREQ, N_FFT, HOP_LENGTH)
+        np.testing.assert_allclose(utterance_features, single_features, rtol=1e-12, atol=1e-12)
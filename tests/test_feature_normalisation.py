@@ -0,0 +1,106 @@
+"""
+    The h5py files are written in blocks from generators of features with the layout of the previous implementation,
+    and the normalisation applied while they are written matches the cmvn of the extraction (utterance scheme) and the
+    statistics of all the frames of each key.
+
+    @date 19.10.2026
+"""
+
+import h5py
+import numpy as np
+import pytest
+
+from benchmarks.synthetic_data import create_synthetic_wavs, create_synthetic_features
+from legacy import extract_acoustic_features as legacy_features
+from metaeval_core import extract_acoustic_features as core_features
+from metaeval_core import h5_io
+from metaeval_core.feature_normalisation import RunningStatistics, get_frames_keys, create_normalised_h5py_file, \
+    load_statistics
+
+# Maximum absolute difference relative to the largest absolute value of the features of each utterance
+TOLERANCE = 1e-5
+
+
+@pytest.mark.parametrize('frames, sample_length, reset_dur', [([20, 45, 7], 32, 5), ([16, 16], 16, 0),
+                                                              ([50, 3, 90, 11, 64], 8, 4)])
+def test_create_h5py_file_from_generator_matches_legacy(tmp_path, monkeypatch, frames, sample_length, reset_dur):
+    # Small blocks, so that the file is written in several of them
+    monkeypatch.setattr(core_features, 'BLOCK_SAMPLES', 2)
+    features = create_synthetic_features(frames, 3, seed=4)
+    file_mapping = [f'trial_{idx}.wav' for idx in range(len(frames))]
+    core_features.create_h5py_file(str(tmp_path.joinpath('core.h5')), file_mapping, iter(features), sample_length,
+                                   reset_dur, True)
+    legacy_features.create_h5py_file(str(tmp_path.joinpath('legacy.h5')), file_mapping, list(features),
+                                     sample_length, reset_dur, True)
+
+    with h5py.File(tmp_path.joinpath('core.h5'), 'r') as core_file, \
+            h5py.File(tmp_path.joinpath('legacy.h5'), 'r') as legacy_file:
+        assert set(core_file.keys()) == set(legacy_file.keys())
+        for name in ['data', 'indices']:
+            assert core_file[name].dtype == legacy_file[name].dtype
+            np.testing.assert_array_equal(core_file[name][()], legacy_file[name][()])
+        assert core_file['file_list'][()].tolist() == legacy_file['file_list'][()].tolist()
+
+
+def test_utterance_normalisation_matches_cmvn(tmp_path):
+    wav_paths = create_synthetic_wavs(tmp_path.joinpath('wavs'), 4, duration_range=(0.2, 0.5), seed=2)
+    keys = get_frames_keys([str(wav_path) for wav_path in wav_paths], 'utterance')
+    create_normalised_h5py_file(tmp_path.joinpath('normalised.h5'), wav_paths,
+                                core_features.iter_acoustic_features(wav_paths, cmvn=False), 50, 10, keys,
+                                'utterance')
+    cmvn_features = core_features.extract_acoustic_features(wav_paths, cmvn=True)
+
+    data, _, indices = h5_io.read_input_features(tmp_path.joinpath('normalised.h5'))
+    trials = h5_io.get_trials_list(data, indices)
+    assert len(trials) == len(cmvn_features)
+    for trial, features in zip(trials, cmvn_features):
+        np.testing.assert_allclose(trial, features, rtol=0, atol=TOLERANCE * np.max(np.abs(features)))
+
+
+@pytest.mark.parametrize('scheme', ['speaker', 'corpus', 'global'])
+def test_normalisation_with_statistics_file_matches_accumulated(tmp_path, scheme):
+    frames = [30, 12, 55, 40, 8]
+    features = create_synthetic_features(frames, 4, seed=5)
+    file_mapping = [f'speaker_{idx % 2}/trial_{idx}.wav' for idx in range(len(frames))]
+    speakers = {f'trial_{idx}': f'speaker_{idx % 2}' for idx in range(len(frames))}
+    keys = get_frames_keys(file_mapping, scheme, 'corpus', speakers)
+    statistics_path = tmp_path.joinpath('statistics.npz')
+
+    # Accumulated while writing (and saved), then applied on the fly from the statistics file
+    create_normalised_h5py_file(tmp_path.joinpath('accumulated.h5'), file_mapping, iter(features), 32, 5, keys,
+                                scheme, statistics_path)
+    create_normalised_h5py_file(tmp_path.joinpath('on_the_fly.h5'), file_mapping, iter(features), 32, 5, keys,
+                                scheme, statistics_path)
+
+    statistics, statistics_scheme = load_statistics(statistics_path)
+    assert statistics_scheme == scheme
+    for key in set(keys):
+        key_features = np.concatenate([file_features for file_features, file_key in zip(features, keys)
+                                       if file_key == key])
+        position = statistics.keys.index(key)
+        np.testing.assert_allclose(statistics.means[position], key_features.mean(axis=0))
+        np.testing.assert_allclose(statistics.std[position], key_features.std(axis=0))
+
+    accumulated = h5_io.read_input_features(tmp_path.joinpath('accumulated.h5'))
+    on_the_fly = h5_io.read_input_features(tmp_path.joinpath('on_the_fly.h5'))
+    np.testing.assert_allclose(accumulated[0], on_the_fly[0], rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(accumulated[2], on_the_fly[2])
+    assert accumulated[1] == on_the_fly[1]
+
+
+def test_running_statistics_updates_only_the_groups_of_the_frames():
+    features = create_synthetic_features([30, 12, 55, 40, 8, 21], 4, seed=6)
+    groups = [0, 3, 1, 3, 0, 2]
+    per_file = RunningStatistics(['a', 'b', 'c', 'd', 'unused'], 4)
+    for file_features, group in zip(features, groups):
+        per_file.update(file_features, np.full(len(file_features), group))
+    at_once = RunningStatistics(['a', 'b', 'c', 'd', 'unused'], 4)
+    at_once.update(np.concatenate(features), np.concatenate([np.full(len(file_features), group)
+                                                             for file_features, group in zip(features, groups)]))
+
+    np.testing.assert_array_equal(per_file.counts, at_once.counts)
+    np.testing.assert_allclose(per_file.means, at_once.means)
+    np.testing.assert_allclose(per_file.m2, at_once.m2)
+    assert per_file.counts[4] == 0 and not np.any(per_file.means[4]) and not np.any(per_file.m2[4])
+    normalised = per_file.normalise(features[1], np.full(len(features[1]), 3))
+    np.testing.assert_allclose(normalised, (features[1] - at_once.means[3]) / at_once.std[3])
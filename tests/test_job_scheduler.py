@@ -0,0 +1,66 @@
+"""
+    The code listed for each job of the grid covers the modules of the repository imported by its script (directly or
+    through other modules, including the lazy imports), so a change in any of them makes the pipeline run it again.
+
+    @date 19.10.2026
+"""
+
+import ast
+import json
+import pathlib
+
+from orchestration.job_scheduler import REPOSITORY_PATH, expand_grid
+
+
+def _resolve_module(name, roots):
+    # File of the module (or of the longest importable prefix of the name) in the folders of the python path
+    parts = name.split('.')
+    for root in roots:
+        for length in range(len(parts), 0, -1):
+            path = root.joinpath(*parts[:length])
+            if path.with_suffix('.py').is_file():
+                return path.with_suffix('.py')
+            if length == len(parts) and path.joinpath('__init__.py').is_file():
+                return path.joinpath('__init__.py')
+    return None
+
+
+def _get_imported_files(script_path, roots):
+    imported, pending = set(), [script_path]
+    while pending:
+        file_path = pending.pop()
+        if file_path in imported:
+            continue
+        imported.add(file_path)
+        for node in ast.walk(ast.parse(file_path.read_text())):
+            names = []
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+                names = [node.module] + [f'{node.module}.{alias.name}' for alias in node.names]
+            for name in names:
+                module_path = _resolve_module(name, roots)
+                if module_path is not None:
+                    pending.append(module_path)
+    return imported
+
+
+def test_jobs_code_covers_the_imported_modules(tmp_path):
+    grid = {'output_folder': 'results', 'model_type': 'cpc', 'checkpoints': {'0': 'cpc_0.h5'},
+            'vowel_discrimination': {'hc': {'input_features_path': 'hc.h5', 'corpus_info_path': 'hc.npz',
+                                            'audio_path': 'hc_audio'}},
+            'ids_preference': {'input_features_path': 'ids.h5', 'trials_path': 'ids_trials'}}
+    grid_path = tmp_path.joinpath('grid.json')
+    with open(grid_path, 'w') as grid_file:
+        json.dump(grid, grid_file)
+
+    jobs = expand_grid(grid_path)
+    assert {job['id'] for job in jobs} == {'features_hc', 'features_ids', '0_inference_hc', '0_vowel_hc_native',
+                                           '0_ids'}
+    for job in jobs:
+        code_paths = [REPOSITORY_PATH.joinpath(code_path) for code_path in job['code']]
+        roots = [pathlib.Path(folder) for folder in job['python_path']]
+        script_path = pathlib.Path(job['cwd']).joinpath(job['command'][1])
+        for file_path in _get_imported_files(script_path, roots):
+            assert any(file_path == code_path or code_path in file_path.parents for code_path in code_paths), \
+                f'{file_path.relative_to(REPOSITORY_PATH)} is not in the code of {job["id"]}'
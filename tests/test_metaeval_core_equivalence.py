@@ -0,0 +1,198 @@
+"""
+    metaeval_core gives the same outputs as the implementations of the experiments it replaced (tests/legacy): trial
+    segmentation of h5py files, acoustic feature extraction from wav files and zip archives, and the CPC objects
+    (skipped when TensorFlow is not installed).
+
+    @date 19.10.2026
+"""
+
+import zipfile
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic_data import create_synthetic_wavs, create_synthetic_features
+from legacy import extract_acoustic_features as legacy_features
+from legacy import read_predictions_and_features as legacy_io
+from metaeval_core import h5_io
+from metaeval_core.extract_acoustic_features import extract_acoustic_features, create_h5py_file
+
+# Maximum absolute difference of the features relative to the largest absolute value of each utterance
+FEATURES_TOLERANCE = 1e-5
+
+
+def _get_indices(frames, reset_dur, sample_length):
+    # Indices (samples, sample_length, 2) laid out as create_h5py_file does
+    indices = []
+    for file_id, n_frames in enumerate(frames):
+        indices.append(np.stack([np.full(n_frames, file_id), np.arange(n_frames)], axis=1))
+        indices.append(np.stack([np.full(reset_dur, -1), np.zeros(reset_dur)], axis=1))
+    indices = np.concatenate(indices)
+    extra_frames = sample_length - (len(indices) % sample_length)
+    indices = np.concatenate([indices, np.stack([np.full(extra_frames, -1), np.zeros(extra_frames)], axis=1)])
+    return indices.reshape(-1, sample_length, 2)
+
+
+def _get_legacy_boundaries(indices):
+    # Boundaries of the trials given by the previous loop, using the frame number as the only feature
+    total_frames = indices.reshape(-1, 2).shape[0]
+    trials = legacy_io.get_trials_list(np.arange(total_frames).reshape(-1, 1), indices)
+    return np.array([trial[0, 0] for trial in trials]), np.array([trial[-1, 0] + 1 for trial in trials])
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_get_trials_boundaries_matches_legacy_loop(seed):
+    rng = np.random.default_rng(seed)
+    frames = rng.integers(1, 60, size=rng.integers(1, 30)).tolist()
+    indices = _get_indices(frames, int(rng.choice([0, 1, 7])), int(rng.choice([1, 16, 50, 200])))
+
+    starts, ends = h5_io.get_trials_boundaries(indices)
+    legacy_starts, legacy_ends = _get_legacy_boundaries(indices)
+    np.testing.assert_array_equal(starts, legacy_starts)
+    np.testing.assert_array_equal(ends, legacy_ends)
+    np.testing.assert_array_equal(ends - starts, frames)
+
+
+@pytest.mark.parametrize('file_ids', [[0, 0, 1, 1, 1, 2], [-1, -1, 0, 0, -1, 1], [0, 0, -1, -1, 1, -1],
+                                      [0, 1, 2, 3], [-1, -1, -1], [0, 0, 0, 1]])
+def test_get_trials_list_matches_legacy_loop_on_edge_layouts(file_ids):
+    indices = np.stack([np.array(file_ids), np.zeros(len(file_ids))], axis=1).reshape(1, -1, 2)
+    features = np.random.default_rng(0).standard_normal((1, len(file_ids), 3))
+
+    trials = h5_io.get_trials_list(features, indices)
+    legacy_trials = legacy_io.get_trials_list(features, indices)
+    assert len(trials) == len(legacy_trials)
+    for trial, legacy_trial in zip(trials, legacy_trials):
+        np.testing.assert_array_equal(trial, legacy_trial)
+
+
+def test_read_input_features_and_trials_match_legacy(tmp_path):
+    frames = [35, 1, 80, 12, 60]
+    features = create_synthetic_features(frames, 4)
+    file_mapping = [f'trials/trial_{idx}.wav' for idx in range(len(frames))]
+    h5_path = tmp_path.joinpath('input_features.h5')
+    create_h5py_file(str(h5_path), file_mapping, list(features), 50, reset_dur=10, include_indices=True)
+
+    data, mapping, indices = h5_io.read_input_features(h5_path)
+    legacy_data, legacy_mapping, legacy_indices = legacy_io.read_input_features(h5_path)
+    np.testing.assert_array_equal(data, legacy_data)
+    np.testing.assert_array_equal(indices, legacy_indices)
+    assert mapping == legacy_mapping
+
+    trials = h5_io.get_trials_list(data, indices)
+    legacy_trials = legacy_io.get_trials_list(legacy_data, legacy_indices)
+    assert len(trials) == len(legacy_trials) == len(features)
+    for trial, legacy_trial, feature in zip(trials, legacy_trials, features):
+        np.testing.assert_array_equal(trial, legacy_trial)
+        np.testing.assert_array_equal(trial, feature)
+
+
+def _assert_features_close(features, legacy_features_list):
+    assert len(features) == len(legacy_features_list)
+    for utterance_features, legacy_utterance_features in zip(features, legacy_features_list):
+        assert utterance_features.shape == legacy_utterance_features.shape
+        np.testing.assert_allclose(utterance_features, legacy_utterance_features, rtol=0,
+                                   atol=FEATURES_TOLERANCE * np.max(np.abs(legacy_utterance_features)))
+
+
+@pytest.mark.parametrize('name, num_features, cmvn', [('mfcc', 13, True), ('mfcc', 13, False),
+                                                      ('logmel', 40, True)])
+def test_extract_acoustic_features_matches_legacy(tmp_path, name, num_features, cmvn):
+    wav_paths = create_synthetic_wavs(tmp_path, 5, duration_range=(0.2, 0.6))
+    # Several chunks processed in parallel are gathered in the order of the files
+    features = extract_acoustic_features(wav_paths, num_features=num_features, cmvn=cmvn, name=name, n_jobs=2,
+                                         chunk_size=2)
+    legacy_features_list = legacy_features.extract_acoustic_features(wav_paths, num_features=num_features,
+                                                                     cmvn=cmvn, name=name)
+    _assert_features_close(features, legacy_features_list)
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_extract_acoustic_features_from_zip_matches_legacy(tmp_path, compression):
+    wav_paths = create_synthetic_wavs(tmp_path.joinpath('wavs'), 4, duration_range=(0.2, 0.5), seed=1)
+    zip_path = tmp_path.joinpath('corpus.zip')
+    with zipfile.ZipFile(zip_path, 'w', compression=compression) as zip_file:
+        for wav_path in wav_paths:
+            zip_file.write(wav_path, f'corpus/{wav_path.name}')
+    members = [f'corpus/{wav_path.name}' for wav_path in wav_paths]
+
+    features = extract_acoustic_features(members, zip_path=zip_path)
+    legacy_features_list = legacy_features.extract_acoustic_features(members, zip_path=zip_path)
+    _assert_features_close(features, legacy_features_list)
+
+
+def test_create_h5py_file_matches_legacy(tmp_path):
+    frames = [20, 45, 7]
+    features = create_synthetic_features(frames, 3, seed=2)
+    file_mapping = [f'trial_{idx}.wav' for idx in range(len(frames))]
+    create_h5py_file(str(tmp_path.joinpath('core.h5')), file_mapping, list(features), 32, 5, True)
+    legacy_features.create_h5py_file(str(tmp_path.joinpath('legacy.h5')), file_mapping, list(features), 32, 5, True)
+
+    for output, legacy_output in zip(h5_io.read_input_features(tmp_path.joinpath('core.h5')),
+                                     h5_io.read_input_features(tmp_path.joinpath('legacy.h5'))):
+        np.testing.assert_array_equal(np.asarray(output), np.asarray(legacy_output))
+
+
+@pytest.fixture(scope='module')
+def cpc_modules():
+    tf = pytest.importorskip('tensorflow')
+    from legacy import cpc_utils as legacy_cpc_utils
+    from metaeval_core import cpc_utils
+    return tf, cpc_utils, legacy_cpc_utils
+
+
+def test_feature_encoder_matches_legacy(cpc_modules):
+    tf, cpc_utils, legacy_cpc_utils = cpc_modules
+    inputs = tf.constant(np.random.default_rng(0).standard_normal((3, 20, 39)), dtype=tf.float32)
+    encoder = cpc_utils.FeatureEncoder(2, 16, 0.2)
+    legacy_encoder = legacy_cpc_utils.FeatureEncoder(2, 16, 0.2)
+    encoder(inputs)
+    legacy_encoder(inputs)
+    legacy_encoder.set_weights(encoder.get_weights())
+
+    np.testing.assert_array_equal(encoder(inputs, training=False).numpy(),
+                                  legacy_encoder(inputs, training=False).numpy())
+    assert encoder.get_config() == legacy_encoder.get_config()
+
+
+def test_contrastive_loss_matches_legacy(cpc_modules):
+    tf, cpc_utils, legacy_cpc_utils = cpc_modules
+    rng = np.random.default_rng(1)
+    true_latent = tf.constant(rng.standard_normal((2, 15, 8)), dtype=tf.float32)
+    context_latent = tf.constant(rng.standard_normal((2, 15, 6)), dtype=tf.float32)
+    loss_block = cpc_utils.ContrastiveLoss(6, 4, 3)
+    legacy_loss_block = legacy_cpc_utils.ContrastiveLoss(6, 4, 3)
+    loss_block([true_latent, context_latent])
+    legacy_loss_block([true_latent, context_latent])
+    legacy_loss_block.set_weights(loss_block.get_weights())
+
+    # The negative samples are random, both blocks draw them with the same seed
+    tf.random.set_seed(3)
+    loss = loss_block([true_latent, context_latent]).numpy()
+    tf.random.set_seed(3)
+    legacy_loss = legacy_loss_block([true_latent, context_latent]).numpy()
+    np.testing.assert_allclose(loss, legacy_loss, rtol=1e-6)
+
+
+def test_get_negative_samples_matches_legacy(cpc_modules):
+    tf, cpc_utils, legacy_cpc_utils = cpc_modules
+    samples, timesteps, features, neg = 3, 12, 5, 4
+    # Each feature vector encodes its sample and time step
+    values = np.arange(samples * timesteps, dtype=np.float32).reshape(samples, timesteps, 1)
+    true_features = tf.constant(np.repeat(values, features, axis=2))
+
+    tf.random.set_seed(7)
+    negative_samples = cpc_utils.get_negative_samples(true_features, neg).numpy()
+    tf.random.set_seed(7)
+    legacy_negative_samples = legacy_cpc_utils.get_negative_samples(true_features, neg).numpy()
+    tf.random.set_seed(7)
+    block_negative_samples = legacy_cpc_utils.ContrastiveLoss(features, neg, 1).get_negative_samples(
+        true_features).numpy()
+
+    assert negative_samples.shape == (neg, samples, timesteps, features)
+    np.testing.assert_array_equal(negative_samples, legacy_negative_samples)
+    np.testing.assert_array_equal(negative_samples, block_negative_samples)
+    # Negatives come from the time steps of the same sample
+    source = negative_samples[..., 0].astype(np.int64)
+    np.testing.assert_array_equal(source // timesteps, np.broadcast_to(np.arange(samples)[None, :, None],
+                                                                       (neg, samples, timesteps)))
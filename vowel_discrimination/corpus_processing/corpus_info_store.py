@@ -0,0 +1,190 @@
+"""
+    Columnar storage of the corpus information (one row per trial) replacing the pickled nested dictionaries.
+
+    The store is a numpy .npz file (no pickled objects) with the trial names, categorical columns (vowel, speaker,
+    language, logatome, phones, variability, repetition, perceived) saved as integer codes plus their categories, and
+    typed columns for the vowel onset/offset (ms) and the listeners' test result. `CorpusInfo` gives an indexed view of
+    the columns and keeps dictionary-style access (corpus_info[trial]['details']['language']) for compatibility.
+
+    Legacy corpus_info.pickle files (e.g., the one distributed with the IVC corpus) can still be loaded and converted.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['CorpusInfo', 'load_corpus_info', 'save_corpus_info', 'as_corpus_info']
+
+import argparse
+import pathlib
+import pickle
+import re
+from collections.abc import Mapping
+from typing import Union, List, Dict, Iterator
+
+import numpy as np
+
+CATEGORICAL_COLUMNS = ['vowel', 'speaker', 'language', 'logatome', 'phones', 'variability', 'repetition', 'perceived']
+FLOAT_COLUMNS = ['vowel_onset', 'vowel_offset']
+BOOL_COLUMNS = ['failed_listeners_test']
+DETAILS_COLUMNS = ['language', 'logatome', 'phones', 'failed_listeners_test', 'perceived']
+# Columns parsed from the OLLO file names, they are not part of the dictionary representation
+OLLO_NAME_COLUMNS = {'variability': r'(V\d)', 'repetition': r'(N\d)'}
+ZIP_MAGIC = b'PK\x03\x04'
+
+
+def _encode_details_value(name: str, value) -> str:
+    if name == 'phones':
+        return ' '.join(value)
+    if name == 'perceived':
+        return ' '.join(f'{vowel}:{votes}' for vowel, votes in value)
+    return value
+
+
+def _decode_details_value(name: str, value):
+    if name == 'phones':
+        return value.split()
+    if name == 'perceived':
+        return [(item.rsplit(':', 1)[0], int(item.rsplit(':', 1)[1])) for item in value.split()]
+    return value
+
+
+class CorpusInfo(Mapping):
+    def __init__(self, trials: np.ndarray, codes: Dict[str, np.ndarray], categories: Dict[str, np.ndarray],
+                 values: Dict[str, np.ndarray], fields: List[str]):
+        self.trials = trials
+        self._codes = codes
+        self._categories = categories
+        self._values = values
+        # Keys of the dictionary representation (top level and details) available for this corpus
+        self.fields = list(fields)
+        self._index = None
+
+    @classmethod
+    def from_dict(cls, corpus_info: dict) -> 'CorpusInfo':
+        trials = list(corpus_info.keys())
+        entries = [corpus_info[trial] for trial in trials]
+        fields = set()
+        for entry in entries:
+            fields.update(key for key in entry.keys() if key != 'details')
+            fields.update(entry.get('details', {}).keys())
+        fields.intersection_update(CATEGORICAL_COLUMNS + FLOAT_COLUMNS + BOOL_COLUMNS)
+        fields.difference_update(OLLO_NAME_COLUMNS.keys())
+
+        codes, categories, values = {}, {}, {}
+        for name in CATEGORICAL_COLUMNS:
+            if name in OLLO_NAME_COLUMNS:
+                searches = [re.search(OLLO_NAME_COLUMNS[name], trial) for trial in trials]
+                column = [search.group(1) if search else '' for search in searches]
+            elif name in DETAILS_COLUMNS:
+                column = [_encode_details_value(name, entry.get('details', {})[name])
+                          if name in entry.get('details', {}) else '' for entry in entries]
+            else:
+                column = [entry.get(name, '') for entry in entries]
+            categories[name], codes[name] = np.unique(np.array(column, dtype=str), return_inverse=True)
+            codes[name] = codes[name].reshape(-1).astype(np.int32)
+        for name in FLOAT_COLUMNS:
+            values[name] = np.array([entry.get(name, np.nan) for entry in entries], dtype=np.float64)
+        for name in BOOL_COLUMNS:
+            values[name] = np.array([entry.get('details', {}).get(name, False) for entry in entries], dtype=bool)
+
+        return cls(np.array(trials, dtype=str), codes, categories, values, sorted(fields))
+
+    @property
+    def index(self) -> Dict[str, int]:
+        # trial name -> row, built on first use to keep loading fast
+        if self._index is None:
+            self._index = {trial: row for row, trial in enumerate(self.trials.tolist())}
+        return self._index
+
+    def rows(self, trials: List[str]) -> np.ndarray:
+        return np.array([self.index[trial] for trial in trials], dtype=np.int64)
+
+    def codes(self, name: str) -> np.ndarray:
+        return self._codes[name]
+
+    def categories(self, name: str) -> np.ndarray:
+        return self._categories[name]
+
+    def column(self, name: str) -> np.ndarray:
+        if name in self._values:
+            return self._values[name]
+        return self._categories[name][self._codes[name]]
+
+    def mask(self, name: str, values: Union[str, List[str]]) -> np.ndarray:
+        # Rows whose categorical value is in values, comparing integer codes
+        values = [values] if isinstance(values, str) else values
+        selected = np.flatnonzero(np.isin(self._categories[name], values))
+        return np.isin(self._codes[name], selected)
+
+    def __getitem__(self, trial: str) -> dict:
+        row = self.index[trial]
+        entry = {'details': {}}
+        for name in self.fields:
+            if name in self._values:
+                value = self._values[name][row].item()
+            else:
+                value = _decode_details_value(name, str(self._categories[name][self._codes[name][row]]))
+            if name in DETAILS_COLUMNS:
+                entry['details'][name] = value
+            else:
+                entry[name] = value
+        return entry
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.trials.tolist())
+
+    def __len__(self) -> int:
+        return len(self.trials)
+
+    def __contains__(self, trial) -> bool:
+        return trial in self.index
+
+
+def as_corpus_info(corpus_info: Union[dict, CorpusInfo]) -> CorpusInfo:
+    return corpus_info if isinstance(corpus_info, CorpusInfo) else CorpusInfo.from_dict(corpus_info)
+
+
+def save_corpus_info(corpus_info: Union[dict, CorpusInfo], output_path: Union[str, pathlib.Path]) -> None:
+    corpus_info = as_corpus_info(corpus_info)
+    arrays = {'trials': corpus_info.trials, 'fields': np.array(corpus_info.fields, dtype=str)}
+    for name in CATEGORICAL_COLUMNS:
+        arrays[f'{name}_codes'] = corpus_info.codes(name)
+        arrays[f'{name}_categories'] = corpus_info.categories(name)
+    for name in FLOAT_COLUMNS + BOOL_COLUMNS:
+        arrays[name] = corpus_info.column(name)
+
+    pathlib.Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    # A file object is used so numpy does not append the .npz extension to the path given
+    with open(output_path, 'wb') as data_file:
+        np.savez(data_file, **arrays)
+
+
+def load_corpus_info(corpus_info_path: Union[str, pathlib.Path]) -> CorpusInfo:
+    with open(corpus_info_path, 'rb') as data_file:
+        is_store = data_file.read(len(ZIP_MAGIC)) == ZIP_MAGIC
+
+    if not is_store:
+        # Legacy pickled dictionary. Only load pickle files from trusted sources.
+        with open(corpus_info_path, 'rb') as data_file:
+            return CorpusInfo.from_dict(pickle.load(data_file))
+
+    with np.load(corpus_info_path, allow_pickle=False) as data:
+        codes = {name: data[f'{name}_codes'] for name in CATEGORICAL_COLUMNS}
+        categories = {name: data[f'{name}_categories'] for name in CATEGORICAL_COLUMNS}
+        values = {name: data[name] for name in FLOAT_COLUMNS + BOOL_COLUMNS}
+        return CorpusInfo(data['trials'], codes, categories, values, data['fields'].tolist())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to convert a legacy corpus info file (pickled dictionary) '
+                                                 'into the columnar corpus info store. '
+                                                 '\nUsage: python corpus_info_store.py '
+                                                 '--input_path path_corpus_info_pickle '
+                                                 '--output_path path_corpus_info_file ')
+
+    parser.add_argument('--input_path', type=str, required=True)
+    parser.add_argument('--output_path', type=str, required=True)
+
+    args = parser.parse_args()
+
+    save_corpus_info(load_corpus_info(args.input_path), args.output_path)
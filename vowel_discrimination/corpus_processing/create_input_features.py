@@ -1,5 +1,7 @@
 """
-    It extracts acoustic features from a corpus and create the input features h5py file for PC models
+    It extracts acoustic features from a corpus and create the input features h5py file for PC models. Optionally, the
+    features are normalised per utterance, speaker, corpus or globally (see feature_normalisation) while the h5py file
+    is written.
     @date 18.05.2021
 """
 __docformat__ = ['reStructuredText']
@@ -7,36 +9,57 @@ __all__ = ['obtain_features_hillenbrands_corpus', 'obtain_features_ollo_corpus',
            'obtain_features_isolated_vowel_corpus']
 
 import argparse
+import itertools
 import pathlib
-import pickle
-from typing import List, Union, Optional
+from typing import List, Union, Optional, Iterable
 
-from corpus_processing.extract_acoustic_features import extract_acoustic_features, create_h5py_file
+import numpy as np
+
+from corpus_processing.corpus_info_store import load_corpus_info
+from corpus_processing.extract_acoustic_features import iter_acoustic_features, create_h5py_file
+from corpus_processing.feature_normalisation import get_frames_keys, get_speakers, create_normalised_h5py_file, \
+    SCHEMES
 from corpus_processing.preprocess_ollo_corpus import obtain_audio_paths
 
+SAMPLE_LENGTH = 200
+
+
+def _create_features_file(output_path: Union[str, pathlib.Path], files: Union[List[str], List[pathlib.Path]],
+                          features: Iterable[np.ndarray], reset_dur: int, normalisation: Optional[str] = None,
+                          statistics_path: Optional[Union[str, pathlib.Path]] = None,
+                          corpus_info_path: Optional[Union[str, pathlib.Path]] = None) -> None:
+    # The features are written as they are extracted. The name of the output file is the key of the corpus scheme.
+    if normalisation is None:
+        create_h5py_file(output_path, files, features, SAMPLE_LENGTH, reset_dur, True)
+        return
+    speakers = get_speakers(corpus_info_path) if normalisation == 'speaker' else None
+    keys = get_frames_keys([str(file) for file in files], normalisation, pathlib.Path(output_path).stem, speakers)
+    create_normalised_h5py_file(output_path, files, features, SAMPLE_LENGTH, reset_dur, keys, normalisation,
+                                statistics_path)
+
 
 def _get_audio_files_paths(corpus_info_path: Union[str, pathlib.Path],
                            zip_files_paths: Union[List[str], List[pathlib.Path]]) -> List[List[str]]:
-    with open(corpus_info_path, 'rb') as data_file:
-        corpus_info = pickle.load(data_file)
+    corpus_info = load_corpus_info(corpus_info_path)
 
-    filtered_logatomes = list(set(corpus_info[trial_file]['details']['logatome'] for trial_file in corpus_info.keys()))
+    filtered_logatomes = np.unique(corpus_info.column('logatome')).tolist()
 
     return obtain_audio_paths(zip_files_paths, filtered_logatomes)
 
 
 def obtain_features_ollo_corpus(corpus_info_path: Union[str, pathlib.Path],
                                 zip_files_paths: Union[List[str], List[pathlib.Path]],
-                                output_path: str, cmvn: Optional[bool] = True) -> None:
+                                output_path: str, cmvn: Optional[bool] = True, n_jobs: Optional[int] = 1,
+                                normalisation: Optional[str] = None,
+                                statistics_path: Optional[Union[str, pathlib.Path]] = None) -> None:
     audio_files_paths = _get_audio_files_paths(corpus_info_path, zip_files_paths)
     audio_files_paths = [sorted(paths) for paths in audio_files_paths]
-    features = []
-
-    for idx, zip_file in enumerate(zip_files_paths):
-        features += extract_acoustic_features(audio_files_paths[idx], zip_path=zip_file, cmvn=cmvn)
+    features = itertools.chain.from_iterable(
+        iter_acoustic_features(audio_files_paths[idx], zip_path=zip_file, cmvn=cmvn, n_jobs=n_jobs)
+        for idx, zip_file in enumerate(zip_files_paths))
 
     files = [audio_path for zip_file in audio_files_paths for audio_path in zip_file]
-    create_h5py_file(output_path, files, features, 200, 100, True)
+    _create_features_file(output_path, files, features, 100, normalisation, statistics_path, corpus_info_path)
 
 
 def _get_hillenbrands_corpus_trials_paths(corpus_path: Union[str, pathlib.Path],
@@ -44,12 +67,12 @@ def _get_hillenbrands_corpus_trials_paths(corpus_path: Union[str, pathlib.Path],
                                           include_listeners_test_failed: Optional[bool] = False) -> List[pathlib.Path]:
     trials_files = list(pathlib.Path(corpus_path).glob('**/*.wav'))
 
-    with open(corpus_info_path, 'rb') as data_file:
-        corpus_info = pickle.load(data_file)
+    corpus_info = load_corpus_info(corpus_info_path)
 
     if not include_listeners_test_failed:
+        failed_listeners_test = corpus_info.column('failed_listeners_test')
         trials_files = [file_path for file_path in trials_files
-                        if not corpus_info[file_path.resolve().stem]['details']['failed_listeners_test']]
+                        if not failed_listeners_test[corpus_info.index[file_path.resolve().stem]]]
 
     return trials_files
 
@@ -57,20 +80,25 @@ def _get_hillenbrands_corpus_trials_paths(corpus_path: Union[str, pathlib.Path],
 def obtain_features_hillenbrands_corpus(corpus_path: Union[str, pathlib.Path],
                                         corpus_info_path: Union[str, pathlib.Path],
                                         output_path: Union[str, pathlib.Path], cmvn: Optional[bool] = True,
-                                        listeners_failed: Optional[bool] = False) -> None:
+                                        listeners_failed: Optional[bool] = False, n_jobs: Optional[int] = 1,
+                                        normalisation: Optional[str] = None,
+                                        statistics_path: Optional[Union[str, pathlib.Path]] = None) -> None:
     trials_paths = _get_hillenbrands_corpus_trials_paths(corpus_path, corpus_info_path,
                                                          include_listeners_test_failed=listeners_failed)
     files = sorted(trials_paths)
-    features = extract_acoustic_features(files, cmvn=cmvn)
-    create_h5py_file(output_path, files, features, 200, 100, True)
+    features = iter_acoustic_features(files, cmvn=cmvn, n_jobs=n_jobs)
+    _create_features_file(output_path, files, features, 100, normalisation, statistics_path, corpus_info_path)
 
 
 def obtain_features_isolated_vowel_corpus(wav_files_path: Union[str, pathlib.Path],
-                                          output_path: Union[str, pathlib.Path], cmvn: Optional[bool] = True) -> None:
+                                          output_path: Union[str, pathlib.Path], cmvn: Optional[bool] = True,
+                                          n_jobs: Optional[int] = 1, normalisation: Optional[str] = None,
+                                          statistics_path: Optional[Union[str, pathlib.Path]] = None,
+                                          corpus_info_path: Optional[Union[str, pathlib.Path]] = None) -> None:
     files = list(pathlib.Path(wav_files_path).iterdir())
     files = sorted(files)
-    features = extract_acoustic_features(files, cmvn=cmvn)
-    create_h5py_file(output_path, files, features, 200, 50, True)
+    features = iter_acoustic_features(files, cmvn=cmvn, n_jobs=n_jobs)
+    _create_features_file(output_path, files, features, 50, normalisation, statistics_path, corpus_info_path)
 
 
 if __name__ == '__main__':
@@ -82,13 +110,19 @@ if __name__ == '__main__':
                                                  '--output_path path_h5py_output_file '
                                                  '[--cmvn | --no-cmvn] '
                                                  '[--corpus_info_path] '
-                                                 '[--listeners_failed | --no-listeners_failed]')
+                                                 '[--listeners_failed | --no-listeners_failed] '
+                                                 '[--n_jobs number_of_processes] '
+                                                 '[--normalisation utterance|speaker|corpus|global] '
+                                                 '[--statistics_path path_statistics_file]')
 
     parser.add_argument('--corpus', type=str, choices=['ivc', 'hc', 'oc'], required=True)
     parser.add_argument('--audio_path', type=str, required=True)
     parser.add_argument('--output_path', type=str, required=True)
 
     parser.add_argument('--corpus_info_path', type=str)
+    parser.add_argument('--n_jobs', type=int, default=1)
+    parser.add_argument('--normalisation', type=str, choices=SCHEMES)
+    parser.add_argument('--statistics_path', type=str)
 
     parser.add_argument('--cmvn', dest='cmvn', action='store_true')
     parser.add_argument('--no-cmvn', dest='cmvn', action='store_false')
@@ -100,18 +134,26 @@ if __name__ == '__main__':
 
     args = parser.parse_args()
 
+    assert not (args.cmvn and args.normalisation), 'Features normalised with cmvn cannot be normalised again'
+    if args.normalisation == 'speaker' and args.corpus_info_path is None:
+        raise argparse.ArgumentError(args.corpus_info_path, '--corpus_info_path is required for the speaker '
+                                                            'normalisation.')
+
     if args.corpus == 'ivc':
-        obtain_features_isolated_vowel_corpus(args.audio_path, args.output_path, args.cmvn)
+        obtain_features_isolated_vowel_corpus(args.audio_path, args.output_path, args.cmvn, args.n_jobs,
+                                              args.normalisation, args.statistics_path, args.corpus_info_path)
     elif args.corpus == 'hc':
         if args.corpus_info_path is None:
             raise argparse.ArgumentError(args.corpus_info_path, '--corpus_info_path is required for processing the '
                                                                 'Hillenbrand\'s corpus.')
         else:
             obtain_features_hillenbrands_corpus(args.audio_path, args.corpus_info_path, args.output_path, args.cmvn,
-                                                args.listeners_failed)
+                                                args.listeners_failed, args.n_jobs, args.normalisation,
+                                                args.statistics_path)
     else:  # oc
         if args.corpus_info_path is None:
             raise argparse.ArgumentError(args.corpus_info_path, '--corpus_info_path is required for processing the '
                                                                 'OLLO corpus.')
         else:
-            obtain_features_ollo_corpus(args.corpus_info_path, [args.audio_path], args.output_path, args.cmvn)
+            obtain_features_ollo_corpus(args.corpus_info_path, [args.audio_path], args.output_path, args.cmvn,
+                                        args.n_jobs, args.normalisation, args.statistics_path)
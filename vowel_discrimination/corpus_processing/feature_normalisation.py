@@ -0,0 +1,78 @@
+"""
+    Normalisation of input features with running statistics (mean and variance) accumulated per utterance, speaker,
+    corpus or globally. The implementation is shared with the IDS preference experiment
+    (metaeval_core.feature_normalisation); the speakers of the files come from the corpus info of the vowel
+    discrimination corpora.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['RunningStatistics', 'get_frames_keys', 'accumulate_h5py_statistics', 'normalise_h5py_file',
+           'save_statistics', 'load_statistics', 'accumulate_features_statistics', 'normalise_features',
+           'create_normalised_h5py_file', 'get_speakers']
+
+import argparse
+import pathlib
+from typing import Union, Dict, Optional
+
+import h5py
+
+from corpus_processing.corpus_info_store import load_corpus_info
+from metaeval_core.feature_normalisation import RunningStatistics, get_frames_keys, accumulate_h5py_statistics, \
+    normalise_h5py_file, save_statistics, load_statistics, accumulate_features_statistics, normalise_features, \
+    create_normalised_h5py_file, SCHEMES
+
+
+def get_speakers(corpus_info_path: Optional[Union[str, pathlib.Path]]) -> Dict[str, str]:
+    # Speaker of each file (name without extension) of the corpus info
+    assert corpus_info_path, 'The corpus info file is required for the speaker normalisation'
+    corpus_info = load_corpus_info(corpus_info_path)
+    speakers = corpus_info.column('speaker')
+    return {file_name: str(speakers[position]) for file_name, position in corpus_info.index.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to normalise the features of h5py files (created without '
+                                                 'cmvn) with statistics accumulated per utterance, speaker, corpus or '
+                                                 'globally. '
+                                                 '\nUsage: python feature_normalisation.py '
+                                                 '--input_paths path_h5py_file1 [path_h5py_file2 ...] '
+                                                 '--output_folder path_output_folder '
+                                                 '--scheme utterance|speaker|corpus|global '
+                                                 '[--corpus_info_paths path_corpus_info1 ...] '
+                                                 '[--statistics_path path_statistics_file]')
+
+    parser.add_argument('--input_paths', type=str, nargs='+', required=True)
+    parser.add_argument('--output_folder', type=str, required=True)
+    parser.add_argument('--scheme', type=str, choices=SCHEMES, required=True)
+    parser.add_argument('--corpus_info_paths', type=str, nargs='+')
+    parser.add_argument('--statistics_path', type=str)
+
+    args = parser.parse_args()
+
+    corpus_info_paths = args.corpus_info_paths if args.corpus_info_paths else [None] * len(args.input_paths)
+    assert len(corpus_info_paths) == len(args.input_paths)
+
+    files_keys = []
+    for input_path, corpus_info_path in zip(args.input_paths, corpus_info_paths):
+        with h5py.File(input_path, 'r') as h5_file:
+            file_list = [file_path.decode() if isinstance(file_path, bytes) else file_path
+                         for file_path in h5_file['file_list']]
+        speakers = get_speakers(corpus_info_path) if args.scheme == 'speaker' else None
+        files_keys.append(get_frames_keys(file_list, args.scheme, pathlib.Path(input_path).stem, speakers))
+
+    if args.statistics_path and pathlib.Path(args.statistics_path).is_file():
+        # Statistics saved previously (e.g., global statistics of other corpora)
+        corpus_statistics, statistics_scheme = load_statistics(args.statistics_path)
+        assert statistics_scheme == args.scheme
+    else:
+        corpus_statistics = None
+        for input_path, keys in zip(args.input_paths, files_keys):
+            corpus_statistics = accumulate_h5py_statistics(input_path, keys, corpus_statistics)
+        if args.statistics_path:
+            save_statistics(corpus_statistics, args.scheme, args.statistics_path)
+
+    for input_path, keys in zip(args.input_paths, files_keys):
+        normalise_h5py_file(input_path, pathlib.Path(args.output_folder).joinpath(pathlib.Path(input_path).name),
+                            corpus_statistics, keys)
@@ -0,0 +1,103 @@
+"""
+    Index of the members of the OLLO zip files (audio and labels).
+
+    Each archive is scanned once: logatome, speaker, variability and repetition are parsed from every member name,
+    together with the position of the member in the archive. The index is saved next to the archive
+    (<archive>.index.json) with the size and modification time of the archive, so later calls only load it and filter
+    the members in memory. Members are read in archive order and in batches from a single open archive.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['OlloZipIndex', 'get_zip_index']
+
+import json
+import os
+import pathlib
+import re
+import zipfile
+from typing import Union, List, Optional, Iterator, Tuple, Dict
+
+INDEX_SUFFIX = '.index.json'
+INDEX_VERSION = 1
+MEMBER_FIELDS = {
+    'logatome': re.compile(r'(L\d+)'),
+    'speaker': re.compile(r'(S\d+[F,M])'),
+    'variability': re.compile(r'(V\d)'),
+    'repetition': re.compile(r'(N\d)')
+}
+
+
+def _get_archive_signature(zip_path: Union[str, pathlib.Path]) -> Dict[str, int]:
+    stat = os.stat(zip_path)
+    return {'archive_size': stat.st_size, 'archive_mtime_ns': stat.st_mtime_ns}
+
+
+def _scan_archive(zip_path: Union[str, pathlib.Path]) -> Dict[str, list]:
+    columns = {'name': [], 'header_offset': [], **{field: [] for field in MEMBER_FIELDS}}
+    with zipfile.ZipFile(zip_path) as zf:
+        for info in zf.infolist():
+            columns['name'].append(info.filename)
+            columns['header_offset'].append(info.header_offset)
+            for field, pattern in MEMBER_FIELDS.items():
+                search = pattern.search(info.filename)
+                columns[field].append(search.group(1) if search else None)
+    return columns
+
+
+class OlloZipIndex:
+    def __init__(self, zip_path: Union[str, pathlib.Path], columns: Dict[str, list]):
+        self.zip_path = pathlib.Path(zip_path)
+        self.columns = columns
+        self.positions = {name: idx for idx, name in enumerate(columns['name'])}
+
+    @property
+    def names(self) -> List[str]:
+        return self.columns['name']
+
+    def filter(self, logatomes: Optional[List[str]] = None, speakers: Optional[List[str]] = None,
+               variability: Optional[List[str]] = None, repetitions: Optional[List[str]] = None,
+               suffix: Optional[str] = None) -> List[str]:
+        # Members (in archive order) with a logatome in the name that satisfy all the filters given
+        filters = [(field, set(values)) for field, values in [('logatome', logatomes), ('speaker', speakers),
+                                                               ('variability', variability),
+                                                               ('repetition', repetitions)] if values is not None]
+        selected = []
+        for idx, name in enumerate(self.columns['name']):
+            if self.columns['logatome'][idx] is None:
+                continue
+            if suffix is not None and not name.endswith(suffix):
+                continue
+            if all(self.columns[field][idx] in values for field, values in filters):
+                selected.append(name)
+        return selected
+
+    def iter_members(self, names: List[str], batch_size: Optional[int] = 256) -> Iterator[List[Tuple[str, bytes]]]:
+        # Reads the members sorted by their position in the archive, yielding batches of (name, content)
+        ordered = sorted(names, key=lambda name: self.columns['header_offset'][self.positions[name]])
+        with zipfile.ZipFile(self.zip_path) as zf:
+            for start in range(0, len(ordered), batch_size):
+                yield [(name, zf.read(name)) for name in ordered[start:start + batch_size]]
+
+
+def get_zip_index(zip_path: Union[str, pathlib.Path], use_cache: Optional[bool] = True) -> OlloZipIndex:
+    index_path = pathlib.Path(f'{zip_path}{INDEX_SUFFIX}')
+    signature = _get_archive_signature(zip_path)
+
+    if use_cache and index_path.is_file():
+        with open(index_path, 'r') as index_file:
+            cached = json.load(index_file)
+        if cached.get('version') == INDEX_VERSION and all(cached.get(key) == value
+                                                          for key, value in signature.items()):
+            return OlloZipIndex(zip_path, cached['columns'])
+
+    columns = _scan_archive(zip_path)
+    if use_cache:
+        try:
+            with open(index_path, 'w') as index_file:
+                json.dump({'version': INDEX_VERSION, **signature, 'columns': columns}, index_file)
+        except OSError:
+            pass  # Read-only location, the index is only kept in memory
+
+    return OlloZipIndex(zip_path, columns)
@@ -26,9 +26,10 @@ __all__ = ['create_corpus_info_dict']
 
 import argparse
 import pathlib
-import pickle
 from typing import Union
 
+from corpus_processing.corpus_info_store import save_corpus_info
+
 SAMPA_MAPPING ={
     'iy': 'i',
     'ih': 'I',
@@ -89,8 +90,7 @@ def create_corpus_info_dict(output_path: Union[str, pathlib.Path], corpus_path:
     folder_path = pathlib.Path(output_path).parent
     folder_path.mkdir(parents=True, exist_ok=True)
 
-    with open(output_path, 'wb') as data_file:
-        pickle.dump(corpus_info, data_file)
+    save_corpus_info(corpus_info, output_path)
 
 
 if __name__ == '__main__':
@@ -32,11 +32,13 @@ __all__ = ['create_corpus_info_dict', 'obtain_audio_paths']
 import argparse
 import json
 import pathlib
-import pickle
 import re
 import zipfile
 from typing import Union, Optional, List
 
+from corpus_processing.corpus_info_store import save_corpus_info
+from corpus_processing.ollo_zip_index import get_zip_index
+
 
 def _read_logatomes_info(corpus_path: Union[str, pathlib.Path]) -> dict:
     logatomes_info = {}
@@ -83,48 +85,43 @@ def _filter_logatomes(logatomes_info: dict, context: Optional[str] = None) -> li
 
 
 def obtain_audio_paths(zip_list: List[Union[pathlib.Path, str]], filtered_logatomes: List[str]) -> List[List[str]]:
-    final_paths = []
-    for zip_file in zip_list:
-        with zipfile.ZipFile(zip_file) as zf:
-            audio_files = zf.namelist()
-            zip_paths = []
-            for audio_files in audio_files:
-                log_search = re.search(r'(L\d+)', audio_files)
-                if log_search:
-                    logatome = log_search.group(1)
-                    if logatome in filtered_logatomes:
-                        zip_paths.append(audio_files)
-            final_paths.append(zip_paths)
-
-    return final_paths
+    # Members are filtered from the cached index of each zip file (see ollo_zip_index)
+    return [get_zip_index(zip_file).filter(logatomes=filtered_logatomes) for zip_file in zip_list]
 
 
 def _get_corpus_info_dict(corpus_path: Union[pathlib.Path, str], dialect_audio_paths: List[List[str]],
                           logatomes_info: dict) -> dict:
     labels_zip_path = pathlib.Path(corpus_path).joinpath('OLLO2.0_LABELS.ZIP')
-    timestamps = {}
+    labels_index = get_zip_index(labels_zip_path)
+    parent_prefix = labels_index.names[0]
+
+    labels_paths = [f'{parent_prefix}{audio_path}'.replace('.wav', '.label')
+                    for dialect in dialect_audio_paths for audio_path in dialect]
+    timestamps_tmp = {}
+
+    # Labels are read in archive order, the corpus info keeps the order of the audio files
+    for batch in labels_index.iter_members(labels_paths):
+        for full_path, label_content in batch:
+            file_name = pathlib.Path(full_path).stem
+            log_search = re.search(r'(L\d+)', file_name)
+            logatome_name = log_search.group(1)
+            speaker_search = re.search(r'(S\d+[F,M])', file_name)
+            speaker_id = speaker_search.group(1)
+            for line in label_content.splitlines():
+                init, end, phone, conf_score = line.decode('ISO-8859-1').split()
+                if phone == logatomes_info[logatome_name]['phones'][1]:  # central phone
+                    onset = int(init) / 10000  # ns
+                    offset = int(end) / 10000
+                    timestamps_tmp[file_name] = {'vowel_onset': onset, 'vowel_offset': offset, 'vowel': phone,
+                                                'speaker': speaker_id,
+                                                'details': {'phones': logatomes_info[logatome_name]['phones'],
+                                                            'language': 'de', 'logatome': logatome_name}}
 
-    with zipfile.ZipFile(labels_zip_path) as zf:
-        parent_prefix = zf.namelist()[0]
-        for dialect in dialect_audio_paths:
-            for audio_path in dialect:
-                full_path = f'{parent_prefix}{audio_path}'
-                full_path = full_path.replace('.wav', '.label')
-                label_lines = zf.open(full_path).readlines()
-                file_name = pathlib.Path(full_path).stem
-                log_search = re.search(r'(L\d+)', file_name)
-                logatome_name = log_search.group(1)
-                speaker_search = re.search(r'(S\d+[F,M])', file_name)
-                speaker_id = speaker_search.group(1)
-                for line in label_lines:
-                    init, end, phone, conf_score = line.decode('ISO-8859-1').split()
-                    if phone == logatomes_info[logatome_name]['phones'][1]:  # central phone
-                        onset = int(init) / 10000  # ns
-                        offset = int(end) / 10000
-                        timestamps[file_name] = {'vowel_onset': onset, 'vowel_offset': offset, 'vowel': phone,
-                                                 'speaker': speaker_id,
-                                                 'details': {'phones': logatomes_info[logatome_name]['phones'],
-                                                             'language': 'de', 'logatome': logatome_name}}
+    timestamps = {}
+    for full_path in labels_paths:
+        file_name = pathlib.Path(full_path).stem
+        if file_name in timestamps_tmp:
+            timestamps[file_name] = timestamps_tmp[file_name]
 
     return timestamps
 
@@ -141,8 +138,7 @@ def create_corpus_info_dict(corpus_path: Union[str, pathlib.Path], zip_paths: Un
     folder_path = pathlib.Path(corpus_info_out_path).parent
     folder_path.mkdir(parents=True, exist_ok=True)
 
-    with open(corpus_info_out_path, 'wb') as data_file:
-        pickle.dump(corpus_info, data_file)
+    save_corpus_info(corpus_info, corpus_info_out_path)
 
 
 if __name__ == '__main__':
@@ -2,49 +2,69 @@
     It creates a csv files for the distances calculated for each condition, and it reads a csv file with the distances
     calculated for each condition and contrast.
 
+    Distances can also be stored in a binary file (numpy .npz, no pickled objects). The pairs and distances of all
+    contrasts are concatenated in the order contrast 1 same, contrast 1 different, contrast 2 same, etc. and the
+    `offsets` array gives the boundaries of each (contrast, condition) segment. Both formats record the distance metric
+    (`metric` column or array), which the readers return so that distances of another metric are not reused.
+
     @date 28.05.2021
 """
 
 __docformat__ = ['reStructuredText']
-__all__ = ['write_distances_csv_file', 'read_distances_csv_file']
+__all__ = ['write_distances_csv_file', 'read_distances_csv_file', 'write_distances_binary_file',
+           'read_distances_binary_file', 'read_distances_segments', 'write_distances_file', 'read_distances_file']
 
 import csv
 import pathlib
 from collections import defaultdict
-from typing import Union, List, Tuple
+from typing import Union, List, Tuple, Optional
+
+import numpy as np
+
+BINARY_SUFFIX = '.npz'
+# Metric of the distances files written before the metric column existed
+DEFAULT_METRIC = 'dtw_cosine'
+
+
+def _get_trial_names(file_mapping: List[str]) -> np.ndarray:
+    return np.array([pathlib.Path(file_path).stem for file_path in file_mapping])
 
 
 def write_distances_csv_file(csv_file_path: Union[str, pathlib.Path],
-                             same_conditions: List[List[Tuple[str, str]]],
-                             different_conditions: List[List[Tuple[str, str]]],
-                             same_distances: List[List[float]], different_distances: List[List[float]],
-                             contrasts: List[Tuple[str, str]], contrasts_languages: List[Tuple[str, str]]) -> None:
-    lines = [['contrast', 'language', 'condition', 'file1', 'file2', 'distance']]
-    for idx, contrast in enumerate(contrasts):
-        for jdx, condition in enumerate(same_conditions[idx]):
-            lines.append([str(contrast), str(contrasts_languages[idx]), 'same', condition[0], condition[1],
-                          same_distances[idx][jdx]])
-        for jdx, condition in enumerate(different_conditions[idx]):
-            lines.append([str(contrast), str(contrasts_languages[idx]), 'different', condition[0], condition[1],
-                          different_distances[idx][jdx]])
+                             same_conditions: List[np.ndarray], different_conditions: List[np.ndarray],
+                             same_distances: List[np.ndarray], different_distances: List[np.ndarray],
+                             contrasts: List[Tuple[str, str]], contrasts_languages: List[Tuple[str, str]],
+                             file_mapping: List[str], metric: Optional[str] = DEFAULT_METRIC) -> None:
+    trial_names = _get_trial_names(file_mapping)
+
+    def rows():
+        yield ['contrast', 'language', 'condition', 'file1', 'file2', 'distance', 'metric']
+        for idx, contrast in enumerate(contrasts):
+            for condition, pairs, distances in [('same', same_conditions[idx], same_distances[idx]),
+                                                ('different', different_conditions[idx], different_distances[idx])]:
+                names = trial_names[pairs].tolist()
+                for (file1, file2), distance in zip(names, np.asarray(distances).tolist()):
+                    yield [str(contrast), str(contrasts_languages[idx]), condition, file1, file2, distance, metric]
 
     pathlib.Path(csv_file_path).parent.mkdir(parents=True, exist_ok=True)
 
     with open(csv_file_path, 'w', newline='') as csv_file:
         writer = csv.writer(csv_file, delimiter=';')
-        writer.writerows(lines)
+        writer.writerows(rows())
 
 
 def read_distances_csv_file(csv_file_path: Union[str, pathlib.Path]) -> \
-        Tuple[List[List[float]], List[List[float]], List[Tuple[str, str]], List[Tuple[str, str]]]:
+        Tuple[List[List[float]], List[List[float]], List[Tuple[str, str]], List[Tuple[str, str]], str]:
     with open(csv_file_path, 'r', newline='') as csv_file:
         reader = csv.DictReader(csv_file, delimiter=';')
+        metrics = set()
         contrasts_tmp = set()
         same_distances_dict = defaultdict(list)
         different_distances_dict = defaultdict(list)
         same_distances = []
         different_distances = []
         for row in reader:
+            metrics.add(row.get('metric') or DEFAULT_METRIC)
             contrasts_tmp.add((row['contrast'], row['language']))
             if row['condition'] == 'same':
                 same_distances_dict[(row['contrast'], row['language'])].append(float(row['distance']))
@@ -59,4 +79,80 @@ def read_distances_csv_file(csv_file_path: Union[str, pathlib.Path]) -> \
             same_distances.append(same_distances_dict[(contrast, language)])
             different_distances.append(different_distances_dict[(contrast, language)])
 
-    return same_distances, different_distances, contrasts, contrasts_languages
+    assert len(metrics) <= 1, f'Distances of several metrics in {csv_file_path}: {sorted(metrics)}'
+    metric = metrics.pop() if metrics else DEFAULT_METRIC
+    return same_distances, different_distances, contrasts, contrasts_languages, metric
+
+
+def write_distances_binary_file(binary_file_path: Union[str, pathlib.Path],
+                                same_conditions: List[np.ndarray], different_conditions: List[np.ndarray],
+                                same_distances: List[np.ndarray], different_distances: List[np.ndarray],
+                                contrasts: List[Tuple[str, str]], contrasts_languages: List[Tuple[str, str]],
+                                file_mapping: List[str], metric: Optional[str] = DEFAULT_METRIC) -> None:
+    pairs = []
+    distances = []
+    for idx in range(len(contrasts)):
+        pairs += [same_conditions[idx], different_conditions[idx]]
+        distances += [np.asarray(same_distances[idx]), np.asarray(different_distances[idx])]
+    offsets = np.concatenate([[0], np.cumsum([len(segment) for segment in distances])])
+
+    pathlib.Path(binary_file_path).parent.mkdir(parents=True, exist_ok=True)
+
+    np.savez(binary_file_path,
+             pairs=np.concatenate(pairs).astype(np.int32) if pairs else np.empty((0, 2), dtype=np.int32),
+             distances=np.concatenate(distances).astype(np.float64) if distances else np.empty(0),
+             offsets=offsets.astype(np.int64),
+             contrasts=np.array(contrasts, dtype=str).reshape(-1, 2),
+             contrasts_languages=np.array(contrasts_languages, dtype=str).reshape(-1, 2),
+             trial_names=_get_trial_names(file_mapping),
+             metric=np.array(metric))
+
+
+def _get_binary_metric(data: np.lib.npyio.NpzFile) -> str:
+    return str(data['metric']) if 'metric' in data.files else DEFAULT_METRIC
+
+
+def read_distances_binary_file(binary_file_path: Union[str, pathlib.Path]) -> \
+        Tuple[List[np.ndarray], List[np.ndarray], List[Tuple[str, str]], List[Tuple[str, str]], str]:
+    with np.load(binary_file_path, allow_pickle=False) as data:
+        distances = data['distances']
+        offsets = data['offsets']
+        contrasts = [tuple(contrast) for contrast in data['contrasts'].tolist()]
+        contrasts_languages = [tuple(languages) for languages in data['contrasts_languages'].tolist()]
+        metric = _get_binary_metric(data)
+
+    segments = [distances[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    return segments[0::2], segments[1::2], contrasts, contrasts_languages, metric
+
+
+def read_distances_segments(binary_file_path: Union[str, pathlib.Path]) -> \
+        Tuple[np.ndarray, np.ndarray, np.ndarray, List[Tuple[str, str]], List[Tuple[str, str]], List[str], str]:
+    # Concatenated arrays as stored: distances, offsets and pairs (trial ids into trial_names), and the metric
+    with np.load(binary_file_path, allow_pickle=False) as data:
+        distances, offsets, pairs = data['distances'], data['offsets'], data['pairs']
+        contrasts = [tuple(contrast) for contrast in data['contrasts'].tolist()]
+        contrasts_languages = [tuple(languages) for languages in data['contrasts_languages'].tolist()]
+        trial_names = data['trial_names'].tolist()
+        metric = _get_binary_metric(data)
+    return distances, offsets, pairs, contrasts, contrasts_languages, trial_names, metric
+
+
+def write_distances_file(file_path: Union[str, pathlib.Path],
+                         same_conditions: List[np.ndarray], different_conditions: List[np.ndarray],
+                         same_distances: List[np.ndarray], different_distances: List[np.ndarray],
+                         contrasts: List[Tuple[str, str]], contrasts_languages: List[Tuple[str, str]],
+                         file_mapping: List[str], metric: Optional[str] = DEFAULT_METRIC) -> None:
+    # The format is chosen by the extension of the file: .npz for binary, csv otherwise
+    if pathlib.Path(file_path).suffix == BINARY_SUFFIX:
+        write_distances_binary_file(file_path, same_conditions, different_conditions, same_distances,
+                                    different_distances, contrasts, contrasts_languages, file_mapping, metric)
+    else:
+        write_distances_csv_file(file_path, same_conditions, different_conditions, same_distances,
+                                 different_distances, contrasts, contrasts_languages, file_mapping, metric)
+
+
+def read_distances_file(file_path: Union[str, pathlib.Path]) -> \
+        Tuple[List[np.ndarray], List[np.ndarray], List[Tuple[str, str]], List[Tuple[str, str]], str]:
+    if pathlib.Path(file_path).suffix == BINARY_SUFFIX:
+        return read_distances_binary_file(file_path)
+    return read_distances_csv_file(file_path)
@@ -15,18 +15,27 @@
     1.005 0.26 1.24 -0.81 ... 0.04
     --------------------------------------
 
+    Text files are parsed in C (np.fromstring) into float32 predictions, and the files of a folder are read with a
+    thread pool. A prediction folder can be converted once into an h5py file (`latents` of all files concatenated,
+    `time_stamps`, `offsets` per file and `file_list` relative to the folder), so repeated tests read binary.
+
     @date 24.05.2021
 """
 
 __docformat__ = ['reStructuredText']
-__all__ = ['read_input_features', 'get_predictions_and_time_stamps', 'read_prediction_file']
+__all__ = ['read_input_features', 'get_predictions_and_time_stamps', 'read_prediction_file',
+           'read_predictions_from_folder', 'convert_predictions_folder', 'read_predictions_binary_file']
 
+import argparse
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union, Tuple, List, Optional
 
 import h5py
 import numpy as np
 
+from metaeval_core.h5_io import read_input_features, get_trials_list
+
 
 def _read_pc_predictions(predictions_path: Union[str, pathlib.Path]) -> np.ndarray:
     with h5py.File(predictions_path, 'r') as predictions_file:
@@ -35,61 +44,23 @@ def _read_pc_predictions(predictions_path: Union[str, pathlib.Path]) -> np.ndarr
     return predictions
 
 
-def read_input_features(input_features_path: Union[str, pathlib.Path]) -> Tuple[np.ndarray, List[str], np.ndarray]:
-    with h5py.File(input_features_path, 'r') as data_file:
-        input_data = np.array(data_file['data'])
-        file_mapping = list(data_file['file_list'])
-        indices = np.array(data_file['indices'])
-    return input_data, file_mapping, indices
-
-
 def read_prediction_file(file_path: Union[str, pathlib.Path]) -> Tuple[np.ndarray, np.ndarray]:
     with open(file_path, 'r') as prediction_file:
-        lines = prediction_file.readlines()
-
-    data = np.array([[float(item) for item in line.split()] for line in lines])
-    time_stamps = data[:,0]
-    prediction = data[:,1:]
+        text = prediction_file.read()
+
+    first_line = text.lstrip().split('\n', 1)[0]
+    n_columns = len(first_line.split())
+    # Any whitespace (including new lines) separates the values
+    data = np.fromstring(text, dtype=np.float64, sep=' ')
+    assert n_columns > 1 and data.size % n_columns == 0, f'Malformed prediction file {file_path}'
+    data = data.reshape((-1, n_columns))
+    time_stamps = data[:, 0]
+    prediction = data[:, 1:].astype(np.float32)
     return time_stamps, prediction
 
 
 def _get_predictions_list(predictions: np.ndarray, indices: np.ndarray) -> List[np.array]:
-    n_feats = predictions.shape[-1]
-
-    # fast test
-    input_utt = []
-
-    indices = indices.reshape(-1, 2)
-    predictions = predictions.reshape(-1, n_feats)
-
-    prev = indices[0, 0]  # first file id
-    init = 0
-
-    file_indices = []
-    total_frames = indices.shape[0]
-
-    for i in range(total_frames):
-        if indices[i, 0] != prev:
-            if prev != -1:
-                file_indices.append((init, i))  # Only add it if is not reset frames
-            prev = indices[i, 0]
-            init = i
-
-        if indices[i, 0] == -1:  # reset or extra frames
-            prev = indices[i, 0]
-            init = i
-            continue
-
-        if i == total_frames - 1:
-            file_indices.append((init, total_frames))
-
-    for i in range(len(file_indices)):
-        idx_init = file_indices[i][0]
-        idx_end = file_indices[i][1]
-
-        input_utt.append(predictions[idx_init:idx_end, :])
-
-    return input_utt
+    return get_trials_list(predictions, indices)
 
 
 def get_predictions_and_time_stamps(predictions_file: Union[str, pathlib.Path], indices: np.ndarray,
@@ -100,25 +71,73 @@ def get_predictions_and_time_stamps(predictions_file: Union[str, pathlib.Path],
     else:
         predictions = _read_pc_predictions(predictions_file)
         predictions_list = _get_predictions_list(predictions, indices)
-    time_stamps_list = []
-
-    for prediction in predictions_list:
-        n_frames = prediction.shape[0]
-        # Time in msec (window_shift)
-        timestamps_trial = np.arange(window_shift / 2, n_frames * window_shift, window_shift)
-        time_stamps_list.append(timestamps_trial)
+    # Time in msec (window_shift), the time stamps of each trial are a view of a single array
+    n_frames = max([prediction.shape[0] for prediction in predictions_list], default=0)
+    time_stamps = np.arange(window_shift / 2, n_frames * window_shift, window_shift)
+    time_stamps_list = [time_stamps[:prediction.shape[0]] for prediction in predictions_list]
 
     return predictions_list, time_stamps_list
 
 
-def read_predictions_from_folder(prediction_folder_path: Union[str, pathlib.Path]) -> \
+def _get_prediction_files(prediction_folder_path: Union[str, pathlib.Path]) -> List[pathlib.Path]:
+    return sorted(list(pathlib.Path(prediction_folder_path).glob('**/*.txt')))
+
+
+def read_predictions_binary_file(binary_file_path: Union[str, pathlib.Path]) -> \
+        Tuple[List[np.ndarray], List[np.ndarray], List[pathlib.Path]]:
+    with h5py.File(binary_file_path, 'r') as predictions_file:
+        latents = np.array(predictions_file['latents'])
+        time_stamps = np.array(predictions_file['time_stamps'])
+        offsets = np.array(predictions_file['offsets'])
+        file_list = [name.decode() if isinstance(name, bytes) else name for name in predictions_file['file_list']]
+        source_folder = pathlib.Path(predictions_file.attrs['source_folder'])
+
+    predictions_list = [latents[offsets[i]:offsets[i + 1]] for i in range(len(file_list))]
+    time_stamps_list = [time_stamps[offsets[i]:offsets[i + 1]] for i in range(len(file_list))]
+    return predictions_list, time_stamps_list, [source_folder.joinpath(name) for name in file_list]
+
+
+def read_predictions_from_folder(prediction_folder_path: Union[str, pathlib.Path], n_jobs: Optional[int] = 4) -> \
         Tuple[List[np.ndarray], List[np.ndarray], List[pathlib.Path]]:
-    predictions_file_paths = sorted(list(pathlib.Path(prediction_folder_path)    .glob('**/*.txt')))
-    predictions_list = []
-    time_stamps_list = []
-    for path in predictions_file_paths:
-        time_stamps, prediction = read_prediction_file(path)
-        predictions_list.append(prediction)
-        time_stamps_list.append(time_stamps)
+    # A folder converted with convert_predictions_folder (h5py file) is read directly
+    if pathlib.Path(prediction_folder_path).is_file():
+        return read_predictions_binary_file(prediction_folder_path)
+
+    predictions_file_paths = _get_prediction_files(prediction_folder_path)
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        results = list(executor.map(read_prediction_file, predictions_file_paths))
+    time_stamps_list = [time_stamps for time_stamps, _ in results]
+    predictions_list = [prediction for _, prediction in results]
 
     return predictions_list, time_stamps_list, predictions_file_paths
+
+
+def convert_predictions_folder(prediction_folder_path: Union[str, pathlib.Path],
+                               output_path: Union[str, pathlib.Path], n_jobs: Optional[int] = 4) -> None:
+    predictions_list, time_stamps_list, predictions_file_paths = read_predictions_from_folder(
+        prediction_folder_path, n_jobs)
+    assert predictions_list, f'No prediction files in {prediction_folder_path}'
+    offsets = np.concatenate([[0], np.cumsum([len(prediction) for prediction in predictions_list])])
+    file_list = np.array([str(path.relative_to(prediction_folder_path)) for path in predictions_file_paths],
+                         dtype=h5py.special_dtype(vlen=str))
+
+    pathlib.Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with h5py.File(output_path, 'w') as out_file:
+        out_file.create_dataset('latents', data=np.concatenate(predictions_list).astype(np.float32))
+        out_file.create_dataset('time_stamps', data=np.concatenate(time_stamps_list))
+        out_file.create_dataset('offsets', data=offsets.astype(np.int64))
+        out_file.create_dataset('file_list', data=file_list)
+        out_file.attrs['source_folder'] = str(pathlib.Path(prediction_folder_path).resolve())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to convert a folder of predictions in text files into an '
+                                                 'h5py file.\nUsage: python read_predictions_and_features.py '
+                                                 '--predictions_folder path_folder_txt_predictions '
+                                                 '--output_path path_h5py_output_file [--n_jobs threads]')
+    parser.add_argument('--predictions_folder', type=str, required=True)
+    parser.add_argument('--output_path', type=str, required=True)
+    parser.add_argument('--n_jobs', type=int, default=4)
+    args = parser.parse_args()
+
+    convert_predictions_folder(args.predictions_folder, args.output_path, args.n_jobs)
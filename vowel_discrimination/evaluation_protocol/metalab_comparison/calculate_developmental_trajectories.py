@@ -0,0 +1,155 @@
+"""
+    This script calculates the developmental vowel discrimination trajectory of a model (mean effect size per
+    checkpoint) as r_scripts/vowel_discrimination/obtain_dev_trajectories.R, for all the checkpoints at once.
+
+    The distances of every checkpoint (`<results_folder>/<step>/vowel_disc/dtw_distances_<corpus>_<type>.npz`, or
+    `.csv`) are concatenated and the effect sizes of all the contrasts and the mean effect size of each checkpoint are
+    computed with metaeval_core.effect_sizes. The mean effect size is the fixed-effect one of the R scripts (FE) or a
+    random-effects one (DL or REML). The output has the columns of apc_large_results_vowel_discr.csv.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['get_checkpoint_steps', 'get_checkpoints_ages', 'read_checkpoints_distances',
+           'calculate_developmental_trajectory', 'write_developmental_trajectories']
+
+import argparse
+import pathlib
+from typing import Union, List, Optional, Tuple
+
+import numpy as np
+
+from evaluation_protocol.io_module.preprocess_distances_files import read_distances_file, read_distances_segments
+from metaeval_core.effect_sizes import META_ANALYSIS_METHODS, get_segments_offsets, get_developmental_trajectory_table
+# Checkpoints and trajectory tables shared with the IDS preference test
+from metaeval_core.trajectories import TRAJECTORY_COLUMNS, get_checkpoint_steps, get_checkpoints_ages, \
+    write_trajectory_csv
+
+# Distances files per type of contrasts and corpus label of the R scripts
+CONTRASTS_FILES = {'native': [('hc_native', 'natural'), ('ivc_native', 'synthetic')],
+                   'non_native': [('oc_non_native', 'natural'), ('ivc_non_native', 'synthetic')]}
+CAPABILITIES = {'native': 'Vowel discr. (native)', 'non_native': 'Vowel discr. (non-native)'}
+DETAILED_COLUMNS = ['step', 'se', 'ci_lb', 'ci_ub', 'p_value', 'tau2', 'i2', 'k']
+CONTRASTS_COLUMNS = ['step', 'corpus', 'contrast', 'language', 'd', 'n1', 'n2', 'g', 'se_d', 'se_g', 'w_d', 'w_g', 't',
+                     'p_value']
+
+
+def _get_distances_path(vowel_folder: pathlib.Path, test_name: str) -> pathlib.Path:
+    # The binary distances file is used if available
+    binary_path = vowel_folder.joinpath(f'dtw_distances_{test_name}.npz')
+    csv_path = vowel_folder.joinpath(f'dtw_distances_{test_name}.csv')
+    assert binary_path.is_file() or csv_path.is_file(), f'No distances file for {test_name} in {vowel_folder}'
+    return binary_path if binary_path.is_file() else csv_path
+
+
+def read_checkpoints_distances(results_folder: Union[str, pathlib.Path], steps: List[int], contrasts_type: str) -> \
+        Tuple[np.ndarray, np.ndarray, np.ndarray, List[Tuple[int, str, str, str]]]:
+    # Distances of all the checkpoints concatenated (pairs of segments same/different per contrast), checkpoint index
+    # and (step, corpus, contrast, languages) of each contrast. All the distances must have the same metric.
+    assert contrasts_type in CONTRASTS_FILES
+    values, counts, checkpoints, contrasts_info = [], [], [], []
+    metrics = {}
+    for checkpoint_idx, step in enumerate(steps):
+        vowel_folder = pathlib.Path(results_folder).joinpath(str(step), 'vowel_disc')
+        for test_name, corpus in CONTRASTS_FILES[contrasts_type]:
+            distances_path = _get_distances_path(vowel_folder, test_name)
+            if distances_path.suffix == '.npz':
+                distances, offsets, _, contrasts, contrasts_languages, _, metric = read_distances_segments(
+                    distances_path)
+            else:
+                same_distances, different_distances, contrasts, contrasts_languages, metric = \
+                    read_distances_file(distances_path)
+                distances, offsets = get_segments_offsets([segment for pair in zip(same_distances, different_distances)
+                                                           for segment in pair])
+            metrics.setdefault(metric, distances_path)
+            assert len(metrics) == 1, f'Distances of different metrics: {metrics}'
+            values.append(np.asarray(distances, dtype=np.float64))
+            counts.append(np.diff(offsets))
+            checkpoints.append(np.full(len(contrasts), checkpoint_idx, dtype=np.int64))
+            contrasts_info += [(step, corpus, '-'.join(contrast), '-'.join(languages))
+                               for contrast, languages in zip(contrasts, contrasts_languages)]
+
+    values = np.concatenate(values) if values else np.zeros(0)
+    offsets = np.concatenate([[0], np.cumsum(np.concatenate(counts) if counts else [])]).astype(np.int64)
+    checkpoints = np.concatenate(checkpoints) if checkpoints else np.zeros(0, dtype=np.int64)
+    return values, offsets, checkpoints, contrasts_info
+
+
+def calculate_developmental_trajectory(results_folder: Union[str, pathlib.Path], contrasts_type: str,
+                                       effect: Optional[str] = 'g', alpha: Optional[float] = 0.05,
+                                       method: Optional[str] = 'FE', batch_age: Optional[float] = 0.06,
+                                       epoch_age: Optional[float] = 0.57) -> Tuple[List[list], List[list]]:
+    # Rows of the trajectory (TRAJECTORY_COLUMNS + DETAILED_COLUMNS) and of the effect sizes per contrast
+    steps, batch_steps, epoch_steps = get_checkpoint_steps(results_folder)
+    values, offsets, checkpoints, contrasts_info = read_checkpoints_distances(results_folder, steps, contrasts_type)
+    contrasts_statistics, checkpoints_statistics = get_developmental_trajectory_table(
+        values, offsets, checkpoints, effect, alpha, method=method, n_checkpoints=len(steps))
+    ages, labels = get_checkpoints_ages(batch_steps, epoch_steps, batch_age, epoch_age)
+
+    trajectory_rows = []
+    for idx, step in enumerate(steps):
+        row = [float(ages[idx]), checkpoints_statistics['mean_es'][idx],
+               bool(checkpoints_statistics['significant'][idx]), labels[idx], CAPABILITIES[contrasts_type], step]
+        row += [checkpoints_statistics[key][idx] for key in ['se', 'ci_lb', 'ci_ub', 'p_value']]
+        row += [checkpoints_statistics[key][idx] if key in checkpoints_statistics else np.nan
+                for key in ['tau2', 'i2']]
+        row.append(int(np.sum(checkpoints == idx)))
+        trajectory_rows.append(row)
+
+    contrasts_rows = [list(contrast_info) + [contrasts_statistics[key][idx] for key in CONTRASTS_COLUMNS[4:]]
+                      for idx, contrast_info in enumerate(contrasts_info)]
+    return trajectory_rows, contrasts_rows
+
+
+def write_developmental_trajectories(results_folder: Union[str, pathlib.Path],
+                                     output_csv_path: Union[str, pathlib.Path],
+                                     contrasts_types: Optional[List[str]] = None, effect: Optional[str] = 'g',
+                                     alpha: Optional[float] = 0.05, method: Optional[str] = 'FE',
+                                     batch_age: Optional[float] = 0.06, epoch_age: Optional[float] = 0.57,
+                                     detailed: Optional[bool] = False,
+                                     contrasts_csv_path: Optional[Union[str, pathlib.Path]] = None) -> None:
+    if contrasts_types is None:
+        contrasts_types = ['native', 'non_native']
+    columns = TRAJECTORY_COLUMNS + (DETAILED_COLUMNS if detailed else [])
+    trajectory_rows, contrasts_rows = [], []
+    for contrasts_type in contrasts_types:
+        rows, contrasts = calculate_developmental_trajectory(results_folder, contrasts_type, effect, alpha, method,
+                                                             batch_age, epoch_age)
+        trajectory_rows += [row[:len(columns)] for row in rows]
+        contrasts_rows += [[CAPABILITIES[contrasts_type]] + row for row in contrasts]
+
+    write_trajectory_csv(output_csv_path, columns, trajectory_rows)
+    if contrasts_csv_path:
+        write_trajectory_csv(contrasts_csv_path, ['capability'] + CONTRASTS_COLUMNS, contrasts_rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to calculate the developmental vowel discrimination '
+                                                 'trajectory of a model from the distances of all its checkpoints. '
+                                                 '\nUsage: python calculate_developmental_trajectories.py '
+                                                 '--results_folder test_results_large_apc/apc '
+                                                 '--output_csv_path apc_large_results_vowel_discr.csv '
+                                                 '[--method FE|DL|REML] [--effect d|g] [--alpha alpha] '
+                                                 '[--batch_age months] [--epoch_age months] '
+                                                 '[--contrasts_types native non_native] [--detailed] '
+                                                 '[--contrasts_csv_path path_csv_effect_sizes_contrasts]')
+
+    parser.add_argument('--results_folder', type=str, required=True)
+    parser.add_argument('--output_csv_path', type=str, required=True)
+    parser.add_argument('--method', type=str, choices=META_ANALYSIS_METHODS, default='FE')
+    parser.add_argument('--effect', type=str, choices=['d', 'g'], default='g')
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--batch_age', type=float, default=0.06)
+    parser.add_argument('--epoch_age', type=float, default=0.57)
+    parser.add_argument('--contrasts_types', type=str, nargs='+', choices=list(CONTRASTS_FILES.keys()),
+                        default=['native', 'non_native'])
+    parser.add_argument('--detailed', action='store_true', help='Add the standard error, confidence interval, '
+                                                                'p-value and heterogeneity of each checkpoint')
+    parser.add_argument('--contrasts_csv_path', type=str)
+
+    args = parser.parse_args()
+
+    write_developmental_trajectories(args.results_folder, args.output_csv_path, args.contrasts_types, args.effect,
+                                     args.alpha, args.method, args.batch_age, args.epoch_age, args.detailed,
+                                     args.contrasts_csv_path)
@@ -9,13 +9,17 @@
 
 __docformat__ = ['reStructuredText']
 __all__ = ['get_standard_error', 'get_inverse_variance_weight', 'get_mean_weighted_effect_size',
-           'get_standard_error_mean_es', 'get_confidence_interval', 'get_p_value_significance_test']
+           'get_standard_error_mean_es', 'get_confidence_interval', 'get_p_value_significance_test',
+           'get_weighted_mean_effect_sizes', 'get_significance_codes']
 
 from typing import List, Tuple, Optional
 
 import numpy as np
 import scipy.stats
 
+# Batched versions (weighted mean effect size, CI and significance per group of effect sizes)
+from metaeval_core.effect_sizes import get_weighted_mean_effect_sizes, get_significance_codes
+
 
 def get_standard_error(n1: int, n2: int, effect_size: float) -> float:
     standard_error = np.sqrt(((n1 + n2) / (n1 * n2)) + ((effect_size ** 2) / (2 * (n1 + n2))))  # (eq. 3.23)
@@ -0,0 +1,183 @@
+"""
+    Machine ABX discrimination score per contrast, computed from the distances already calculated for the vowel
+    discrimination test (no new DTW).
+
+    For a contrast (v1, v2), a triplet (A, B, X) has A and X of the same vowel and B of the other vowel, A and B
+    spoken by the same speaker and X by a different speaker (across-speaker ABX). For OLLO, the three trials have
+    matched CVC contexts, as in the different condition of the test. The triplet is an error if d(A, X) > d(B, X)
+    (0.5 for ties). These distances are exactly the pairs of the same and different conditions, so they are looked up
+    in the distances of the contrast, arranged as one trial-by-trial matrix. Triplets with a missing distance (e.g.,
+    sampled pairs) are ignored.
+
+    The error of each X is the mean over its triplets, the error of each direction (X of v1 or X of v2) is the mean
+    over X, and the ABX error of the contrast is the mean of both directions.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['get_abx_groups', 'get_abx_errors', 'get_contrast_distance_matrix', 'calculate_abx_scores']
+
+import argparse
+import csv
+import pathlib
+from collections import defaultdict
+from typing import List, Tuple, Optional, Union
+
+import numpy as np
+
+from corpus_processing.corpus_info_store import CorpusInfo, as_corpus_info, load_corpus_info
+from evaluation_protocol.io_module.preprocess_distances_files import read_distances_segments, BINARY_SUFFIX
+from evaluation_protocol.tests_setup.create_tests_conditions import _get_trials, _check_oc_filters
+from metaeval_core.instrumentation import RunReport, stage
+
+
+def get_abx_groups(corpus_info: Union[dict, CorpusInfo], file_mapping: List[str], contrast: Tuple[str, str],
+                   filters: dict, corpus: str, languages: Optional[Tuple[str, str]] = None) -> \
+        List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    # Groups of trials (ids and speaker codes of v1 and v2) within which triplets are formed. Only OLLO has several
+    # groups (matched CVC contexts).
+    corpus_info = as_corpus_info(corpus_info)
+    trial_ids = {pathlib.Path(file_path).stem: idx for idx, file_path in enumerate(file_mapping)}
+    rows_trial_ids = np.array([trial_ids.get(trial, -1) for trial in corpus_info.trials.tolist()], dtype=np.int64)
+    speaker_codes = corpus_info.codes('speaker')
+
+    if corpus == 'oc':
+        filters = _check_oc_filters(filters)
+    rows_v1, rows_v2 = _get_trials(corpus_info, contrast, corpus, filters=filters, languages=languages)
+    if corpus != 'oc':
+        return [(rows_trial_ids[rows_v1], speaker_codes[rows_v1], rows_trial_ids[rows_v2], speaker_codes[rows_v2])]
+
+    cvc_codes = corpus_info.codes('phones')
+    cvc_contexts = [''.join(phones.split()) for phones in corpus_info.categories('phones').tolist()]
+    rows_v1_cvc, rows_v2_cvc = defaultdict(list), defaultdict(list)
+    for row in rows_v1.tolist():
+        rows_v1_cvc[cvc_contexts[cvc_codes[row]]].append(row)
+    for row in rows_v2.tolist():
+        rows_v2_cvc[cvc_contexts[cvc_codes[row]]].append(row)
+
+    groups = []
+    set_cvc_v2 = set(rows_v2_cvc.keys())
+    for cvc, rows in rows_v1_cvc.items():
+        for cvc2 in set_cvc_v2:
+            if cvc[0] == cvc2[0] and cvc[-1] == cvc2[-1]:
+                set_cvc_v2.remove(cvc2)
+                rows2 = rows_v2_cvc[cvc2]
+                groups.append((rows_trial_ids[rows], speaker_codes[rows], rows_trial_ids[rows2], speaker_codes[rows2]))
+                break
+    return groups
+
+
+def get_contrast_distance_matrix(pairs: np.ndarray, distances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Symmetric matrix (float32, NaN for missing pairs) over the trials of the pairs, and the trial ids of its rows
+    trials = np.unique(pairs)
+    compact = np.searchsorted(trials, pairs)
+    matrix = np.full((len(trials), len(trials)), np.nan, dtype=np.float32)
+    matrix[compact[:, 0], compact[:, 1]] = distances
+    matrix[compact[:, 1], compact[:, 0]] = distances
+    return matrix, trials
+
+
+def get_abx_errors(d_x_a: np.ndarray, d_x_b: np.ndarray, speakers_x: np.ndarray, speakers_a: np.ndarray,
+                   speakers_b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Sum of errors and number of triplets per X. d_x_a: distances X-A (n_x, n_a), d_x_b: distances X-B (n_x, n_b).
+    errors = np.zeros(len(speakers_x))
+    counts = np.zeros(len(speakers_x))
+    for speaker in np.intersect1d(speakers_a, speakers_b).tolist():
+        x_selected = speakers_x != speaker
+        distances_a = d_x_a[x_selected][:, speakers_a == speaker][:, :, None]
+        distances_b = d_x_b[x_selected][:, speakers_b == speaker][:, None, :]
+        valid = np.isfinite(distances_a) & np.isfinite(distances_b)
+        triplet_errors = (distances_a > distances_b) + 0.5 * (distances_a == distances_b)
+        errors[x_selected] += np.sum(triplet_errors * valid, axis=(1, 2))
+        counts[x_selected] += np.sum(valid, axis=(1, 2))
+    return errors, counts
+
+
+def _get_direction_error(groups: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]], matrix: np.ndarray,
+                         trials: np.ndarray) -> Tuple[float, int]:
+    # X and A from the first vowel of each group, B from the second one
+    x_errors, n_triplets = [], 0
+    for ids_1, speakers_1, ids_2, speakers_2 in groups:
+        if len(ids_1) == 0 or len(ids_2) == 0:
+            continue
+        rows_1, rows_2 = np.searchsorted(trials, ids_1), np.searchsorted(trials, ids_2)
+        errors, counts = get_abx_errors(matrix[np.ix_(rows_1, rows_1)], matrix[np.ix_(rows_1, rows_2)], speakers_1,
+                                        speakers_1, speakers_2)
+        x_errors.append(errors[counts > 0] / counts[counts > 0])
+        n_triplets += int(np.sum(counts))
+    x_errors = np.concatenate(x_errors) if x_errors else np.zeros(0)
+    return float(np.mean(x_errors)) if len(x_errors) else np.nan, n_triplets
+
+
+def calculate_abx_scores(corpus_info: Union[dict, CorpusInfo], file_mapping: List[str],
+                         contrasts: List[Tuple[str, str]], contrasts_languages: List[Tuple[str, str]],
+                         same_conditions: List[np.ndarray], different_conditions: List[np.ndarray],
+                         same_distances: List[np.ndarray], different_distances: List[np.ndarray],
+                         filters: dict, corpus: str) -> List[List[Union[str, int, float]]]:
+    # Rows: contrast, languages, ABX error, error X of v1, error X of v2, number of triplets
+    corpus_info = as_corpus_info(corpus_info)
+    rows = []
+    for idx, contrast in enumerate(contrasts):
+        pairs = np.concatenate([same_conditions[idx], different_conditions[idx]]).reshape(-1, 2)
+        distances = np.concatenate([same_distances[idx], different_distances[idx]])
+        groups = get_abx_groups(corpus_info, file_mapping, contrast, filters, corpus,
+                                contrasts_languages[idx] if corpus == 'ivc' else None)
+        if len(pairs) == 0:
+            rows.append([contrast, contrasts_languages[idx], np.nan, np.nan, np.nan, 0])
+            continue
+        matrix, trials = get_contrast_distance_matrix(pairs, distances)
+        # Trials without any distance are not part of any triplet
+        groups = [tuple(group[i][np.isin(group[i - i % 2], trials)] for i in range(4)) for group in groups]
+        error_1, triplets_1 = _get_direction_error(groups, matrix, trials)
+        error_2, triplets_2 = _get_direction_error([(ids_2, speakers_2, ids_1, speakers_1)
+                                                    for ids_1, speakers_1, ids_2, speakers_2 in groups],
+                                                   matrix, trials)
+        rows.append([contrast, contrasts_languages[idx], float(np.nanmean([error_1, error_2])), error_1, error_2,
+                     triplets_1 + triplets_2])
+    return rows
+
+
+def _run_abx_from_distances_file(corpus_info_path: Union[str, pathlib.Path],
+                                 distances_path: Union[str, pathlib.Path], output_csv_path: Union[str, pathlib.Path],
+                                 corpus: str, filters: Optional[dict] = None) -> None:
+    assert pathlib.Path(distances_path).suffix == BINARY_SUFFIX
+    with stage('read_distances') as record:
+        distances, offsets, pairs, contrasts, contrasts_languages, trial_names, _ = read_distances_segments(
+            distances_path)
+        record['pairs'] = len(distances)
+    corpus_info = load_corpus_info(corpus_info_path)
+
+    segments = [(pairs[offsets[i]:offsets[i + 1]], distances[offsets[i]:offsets[i + 1]])
+                for i in range(len(offsets) - 1)]
+    with stage('abx', contrasts=len(contrasts)):
+        rows = calculate_abx_scores(corpus_info, trial_names, contrasts, contrasts_languages,
+                                    [pairs for pairs, _ in segments[0::2]], [pairs for pairs, _ in segments[1::2]],
+                                    [values for _, values in segments[0::2]], [values for _, values in segments[1::2]],
+                                    filters if filters else {}, corpus)
+
+    pathlib.Path(output_csv_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_csv_path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file, delimiter=';')
+        writer.writerow(['contrast', 'languages', 'abx_error', 'abx_error_x_v1', 'abx_error_x_v2', 'triplets'])
+        writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to calculate the machine ABX error per contrast from a '
+                                                 'binary distances file.\nUsage: python abx_discrimination.py '
+                                                 '--corpus_info_path path_corpus_info '
+                                                 '--distances_path path_npz_distances_file '
+                                                 '--output_csv_path path_output_csv_file --corpus [ivc|hc|oc] '
+                                                 '[--report_path path_json_run_report]')
+    parser.add_argument('--corpus_info_path', type=str, required=True)
+    parser.add_argument('--distances_path', type=str, required=True)
+    parser.add_argument('--output_csv_path', type=str, required=True)
+    parser.add_argument('--corpus', type=str, choices=['ivc', 'hc', 'oc'], required=True)
+    parser.add_argument('--report_path', type=str)
+    args = parser.parse_args()
+
+    # The test uses only the first repetition of OLLO and excludes the trials that failed the listeners' test
+    with RunReport('abx_discrimination', args.report_path):
+        _run_abx_from_distances_file(args.corpus_info_path, args.distances_path, args.output_csv_path, args.corpus,
+                                     {'repetitions': ['N1'], 'failed_listeners_test': False})
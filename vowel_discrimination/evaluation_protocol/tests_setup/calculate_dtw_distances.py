@@ -2,6 +2,14 @@
     This script calculates DTW distances for the different vowel segments (those specified in the test conditions
     lists). It also creates a csv file with the distances calculated for each contrast.
 
+    The distance metric is chosen among the backends of distance_backends (DTW with cosine distance by default).
+
+    Optionally, the distances are looked up in the condensed distance matrix of the checkpoint (distance_matrix), which
+    is calculated and saved the first time over all the trials that the contrasts of the corpus may use.
+
+    Optionally, for huge contrasts, only a stratified sample of the pairs is used. The sample size is chosen adaptively
+    so that the standard error of the effect size is below a target value.
+
     @date 27.05.2021
 """
 
@@ -9,73 +17,113 @@ __docformat__ = ['reStructuredText']
 __all__ = ['calculate_dtw_distances']
 
 import pathlib
-import pickle
-from typing import Optional, Union, List, Tuple
+from typing import Optional, Union, List, Tuple, Callable
 
 import numpy as np
-from dtw import dtw
 
-from evaluation_protocol.io_module.preprocess_distances_files import write_distances_csv_file
-from evaluation_protocol.tests_setup.create_tests_conditions import generate_tests_conditions
+from corpus_processing.corpus_info_store import CorpusInfo
+from evaluation_protocol.io_module.preprocess_distances_files import write_distances_file
+from evaluation_protocol.tests_setup.calculate_meta_analysis_statistics import get_meta_analysis_statistics
+from evaluation_protocol.tests_setup.create_tests_conditions import generate_tests_conditions, check_sampling_policy, \
+    get_candidate_trials
+from evaluation_protocol.tests_setup.distance_backends import DEFAULT_METRIC, get_distance_backend
+from evaluation_protocol.tests_setup.distance_matrix import get_distance_matrix
 from evaluation_protocol.tests_setup.extract_vowel_segments import extract_vowel_segments
+from metaeval_core.instrumentation import stage
 
 
-def _calculate_dtw(matrix1: np.ndarray, matrix2: np.ndarray, dist_method: Optional[str] = 'cosine') -> float:
-    # Avoid non-definition of distance for zero vectors, replace those vectors with random representation
-    zero_frames = np.where(np.sum(matrix1, axis=1) == 0)[0]
-    matrix1[zero_frames, :] = np.random.rand(len(zero_frames), matrix1.shape[-1])
+def _calculate_dtw_distances_per_condition(vowel_segments: List[np.ndarray], same_list: List[np.ndarray],
+                                           different_list: List[np.ndarray], backend: Callable) -> \
+        Tuple[List[np.ndarray], List[np.ndarray]]:
+    # All the pairs are given to the backend at once (e.g., one matrix product for pooled embeddings)
+    pairs_list = same_list + different_list
+    offsets = np.cumsum([len(pairs) for pairs in pairs_list])[:-1]
+    all_pairs = np.concatenate(pairs_list).reshape(-1, 2) if pairs_list else np.zeros((0, 2), dtype=np.int64)
+    distances = np.split(backend(vowel_segments, all_pairs, {}), offsets) if pairs_list else []
 
-    zero_frames2 = np.where(np.sum(matrix2, axis=1) == 0)[0]
-    matrix2[zero_frames2, :] = np.random.rand(len(zero_frames2), matrix2.shape[-1])
+    return distances[:len(same_list)], distances[len(same_list):]
 
-    alignment = dtw(matrix1, matrix2, keep_internals=True, distance_only=True, dist_method=dist_method)
-    return alignment.normalizedDistance
 
-
-def _calculate_dtw_distances_per_condition(vowel_segments: List[np.ndarray], file_mapping: List[str],
-                                           same_list: List[List[Tuple[str, str]]],
-                                           different_list: List[List[Tuple[str, str]]]) -> \
-        Tuple[List[List[float]], List[List[float]]]:
-    indices = {pathlib.Path(file_path).stem: idx for idx, file_path in enumerate(file_mapping)}
-    same_distances = []
-    different_distances = []
+def _calculate_sampled_dtw_distances_per_condition(vowel_segments: List[np.ndarray], same_list: List[np.ndarray],
+                                                   different_list: List[np.ndarray], sampling: dict,
+                                                   backend: Callable) -> \
+        Tuple[List[np.ndarray], List[np.ndarray], List[np.ndarray], List[np.ndarray]]:
+    # The pairs are in stratified random order, so prefixes are used as samples. The sample size grows until the
+    # standard error of the effect size is below the target or all the pairs are used.
     calculated_distances = {}
-
-    for condition_list, distances_list in zip([same_list, different_list], [same_distances, different_distances]):
-        for contrast in condition_list:
-            distances = []
-            for trial1, trial2 in contrast:
-                if (trial1, trial2) in calculated_distances:
-                    distances.append(calculated_distances[(trial1, trial2)])
-                elif (trial2, trial1) in calculated_distances:
-                    distances.append(calculated_distances[(trial1, trial2)])
-                else:  # first time
-                    dtw_distance = _calculate_dtw(vowel_segments[indices[trial1]], vowel_segments[indices[trial2]])
-                    distances.append(dtw_distance)
-                    calculated_distances[(trial1, trial2)] = dtw_distance
-            distances_list.append(distances)
-
-    return same_distances, different_distances
-
-
-def calculate_dtw_distances(corpus_info: dict, file_mapping: List[str],
+    same_samples, different_samples, same_distances, different_distances = [], [], [], []
+
+    for same_pairs, different_pairs in zip(same_list, different_list):
+        sample_size = sampling['initial_size']
+        same_distance = np.zeros(0)
+        different_distance = np.zeros(0)
+        while True:
+            same_sample = same_pairs[:sample_size]
+            different_sample = different_pairs[:sample_size]
+            same_distance = np.concatenate([same_distance, backend(
+                vowel_segments, same_sample[len(same_distance):], calculated_distances)])
+            different_distance = np.concatenate([different_distance, backend(
+                vowel_segments, different_sample[len(different_distance):], calculated_distances)])
+
+            standard_error = get_meta_analysis_statistics([same_distance], [different_distance])[0][7]
+            all_pairs_used = len(same_sample) == len(same_pairs) and len(different_sample) == len(different_pairs)
+            if standard_error <= sampling['target_se'] or all_pairs_used:
+                break
+            sample_size = int(np.ceil(sample_size * sampling['growth_factor']))
+
+        same_samples.append(same_sample)
+        different_samples.append(different_sample)
+        same_distances.append(same_distance)
+        different_distances.append(different_distance)
+
+    return same_samples, different_samples, same_distances, different_distances
+
+
+def calculate_dtw_distances(corpus_info: Union[dict, CorpusInfo], file_mapping: List[str],
                             predictions_list: List[np.ndarray], time_stamps_list: List[np.ndarray],
                             contrasts: List[Tuple[str, str]],
                             filters: dict, corpus: str, contrasts_languages: List[Tuple[str, str]],
                             output_file_path: Optional[Union[str, pathlib.Path]] = None,
-                            vowels_segments: Optional[bool] = False) -> \
-        Tuple[List[List[float]], List[List[float]]]:
-    if vowels_segments:
-        segments = extract_vowel_segments(corpus_info, file_mapping, predictions_list, time_stamps_list, corpus)
-    else:  # Use whole CVC context for calculating the distance
-        segments = predictions_list
-    same_conditions, different_conditions = generate_tests_conditions(corpus_info, contrasts, filters, corpus,
-                                                                      contrasts_languages=contrasts_languages)
-    same_distances, different_distances = _calculate_dtw_distances_per_condition(segments, file_mapping,
-                                                                                 same_conditions, different_conditions)
+                            vowels_segments: Optional[bool] = False,
+                            sampling: Optional[dict] = None, window_shift: Optional[int] = None,
+                            segment_index_path: Optional[Union[str, pathlib.Path]] = None,
+                            metric: Optional[str] = DEFAULT_METRIC,
+                            distance_matrix_path: Optional[Union[str, pathlib.Path]] = None) -> \
+        Tuple[List[np.ndarray], List[np.ndarray]]:
+    with stage('extract_vowel_segments', trials=len(predictions_list)):
+        if vowels_segments:
+            segments = extract_vowel_segments(corpus_info, file_mapping, predictions_list, time_stamps_list, corpus,
+                                              window_shift, segment_index_path)
+        else:  # Use whole CVC context for calculating the distance
+            segments = predictions_list
+    with stage('generate_conditions') as record:
+        same_conditions, different_conditions = generate_tests_conditions(corpus_info, file_mapping, contrasts,
+                                                                          filters, corpus,
+                                                                          contrasts_languages=contrasts_languages,
+                                                                          sampling=sampling)
+        record['pairs'] = sum(len(pairs) for pairs in same_conditions + different_conditions)
+    if distance_matrix_path:
+        with stage('distance_matrix') as record:
+            languages = sorted(set(language for languages in contrasts_languages for language in languages))
+            trial_ids = get_candidate_trials(corpus_info, file_mapping, corpus, filters, languages)
+            distance_matrix = get_distance_matrix(segments, trial_ids, file_mapping, metric, distance_matrix_path)
+            record['trials'] = len(distance_matrix.trial_ids)
+        backend = distance_matrix.as_backend()
+    else:
+        backend = get_distance_backend(metric)
+    with stage('dtw') as record:
+        if sampling is None:
+            same_distances, different_distances = _calculate_dtw_distances_per_condition(segments, same_conditions,
+                                                                                         different_conditions, backend)
+        else:
+            same_conditions, different_conditions, same_distances, different_distances = \
+                _calculate_sampled_dtw_distances_per_condition(segments, same_conditions, different_conditions,
+                                                               check_sampling_policy(sampling), backend)
+        record['pairs'] = sum(len(distances) for distances in same_distances + different_distances)
 
     if output_file_path:
-        write_distances_csv_file(output_file_path, same_conditions, different_conditions, same_distances,
-                                 different_distances, contrasts, contrasts_languages)
+        with stage('write_distances'):
+            write_distances_file(output_file_path, same_conditions, different_conditions, same_distances,
+                                 different_distances, contrasts, contrasts_languages, file_mapping, metric)
 
     return same_distances, different_distances
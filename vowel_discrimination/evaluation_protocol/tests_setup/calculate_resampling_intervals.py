@@ -0,0 +1,91 @@
+"""
+    This script calculates bootstrap and permutation intervals of the effect size of each contrast from a binary
+    distances file (.npz), and creates a csv file with them. The bootstrap resamples trials or speakers (not pairs),
+    since the pairs of a contrast share trials.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['calculate_resampling_intervals']
+
+import argparse
+import csv
+import pathlib
+from typing import Union, Optional
+
+import numpy as np
+
+from corpus_processing.corpus_info_store import load_corpus_info
+from evaluation_protocol.io_module.preprocess_distances_files import read_distances_segments, BINARY_SUFFIX
+from metaeval_core.instrumentation import RunReport, stage
+from metaeval_core.resampling import get_bootstrap_intervals, get_permutation_intervals
+
+UNITS = ['trial', 'speaker']
+
+
+def calculate_resampling_intervals(distances_path: Union[str, pathlib.Path],
+                                   output_csv_path: Union[str, pathlib.Path],
+                                   corpus_info_path: Optional[Union[str, pathlib.Path]] = None,
+                                   unit: Optional[str] = 'trial', n_resamples: Optional[int] = 1000,
+                                   alpha: Optional[float] = 0.05, seed: Optional[int] = 0,
+                                   n_jobs: Optional[int] = 1, batch_size: Optional[int] = 100) -> None:
+    assert pathlib.Path(distances_path).suffix == BINARY_SUFFIX
+    assert unit in UNITS
+    assert unit == 'trial' or corpus_info_path is not None
+
+    with stage('read_distances') as record:
+        distances, offsets, pairs, contrasts, contrasts_languages, trial_names, _ = read_distances_segments(
+            distances_path)
+        record['pairs'] = len(distances)
+
+    clusters = None
+    if unit == 'speaker':
+        corpus_info = load_corpus_info(corpus_info_path)
+        clusters = corpus_info.codes('speaker')[corpus_info.rows(trial_names)]
+
+    with stage('bootstrap', resamples=n_resamples, contrasts=len(contrasts)):
+        bootstrap = get_bootstrap_intervals(distances, offsets, pairs, clusters, n_resamples, alpha, seed, n_jobs,
+                                            batch_size)
+    with stage('permutation', resamples=n_resamples, contrasts=len(contrasts)):
+        permutation = get_permutation_intervals(distances, offsets, n_resamples, alpha, seed, n_jobs, batch_size)
+
+    counts = np.diff(offsets)
+    rows = [['contrast', 'languages', 'n1', 'n2', 'es', 'bootstrap_se', 'bootstrap_ci_lb', 'bootstrap_ci_ub',
+             'permutation_null_lb', 'permutation_null_ub', 'permutation_p_value']]
+    for idx, contrast in enumerate(contrasts):
+        rows.append([contrast, contrasts_languages[idx], int(counts[2 * idx + 1]), int(counts[2 * idx]),
+                     bootstrap['g'][idx], bootstrap['se'][idx], bootstrap['ci_lb'][idx], bootstrap['ci_ub'][idx],
+                     permutation['null_lb'][idx], permutation['null_ub'][idx], permutation['p_value'][idx]])
+
+    pathlib.Path(output_csv_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_csv_path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file, delimiter=';')
+        writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Script to calculate bootstrap and permutation intervals of the '
+                                                 'effect size per contrast from a binary distances file.\nUsage: '
+                                                 'python calculate_resampling_intervals.py '
+                                                 '--distances_path path_npz_distances_file '
+                                                 '--output_csv_path path_output_csv_file '
+                                                 '[--corpus_info_path path_corpus_info] [--unit trial|speaker] '
+                                                 '[--n_resamples resamples] [--alpha alpha] [--seed seed] '
+                                                 '[--n_jobs processes] [--batch_size resamples_per_batch] '
+                                                 '[--report_path path_json_run_report]')
+    parser.add_argument('--distances_path', type=str, required=True)
+    parser.add_argument('--output_csv_path', type=str, required=True)
+    parser.add_argument('--corpus_info_path', type=str)
+    parser.add_argument('--unit', type=str, choices=UNITS, default='trial')
+    parser.add_argument('--n_resamples', type=int, default=1000)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--n_jobs', type=int, default=1)
+    parser.add_argument('--batch_size', type=int, default=100)
+    parser.add_argument('--report_path', type=str)
+    args = parser.parse_args()
+
+    with RunReport('calculate_resampling_intervals', args.report_path):
+        calculate_resampling_intervals(args.distances_path, args.output_csv_path, args.corpus_info_path, args.unit,
+                                       args.n_resamples, args.alpha, args.seed, args.n_jobs, args.batch_size)
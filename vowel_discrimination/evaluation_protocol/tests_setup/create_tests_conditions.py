@@ -7,12 +7,15 @@
 """
 
 __docformat__ = ['reStructuredText']
-__all__ = ['generate_tests_conditions']
+__all__ = ['generate_tests_conditions', 'check_sampling_policy', 'get_candidate_trials']
 
-import itertools
-import re
+import pathlib
 from collections import defaultdict
-from typing import List, Tuple, Optional, Any
+from typing import List, Tuple, Optional, Any, Union
+
+import numpy as np
+
+from corpus_processing.corpus_info_store import CorpusInfo, as_corpus_info
 
 IVC_LANGUAGES = ['en', 'nl', 'de', 'fr', 'jp']
 IVC_VOWELS = {
@@ -27,6 +30,10 @@ HC_VOWELS = ['i', 'I', 'E', '{', 'A', 'O', 'U', 'u', 'V', 'Er', 'e', 'o']
 
 OC_VOWELS = ['a', 'a:', 'E', 'e', 'I', 'i', 'O', 'o', 'U', 'u']
 
+# Sampling policy for huge contrasts: pairs are drawn (stratified by speaker and, for OLLO, CVC context) until the
+# standard error of the effect size is below target_se.
+DEFAULT_SAMPLING = {'target_se': 0.05, 'initial_size': 1000, 'growth_factor': 2.0, 'seed': 42}
+
 
 def _check_ivc_parameters(contrasts: List[Tuple[str, str]], contrasts_languages: List[Tuple[str, str]]) -> bool:
     if len(set(language for contrast in contrasts_languages
@@ -64,90 +71,64 @@ def _update_list_trials_speakers(filters: List[Tuple[Any, Any]], trials: List[st
     return trials, speakers
 
 
-def _apply_filters_trials(corpus_info: dict, filters: dict) -> List[str]:
-    trials = []
-    for trial in corpus_info.keys():
-        log_search = re.search(r'(L\d+)', trial)
-        logatome_name = log_search.group(1)
+def _apply_filters_trials(corpus_info: CorpusInfo, filters: dict) -> np.ndarray:
+    selected = np.ones(len(corpus_info), dtype=bool)
+    for column, filter_name in [('logatome', 'logatomes'), ('speaker', 'speakers'), ('variability', 'variability'),
+                                ('repetition', 'repetitions')]:
+        if filters[filter_name]:
+            selected &= corpus_info.mask(column, filters[filter_name])
 
-        spkr_search = re.search(r'(S\d+[F,M])', trial)
-        speaker_id = spkr_search.group(1)
+    return selected
 
-        var_search = re.search(r'(V\d)', trial)
-        variability = var_search.group(1)
 
-        rep_search = re.search(r'(N\d)', trial)
-        repetition = rep_search.group(1)
+def _get_trials(corpus_info: CorpusInfo, contrast: Tuple[str, str], corpus: str, filters: Optional[dict] = None,
+                languages: Optional[Tuple[str, str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    # Rows of the corpus info with the trials of each vowel of the contrast
+    vowel1, vowel2 = contrast
+    v1 = corpus_info.mask('vowel', vowel1)
+    v2 = corpus_info.mask('vowel', vowel2)
 
-        if filters['logatomes'] and logatome_name not in filters['logatomes']:
-            pass
-        elif filters['speakers'] and speaker_id not in filters['speakers']:
-            pass
-        elif filters['variability'] and variability not in filters['variability']:
-            pass
-        elif filters['repetitions'] and repetition not in filters['repetitions']:
-            pass
+    if corpus == 'ivc':
+        assert languages
+        lang1, lang2 = languages
+        v1 &= corpus_info.mask('language', lang1)
+        v2 &= corpus_info.mask('language', lang2)
+    elif corpus == 'hc':
+        if 'failed_listeners_test' in filters:
+            include_listeners_test_failed = filters['failed_listeners_test']
         else:
-            trials.append(trial)
-
-    return trials
+            include_listeners_test_failed = False
+        listeners_test = corpus_info.column('failed_listeners_test') == include_listeners_test_failed
+        v1 &= listeners_test
+        v2 &= listeners_test
+    else:  # oc
+        selected = _apply_filters_trials(corpus_info, filters)
+        v1 &= selected
+        v2 &= selected
+    v2 &= ~v1
 
+    return np.flatnonzero(v1), np.flatnonzero(v2)
 
-def _get_trials(corpus_info: dict, contrast: Tuple[str, str], corpus: str, filters: Optional[dict] = None,
-                languages: Optional[Tuple[str, str]] = None) -> Tuple[List[str], List[str], List[str], List[str],
-                                                                      List[List[str]], List[List[str]]]:
-    vowel1, vowel2 = contrast
-    trials_v1, trials_v2, speakers_v1, speakers_v2, cvc_v1, cvc_v2 = [], [], [], [], [], []
 
+def get_candidate_trials(corpus_info: Union[dict, CorpusInfo], file_mapping: List[str], corpus: str,
+                         filters: Optional[dict] = None, languages: Optional[List[str]] = None) -> np.ndarray:
+    # Sorted trial ids (indices into file_mapping) of every trial that a contrast of the corpus may use with the given
+    # filters (languages for ivc, all of them by default)
+    corpus_info = as_corpus_info(corpus_info)
     if corpus == 'ivc':
-        assert languages
-        lang1, lang2 = languages
-    else:
-        lang1, lang2 = None, None
-
-    if corpus == 'hc' and 'failed_listeners_test' in filters:
-        include_listeners_test_failed = filters['failed_listeners_test']
-    else:
-        include_listeners_test_failed = False
-
-    if corpus == 'oc':
-        trials = _apply_filters_trials(corpus_info, filters)
-    else:
-        trials = corpus_info.keys()
-
-    for trial in trials:
-        vowel = corpus_info[trial]['vowel']
-        speaker = corpus_info[trial]['speaker']
-        v1, v2 = False, False
-        if vowel == vowel1 or vowel == vowel2:
-            if corpus == 'ivc':
-                language = corpus_info[trial]['details']['language']
-                if vowel == vowel1 and language == lang1:
-                    v1 = True
-                elif vowel == vowel2 and language == lang2:
-                    v2 = True
-            elif corpus == 'hc':
-                failed_listeners_test = corpus_info[trial]['details']['failed_listeners_test']
-                if vowel == vowel1 and include_listeners_test_failed == failed_listeners_test:
-                    v1 = True
-                elif vowel == vowel2 and include_listeners_test_failed == failed_listeners_test:
-                    v2 = True
-            else:  # oc
-                phones = corpus_info[trial]['details']['phones']
-                if vowel == vowel1:
-                    v1 = True
-                    cvc_v1.append(phones)
-                else:
-                    v2 = True
-                    cvc_v2.append(phones)
-            if v1:
-                trials_v1.append(trial)
-                speakers_v1.append(speaker)
-            elif v2:
-                trials_v2.append(trial)
-                speakers_v2.append(speaker)
-
-    return trials_v1, trials_v2, speakers_v1, speakers_v2, cvc_v1, cvc_v2
+        selected = corpus_info.mask('language', languages if languages else IVC_LANGUAGES)
+        selected &= corpus_info.mask('vowel', sorted(set(vowel for vowels in IVC_VOWELS.values() for vowel in vowels)))
+    elif corpus == 'hc':
+        filters = filters if filters else {}
+        selected = corpus_info.column('failed_listeners_test') == filters.get('failed_listeners_test', False)
+        selected &= corpus_info.mask('vowel', HC_VOWELS)
+    else:  # oc
+        selected = _apply_filters_trials(corpus_info, _check_oc_filters(dict(filters) if filters else {}))
+        selected &= corpus_info.mask('vowel', OC_VOWELS)
+
+    trial_ids = {pathlib.Path(file_path).stem: idx for idx, file_path in enumerate(file_mapping)}
+    candidates = [trial_ids[trial] for trial in corpus_info.trials[selected].tolist() if trial in trial_ids]
+    return np.unique(np.array(candidates, dtype=np.int64))
 
 
 def _check_oc_filters(filters: dict) -> dict:
@@ -166,10 +147,55 @@ def _check_oc_filters(filters: dict) -> dict:
     return filters
 
 
-def generate_tests_conditions(corpus_info: dict, contrasts: List[Tuple[str, str]],
-                              filters: dict, corpus: str,
-                              contrasts_languages: List[Tuple[str, str]]) -> \
-        Tuple[List[List[Tuple[str, str]]], List[List[Tuple[str, str]]]]:
+def _get_pairs_combinations(trial_ids: np.ndarray, speakers: np.ndarray) -> np.ndarray:
+    # Same order as itertools.combinations, keeping only across-speaker pairs
+    first, second = np.triu_indices(len(trial_ids), k=1)
+    across_speakers = speakers[first] != speakers[second]
+    return np.stack((trial_ids[first[across_speakers]], trial_ids[second[across_speakers]]), axis=1)
+
+
+def _get_pairs_product(trial_ids1: np.ndarray, speakers1: np.ndarray, trial_ids2: np.ndarray,
+                       speakers2: np.ndarray) -> np.ndarray:
+    # Same order as itertools.product, keeping only across-speaker pairs
+    first = np.repeat(np.arange(len(trial_ids1)), len(trial_ids2))
+    second = np.tile(np.arange(len(trial_ids2)), len(trial_ids1))
+    across_speakers = speakers1[first] != speakers2[second]
+    return np.stack((trial_ids1[first[across_speakers]], trial_ids2[second[across_speakers]]), axis=1)
+
+
+def _concatenate_pairs(pairs_list: List[np.ndarray]) -> np.ndarray:
+    if not pairs_list:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(pairs_list)
+
+
+def check_sampling_policy(sampling: dict) -> dict:
+    sampling = {**DEFAULT_SAMPLING, **sampling}
+    assert set(sampling.keys()) == set(DEFAULT_SAMPLING.keys())
+    assert sampling['target_se'] > 0
+    assert sampling['initial_size'] > 1
+    assert sampling['growth_factor'] > 1
+    return sampling
+
+
+def _get_stratified_order(strata: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    # Random order in which every prefix keeps the proportion of pairs of each stratum
+    shuffled = rng.permutation(len(strata))
+    order = shuffled[np.argsort(strata[shuffled], kind='stable')]
+    sorted_strata = strata[order]
+    starts = np.flatnonzero(np.r_[True, sorted_strata[1:] != sorted_strata[:-1]])
+    sizes = np.diff(np.r_[starts, len(strata)])
+    rank = np.arange(len(strata)) - np.repeat(starts, sizes)
+    priority = (rank + rng.random(len(strata))) / np.repeat(sizes, sizes)
+    return order[np.argsort(priority, kind='stable')]
+
+
+def generate_tests_conditions(corpus_info: Union[dict, CorpusInfo], file_mapping: List[str],
+                              contrasts: List[Tuple[str, str]], filters: dict, corpus: str,
+                              contrasts_languages: List[Tuple[str, str]],
+                              sampling: Optional[dict] = None) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    # Pairs per contrast are arrays of shape (n_pairs, 2) with trial ids (indices into file_mapping). If a sampling
+    # policy is given, pairs are returned in a stratified random order so any prefix is a stratified sample.
     # check params:
     if corpus == 'ivc':
         assert contrasts_languages
@@ -180,64 +206,70 @@ def generate_tests_conditions(corpus_info: dict, contrasts: List[Tuple[str, str]
         assert _check_contrasts(contrasts, 'oc')
         filters = _check_oc_filters(filters)
 
+    corpus_info = as_corpus_info(corpus_info)
+    trial_ids = {pathlib.Path(file_path).stem: idx for idx, file_path in enumerate(file_mapping)}
+    rows_trial_ids = np.array([trial_ids.get(trial, -1) for trial in corpus_info.trials.tolist()], dtype=np.int64)
+    speaker_codes = corpus_info.codes('speaker')
+    cvc_codes = corpus_info.codes('phones')
+    cvc_contexts = [''.join(phones.split()) for phones in corpus_info.categories('phones').tolist()]
+
+    if sampling is not None:
+        sampling = check_sampling_policy(sampling)
+        rng = np.random.default_rng(sampling['seed'])
+        # strata of a pair are given by its first trial: speaker and cvc context (only oc has several contexts)
+        in_mapping = rows_trial_ids >= 0
+        trials_strata = np.zeros(len(file_mapping), dtype=np.int64)
+        trials_strata[rows_trial_ids[in_mapping]] = (speaker_codes[in_mapping] * len(cvc_contexts) +
+                                                     cvc_codes[in_mapping])
+
     # create two conditions
     same_condition = []
     different_condition = []
     for idx, contrast in enumerate(contrasts):
         if corpus == 'ivc':
-            trials_v1, trials_v2, speakers_v1, speakers_v2, _, _ = _get_trials(corpus_info, contrast, 'ivc',
-                                                                               languages=contrasts_languages[idx])
-        elif corpus == 'hc':
-            trials_v1, trials_v2, speakers_v1, speakers_v2, _, _ = _get_trials(corpus_info, contrast, 'hc',
-                                                                               filters=filters)
-        else:  # oc
-            trials_v1, trials_v2, speakers_v1, speakers_v2, cvc_v1, cvc_v2 = _get_trials(corpus_info, contrast,
-                                                                                         'oc', filters=filters)
+            rows_v1, rows_v2 = _get_trials(corpus_info, contrast, 'ivc', languages=contrasts_languages[idx])
+        else:  # hc and oc
+            rows_v1, rows_v2 = _get_trials(corpus_info, contrast, corpus, filters=filters)
+        ids_v1, codes_v1 = rows_trial_ids[rows_v1], speaker_codes[rows_v1]
+        ids_v2, codes_v2 = rows_trial_ids[rows_v2], speaker_codes[rows_v2]
+        assert np.all(ids_v1 >= 0) and np.all(ids_v2 >= 0), 'Trials of the contrast missing in the file mapping'
 
         # same conditions: same vowels
         if corpus != 'oc':
-            tmp_same = list(itertools.combinations(trials_v1, 2)) + list(itertools.combinations(trials_v2, 2))
-            speakers_tmp_same = list(itertools.combinations(speakers_v1, 2)) + list(itertools.combinations(speakers_v2, 2))
-
-            tmp_different = list(itertools.product(trials_v1, trials_v2))
-            speakers_tmp_different = list(itertools.product(speakers_v1, speakers_v2))
+            tmp_same = _concatenate_pairs([_get_pairs_combinations(ids_v1, codes_v1),
+                                           _get_pairs_combinations(ids_v2, codes_v2)])
+            tmp_different = _get_pairs_product(ids_v1, codes_v1, ids_v2, codes_v2)
         else:
             # Check that trials to be compared have the same cvc context
-            trials_v1_cvc = defaultdict(list)
-            speakers_v1_cvc = defaultdict(list)
-            trials_v2_cvc = defaultdict(list)
-            speakers_v2_cvc = defaultdict(list)
-
-            for j, trial in enumerate(trials_v1):
-                trials_v1_cvc[''.join(cvc_v1[j])].append(trial)
-                speakers_v1_cvc[''.join(cvc_v1[j])].append(speakers_v1[j])
-            for j, trial in enumerate(trials_v2):
-                trials_v2_cvc[''.join(cvc_v2[j])].append(trial)
-                speakers_v2_cvc[''.join(cvc_v2[j])].append(speakers_v2[j])
-            tmp_same = []
-            speakers_tmp_same = []
-            tmp_different = []
-            speakers_tmp_different = []
-            set_cvc_v2 = set(trials_v2_cvc.keys())
-            for cvc in trials_v1_cvc.keys():
-                tmp_same += list(itertools.combinations(trials_v1_cvc[cvc], 2))
-                speakers_tmp_same += list(itertools.combinations(speakers_v1_cvc[cvc], 2))
+            positions_v1_cvc = defaultdict(list)
+            positions_v2_cvc = defaultdict(list)
+
+            for j, cvc_code in enumerate(cvc_codes[rows_v1].tolist()):
+                positions_v1_cvc[cvc_contexts[cvc_code]].append(j)
+            for j, cvc_code in enumerate(cvc_codes[rows_v2].tolist()):
+                positions_v2_cvc[cvc_contexts[cvc_code]].append(j)
+            same_pairs = []
+            different_pairs = []
+            set_cvc_v2 = set(positions_v2_cvc.keys())
+            for cvc, positions in positions_v1_cvc.items():
+                same_pairs.append(_get_pairs_combinations(ids_v1[positions], codes_v1[positions]))
                 for cvc2 in set_cvc_v2:
                     if cvc[0] == cvc2[0] and cvc[-1] == cvc2[-1]:
                         set_cvc_v2.remove(cvc2)
-                        tmp_different += list(itertools.product(trials_v1_cvc[cvc], trials_v2_cvc[cvc2]))
-                        speakers_tmp_different += list(itertools.product(speakers_v1_cvc[cvc], speakers_v2_cvc[cvc2]))
+                        positions2 = positions_v2_cvc[cvc2]
+                        different_pairs.append(_get_pairs_product(ids_v1[positions], codes_v1[positions],
+                                                                  ids_v2[positions2], codes_v2[positions2]))
                         break
-            for cvc in trials_v2_cvc.keys():
-                tmp_same += list(itertools.combinations(trials_v2_cvc[cvc], 2))
-                speakers_tmp_same += list(itertools.combinations(speakers_v2_cvc[cvc], 2))
+            for positions in positions_v2_cvc.values():
+                same_pairs.append(_get_pairs_combinations(ids_v2[positions], codes_v2[positions]))
+            tmp_same = _concatenate_pairs(same_pairs)
+            tmp_different = _concatenate_pairs(different_pairs)
 
-        # Across-speaker calculations
-        tmp_same = [pair for i, pair in enumerate(tmp_same) if speakers_tmp_same[i][0] != speakers_tmp_same[i][1]]
-        same_condition.append(tmp_same)
+        if sampling is not None:
+            tmp_same = tmp_same[_get_stratified_order(trials_strata[tmp_same[:, 0]], rng)]
+            tmp_different = tmp_different[_get_stratified_order(trials_strata[tmp_different[:, 0]], rng)]
 
-        tmp_different = [pair for i, pair in enumerate(tmp_different)
-                         if speakers_tmp_different[i][0] != speakers_tmp_different[i][1]]
+        same_condition.append(tmp_same)
         different_condition.append(tmp_different)
 
     return same_condition, different_condition
@@ -0,0 +1,117 @@
+"""
+    Distance backends (metrics) between the segments of pairs of trials.
+
+    A backend is a function (segments, pairs, cache) -> distances, where pairs is an (n_pairs, 2) array of trial ids
+    (indices into segments) and cache is a dictionary kept across the calls of the same test, so distances (DTW) or
+    pooled embeddings are computed only once. Available metrics:
+
+    - dtw_cosine: DTW with cosine distance between frames (normalised by the path length), the default.
+    - dtw_euclidean: DTW with Euclidean distance between frames.
+    - mean_cosine, mean_euclidean, max_cosine, max_euclidean: the frames of each segment are pooled (mean or max) into
+      one embedding and the embeddings are compared with cosine or Euclidean distance. The distances of all the pairs
+      come from one matrix product over the pooled embeddings of the trials involved. This is a fast screening metric,
+      not a replacement of DTW.
+
+    New backends can be added with `register_distance_backend`.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['DISTANCE_BACKENDS', 'DEFAULT_METRIC', 'register_distance_backend', 'get_distance_backend',
+           'calculate_dtw']
+
+import functools
+from typing import Optional, List, Callable
+
+import numpy as np
+from dtw import dtw
+
+DEFAULT_METRIC = 'dtw_cosine'
+DISTANCE_BACKENDS = {}
+# The pooled backends use the full Gram matrix of the trials involved when it is at most this factor times the
+# number of pairs
+MAX_GRAM_FACTOR = 16
+
+
+def register_distance_backend(name: str, backend: Callable[[List[np.ndarray], np.ndarray, dict], np.ndarray]) -> None:
+    DISTANCE_BACKENDS[name] = backend
+
+
+def get_distance_backend(name: str) -> Callable[[List[np.ndarray], np.ndarray, dict], np.ndarray]:
+    assert name in DISTANCE_BACKENDS, f'Unknown metric {name}, available: {sorted(DISTANCE_BACKENDS.keys())}'
+    return DISTANCE_BACKENDS[name]
+
+
+def calculate_dtw(matrix1: np.ndarray, matrix2: np.ndarray, dist_method: Optional[str] = 'cosine') -> float:
+    if dist_method == 'cosine':
+        # Avoid non-definition of distance for zero vectors, replace those vectors with random representation. The
+        # segments can be views of the features or latents buffer, so the frames are replaced in a copy.
+        zero_frames = np.where(np.sum(matrix1, axis=1) == 0)[0]
+        if zero_frames.size:
+            matrix1 = matrix1.copy()
+            matrix1[zero_frames, :] = np.random.rand(len(zero_frames), matrix1.shape[-1])
+
+        zero_frames2 = np.where(np.sum(matrix2, axis=1) == 0)[0]
+        if zero_frames2.size:
+            matrix2 = matrix2.copy()
+            matrix2[zero_frames2, :] = np.random.rand(len(zero_frames2), matrix2.shape[-1])
+
+    alignment = dtw(matrix1, matrix2, keep_internals=True, distance_only=True, dist_method=dist_method)
+    return alignment.normalizedDistance
+
+
+def _dtw_backend(segments: List[np.ndarray], pairs: np.ndarray, cache: dict, dist_method: str) -> np.ndarray:
+    # Distances are symmetric, each pair of trials is computed once
+    distances = np.zeros(len(pairs))
+    for idx, (trial1, trial2) in enumerate(pairs.tolist()):
+        pair = (trial1, trial2) if trial1 < trial2 else (trial2, trial1)
+        if pair not in cache:  # first time
+            cache[pair] = calculate_dtw(segments[trial1], segments[trial2], dist_method)
+        distances[idx] = cache[pair]
+    return distances
+
+
+def _pooled_backend(segments: List[np.ndarray], pairs: np.ndarray, cache: dict, pooling: str,
+                    dist_method: str) -> np.ndarray:
+    if len(pairs) == 0:
+        return np.zeros(0)
+    if 'embeddings' not in cache:
+        # Empty segments have NaN embeddings (and distances)
+        pool = np.mean if pooling == 'mean' else np.max
+        dim = segments[0].shape[-1]
+        cache['embeddings'] = np.stack([pool(segment, axis=0) if len(segment) else np.full(dim, np.nan)
+                                        for segment in segments]).astype(np.float64)
+        norms = np.linalg.norm(cache['embeddings'], axis=1, keepdims=True)
+        # Zero embeddings are orthogonal to any other embedding (cosine distance 1)
+        cache['normalised'] = cache['embeddings'] / np.where(norms == 0, 1, norms)
+
+    trials, pair_ids = np.unique(pairs, return_inverse=True)
+    pair_ids = pair_ids.reshape(pairs.shape)
+    if dist_method == 'cosine':
+        embeddings = cache['normalised'][trials]
+    else:  # euclidean
+        embeddings = cache['embeddings'][trials]
+
+    if len(trials) ** 2 <= MAX_GRAM_FACTOR * len(pairs):
+        # One matrix product over the trials involved, then the pairs are looked up
+        products = embeddings @ embeddings.T
+        squared_norms = np.diag(products)
+        products = products[pair_ids[:, 0], pair_ids[:, 1]]
+        squared_norms1, squared_norms2 = squared_norms[pair_ids[:, 0]], squared_norms[pair_ids[:, 1]]
+    else:  # few pairs among many trials, products of the pairs only
+        embeddings1, embeddings2 = embeddings[pair_ids[:, 0]], embeddings[pair_ids[:, 1]]
+        products = np.einsum('ij,ij->i', embeddings1, embeddings2)
+        squared_norms1 = np.einsum('ij,ij->i', embeddings1, embeddings1)
+        squared_norms2 = np.einsum('ij,ij->i', embeddings2, embeddings2)
+
+    if dist_method == 'cosine':
+        return 1 - products
+    return np.sqrt(np.maximum(squared_norms1 + squared_norms2 - 2 * products, 0))
+
+
+for _method in ['cosine', 'euclidean']:
+    register_distance_backend(f'dtw_{_method}', functools.partial(_dtw_backend, dist_method=_method))
+    for _pooling in ['mean', 'max']:
+        register_distance_backend(f'{_pooling}_{_method}',
+                                  functools.partial(_pooled_backend, pooling=_pooling, dist_method=_method))
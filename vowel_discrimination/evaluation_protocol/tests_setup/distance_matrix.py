@@ -0,0 +1,159 @@
+"""
+    Condensed trial-by-trial distance matrix of a checkpoint (predictions file) and feature type.
+
+    The upper triangle (without the diagonal) of the distances between all the trials that any contrast of the corpus
+    may use is stored as a float32 vector, in the order of scipy.spatial.distance.squareform, with the names of the
+    trials as index (.npz file). The pairs of the test conditions, for any contrast, filter or sampling, are then
+    looked up in the matrix, so new contrasts and analyses (ABX, resampling) of a checkpoint need no new distances.
+
+    The matrix is saved with a fingerprint of the segments of its trials (hash of their values), so a saved matrix is
+    not reused when the segments change (e.g., another checkpoint or predictions file, vowel or whole CVC segments, or
+    another window shift).
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['CondensedDistanceMatrix', 'get_segments_fingerprint', 'calculate_distance_matrix', 'save_distance_matrix',
+           'load_distance_matrix', 'get_distance_matrix']
+
+import hashlib
+import pathlib
+from typing import List, Union, Optional, Callable
+
+import numpy as np
+
+from evaluation_protocol.tests_setup.distance_backends import DEFAULT_METRIC, get_distance_backend
+
+# Number of pairs given to the backend at once
+BLOCK_PAIRS = 1000000
+
+
+class CondensedDistanceMatrix:
+    def __init__(self, distances: np.ndarray, trial_ids: np.ndarray, trial_names: np.ndarray, metric: str,
+                 fingerprint: Optional[str] = ''):
+        # trial_ids are sorted indices into the file mapping, trial_names the corresponding names and fingerprint the
+        # one of the segments of the trials (empty if unknown)
+        assert len(distances) == len(trial_ids) * (len(trial_ids) - 1) // 2
+        assert np.all(np.diff(trial_ids) > 0)
+        self.distances = distances
+        self.trial_ids = trial_ids
+        self.trial_names = trial_names
+        self.metric = metric
+        self.fingerprint = fingerprint
+
+    def covers(self, trial_ids: np.ndarray) -> bool:
+        return bool(np.all(np.isin(trial_ids, self.trial_ids)))
+
+    def positions(self, pairs: np.ndarray) -> np.ndarray:
+        # Positions in the condensed vector of pairs (n_pairs, 2) of trial ids
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        assert self.covers(pairs), 'Trials of the pairs missing in the distance matrix'
+        rows = np.searchsorted(self.trial_ids, pairs)
+        first, second = np.min(rows, axis=1), np.max(rows, axis=1)
+        assert np.all(first != second)
+        n_trials = len(self.trial_ids)
+        return first * (2 * n_trials - first - 1) // 2 + second - first - 1
+
+    def lookup(self, pairs: np.ndarray) -> np.ndarray:
+        return self.distances[self.positions(pairs)].astype(np.float64)
+
+    def as_backend(self) -> Callable[[List[np.ndarray], np.ndarray, dict], np.ndarray]:
+        # Same signature as the distance backends, the segments are not needed
+        return lambda segments, pairs, cache: self.lookup(pairs)
+
+
+def get_segments_fingerprint(segments: List[np.ndarray], trial_ids: np.ndarray) -> str:
+    # Hash of the ids, data types, shapes and values of the segments of the trials
+    digest = hashlib.sha256()
+    for trial_id in np.asarray(trial_ids, dtype=np.int64).tolist():
+        segment = np.ascontiguousarray(segments[trial_id])
+        digest.update(f'{trial_id};{segment.dtype.str};{segment.shape};'.encode())
+        digest.update(segment.tobytes())
+    return digest.hexdigest()
+
+
+def _get_condensed_pairs(start: int, end: int, n_trials: int) -> np.ndarray:
+    # Rows and columns (i < j) of the positions [start, end) of the condensed vector
+    positions = np.arange(start, end, dtype=np.int64)
+    row_starts = np.concatenate([[0], np.cumsum(np.arange(n_trials - 1, 0, -1))])
+    first = np.searchsorted(row_starts, positions, side='right') - 1
+    second = positions - row_starts[first] + first + 1
+    return np.stack((first, second), axis=1)
+
+
+def calculate_distance_matrix(segments: List[np.ndarray], trial_ids: np.ndarray, file_mapping: List[str],
+                              metric: Optional[str] = DEFAULT_METRIC,
+                              previous_matrix: Optional[CondensedDistanceMatrix] = None) -> CondensedDistanceMatrix:
+    # The distances of the pairs in previous_matrix (same metric) are copied instead of calculated
+    backend = get_distance_backend(metric)
+    assert previous_matrix is None or previous_matrix.metric == metric
+    trial_ids = np.unique(np.asarray(trial_ids, dtype=np.int64))
+    n_trials = len(trial_ids)
+    # Fingerprint of the segments as given, before any backend runs
+    fingerprint = get_segments_fingerprint(segments, trial_ids)
+    distances = np.zeros(n_trials * (n_trials - 1) // 2, dtype=np.float32)
+
+    cache = {}
+    for start in range(0, len(distances), BLOCK_PAIRS):
+        end = min(start + BLOCK_PAIRS, len(distances))
+        pairs = trial_ids[_get_condensed_pairs(start, end, n_trials)]
+        known = np.all(np.isin(pairs, previous_matrix.trial_ids), axis=1) if previous_matrix is not None else \
+            np.zeros(len(pairs), dtype=bool)
+        if np.any(known):
+            distances[start:end][known] = previous_matrix.distances[previous_matrix.positions(pairs[known])]
+        distances[start:end][~known] = backend(segments, pairs[~known], cache)
+        # Every pair is computed once, only the entries shared by the pairs (e.g., pooled embeddings) are kept
+        for key in [key for key in cache if isinstance(key, tuple)]:
+            del cache[key]
+
+    trial_names = np.array([pathlib.Path(file_mapping[idx]).stem for idx in trial_ids.tolist()], dtype=str)
+    return CondensedDistanceMatrix(distances, trial_ids, trial_names, metric, fingerprint)
+
+
+def save_distance_matrix(distance_matrix: CondensedDistanceMatrix, output_path: Union[str, pathlib.Path]) -> None:
+    pathlib.Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    # A file object is used so numpy does not append the .npz extension to the path given
+    with open(output_path, 'wb') as data_file:
+        np.savez(data_file, distances=distance_matrix.distances, trial_names=distance_matrix.trial_names,
+                 metric=np.array(distance_matrix.metric), fingerprint=np.array(distance_matrix.fingerprint))
+
+
+def load_distance_matrix(matrix_path: Union[str, pathlib.Path], file_mapping: List[str]) -> CondensedDistanceMatrix:
+    # Trial ids are resolved with the file mapping of the checkpoint, which has to contain all the trials
+    trial_ids = {pathlib.Path(file_path).stem: idx for idx, file_path in enumerate(file_mapping)}
+    with np.load(matrix_path, allow_pickle=False) as data:
+        distances, trial_names, metric = data['distances'], data['trial_names'], str(data['metric'])
+        # Matrices saved without fingerprint are never reused
+        fingerprint = str(data['fingerprint']) if 'fingerprint' in data.files else ''
+    assert all(trial in trial_ids for trial in trial_names.tolist()), 'Trials of the matrix missing in the file mapping'
+    ids = np.array([trial_ids[trial] for trial in trial_names.tolist()], dtype=np.int64)
+    # Matrices are saved in the order of their trial ids, which is kept when file mappings list trials in the same
+    # order
+    assert np.all(np.diff(ids) > 0), 'Trials of the matrix are in a different order in the file mapping'
+    return CondensedDistanceMatrix(distances, ids, trial_names, metric, fingerprint)
+
+
+def get_distance_matrix(segments: List[np.ndarray], trial_ids: np.ndarray, file_mapping: List[str],
+                        metric: Optional[str] = DEFAULT_METRIC,
+                        matrix_path: Optional[Union[str, pathlib.Path]] = None) -> CondensedDistanceMatrix:
+    # The saved matrix is used if it has the same metric and segments and covers the trials. Otherwise, it is extended
+    # with the new trials (only their distances are calculated) or recalculated for another metric or other segments,
+    # and saved.
+    previous_matrix = None
+    if matrix_path and pathlib.Path(matrix_path).is_file():
+        previous_matrix = load_distance_matrix(matrix_path, file_mapping)
+        if previous_matrix.fingerprint != get_segments_fingerprint(segments, previous_matrix.trial_ids):
+            print(f'The segments of the distance matrix {matrix_path} changed, it is calculated again')
+            previous_matrix = None
+        elif previous_matrix.metric != metric:
+            previous_matrix = None
+        elif previous_matrix.covers(trial_ids):
+            return previous_matrix
+        else:
+            trial_ids = np.union1d(trial_ids, previous_matrix.trial_ids)
+
+    distance_matrix = calculate_distance_matrix(segments, trial_ids, file_mapping, metric, previous_matrix)
+    if matrix_path:
+        save_distance_matrix(distance_matrix, matrix_path)
+    return distance_matrix
@@ -2,38 +2,105 @@
     This script extract the vowel segments from the predictions, using the time stamps provided in the corpus info
     file.
 
+    For predictions with frames at a fixed window shift, the vowel onset/offset (ms) of each trial are converted once
+    into [start, end) frame ranges (segment index), which only depend on the corpus info, the file mapping and the
+    window shift. Hence, the same index serves every checkpoint and feature type, and it can be saved (.npz). Segments
+    are slices (views) of the predictions.
+
     @date 26.05.2021
 """
 
 __docformat__ = ['reStructuredText']
-__all__ = ['extract_vowel_segments']
+__all__ = ['extract_vowel_segments', 'get_time_stamps_grid', 'get_segment_index', 'load_segment_index']
 
+import hashlib
 import pathlib
-from typing import List
+from typing import List, Union, Optional, Tuple
 
 import numpy as np
 
+from corpus_processing.corpus_info_store import CorpusInfo, as_corpus_info
+
+
+def get_time_stamps_grid(n_frames: int, window_shift: int) -> np.ndarray:
+    # Time (ms) of the frame centres, the time stamps of a trial are the first frames of the grid
+    return np.arange(window_shift / 2, n_frames * window_shift, window_shift)
+
+
+def _get_fingerprint(corpus_info: CorpusInfo) -> str:
+    digest = hashlib.sha256(np.ascontiguousarray(corpus_info.trials).astype(str).tobytes())
+    for column in ['vowel_onset', 'vowel_offset']:
+        digest.update(np.ascontiguousarray(corpus_info.column(column), dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def get_segment_index(corpus_info: Union[dict, CorpusInfo], file_mapping: List[str], window_shift: int) -> \
+        Tuple[np.ndarray, np.ndarray]:
+    # Frames with time stamps in [onset, offset] as [start, end) per trial of the file mapping
+    corpus_info = as_corpus_info(corpus_info)
+    rows = corpus_info.rows([pathlib.Path(file_path).stem for file_path in file_mapping])
+    onsets = corpus_info.column('vowel_onset')[rows]
+    offsets = corpus_info.column('vowel_offset')[rows]
+    n_frames = int(np.ceil(np.max(offsets, initial=0) / window_shift)) + 1
+    time_stamps = get_time_stamps_grid(n_frames, window_shift)
+    starts = np.searchsorted(time_stamps, onsets, side='left')
+    ends = np.maximum(np.searchsorted(time_stamps, offsets, side='right'), starts)
+    return starts.astype(np.int64), ends.astype(np.int64)
+
+
+def load_segment_index(corpus_info: Union[dict, CorpusInfo], file_mapping: List[str], window_shift: int,
+                       index_path: Union[str, pathlib.Path]) -> Tuple[np.ndarray, np.ndarray]:
+    # The saved index is used if it was created for the same trials, window shift and onsets/offsets, otherwise it is
+    # (re)created and saved
+    corpus_info = as_corpus_info(corpus_info)
+    trials = np.array([pathlib.Path(file_path).stem for file_path in file_mapping], dtype=str)
+    fingerprint = _get_fingerprint(corpus_info)
+    index_path = pathlib.Path(index_path)
+    if index_path.is_file():
+        with np.load(index_path, allow_pickle=False) as index:
+            if int(index['window_shift']) == window_shift and str(index['fingerprint']) == fingerprint and \
+                    np.array_equal(index['trials'], trials):
+                return index['starts'], index['ends']
+
+    starts, ends = get_segment_index(corpus_info, file_mapping, window_shift)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(index_path, trials=trials, starts=starts, ends=ends, window_shift=window_shift,
+             fingerprint=fingerprint)
+    return starts, ends
+
 
 def _get_vowel_segments(predictions_list: List[np.ndarray], time_stamps_list: List[np.ndarray], file_mapping: List[str],
-                        corpus_info: dict) -> List[np.ndarray]:
+                        corpus_info: CorpusInfo) -> List[np.ndarray]:
+    # Time stamps given per trial (e.g., text predictions), they are sorted so the segment is a range of frames
+    rows = corpus_info.rows([pathlib.Path(file_path).stem for file_path in file_mapping])
+    onsets = corpus_info.column('vowel_onset')[rows]
+    offsets = corpus_info.column('vowel_offset')[rows]
     vowel_segments = []
     for idx, prediction in enumerate(predictions_list):
-        trial_name = pathlib.Path(file_mapping[idx]).stem
-        onset_time = corpus_info[trial_name]['vowel_onset']
-        offset_time = corpus_info[trial_name]['vowel_offset']
-        index_maks = (time_stamps_list[idx] >= onset_time) & (time_stamps_list[idx] <= offset_time)
-        vowel_segments.append(prediction[index_maks])
+        start = np.searchsorted(time_stamps_list[idx], onsets[idx], side='left')
+        end = max(np.searchsorted(time_stamps_list[idx], offsets[idx], side='right'), start)
+        vowel_segments.append(prediction[start:end])
 
     return vowel_segments
 
 
-def extract_vowel_segments(corpus_info: dict, file_mapping: List[str], predictions_list: List[np.ndarray],
-                           time_stamps_list: List[np.ndarray], corpus: str,
-                           ) -> List[np.ndarray]:
+def extract_vowel_segments(corpus_info: Union[dict, CorpusInfo], file_mapping: List[str],
+                           predictions_list: List[np.ndarray], time_stamps_list: List[np.ndarray], corpus: str,
+                           window_shift: Optional[int] = None,
+                           segment_index_path: Optional[Union[str, pathlib.Path]] = None) -> List[np.ndarray]:
+    # With window_shift, the time stamps are those of get_time_stamps_grid and the segment index is used (loaded from
+    # segment_index_path if given)
     if corpus == 'ivc':
         vowel_segments = predictions_list
-    else:  # oc and hc (/cvc/ contexts)
-        vowel_segments = _get_vowel_segments(predictions_list, time_stamps_list, file_mapping, corpus_info)
+    elif window_shift is None:  # oc and hc (/cvc/ contexts)
+        vowel_segments = _get_vowel_segments(predictions_list, time_stamps_list, file_mapping,
+                                             as_corpus_info(corpus_info))
+    else:
+        if segment_index_path:
+            starts, ends = load_segment_index(corpus_info, file_mapping, window_shift, segment_index_path)
+        else:
+            starts, ends = get_segment_index(corpus_info, file_mapping, window_shift)
+        vowel_segments = [prediction[start:end] for prediction, start, end in
+                          zip(predictions_list, starts.tolist(), ends.tolist())]
 
     return vowel_segments
-
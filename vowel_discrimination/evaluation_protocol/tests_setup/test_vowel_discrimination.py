@@ -1,6 +1,12 @@
 """
     This script runs the test for vowel discrimination task, calculating meta-analysis statistics.
 
+    With `fused_inference` (model per feature type), the predictions of the model are calculated batch by batch and only
+    the segments of the trials used by the test are kept (no predictions file is written or read).
+
+    With `vowels_segments`, the distances are calculated between the vowel segments of the trials instead of the whole
+    CVC contexts. The segment index (frames of the vowel of each trial) can be saved in `segment_index_path` and reused.
+
     @date 28.05.2021
 """
 
@@ -11,14 +17,17 @@ import argparse
 import csv
 import json
 import pathlib
-import pickle
 from typing import Union, List, Optional, Tuple
 
-from evaluation_protocol.io_module.preprocess_distances_files import read_distances_csv_file
+from corpus_processing.corpus_info_store import load_corpus_info
+from evaluation_protocol.io_module.preprocess_distances_files import read_distances_file
 from evaluation_protocol.io_module.read_predictions_and_features import read_input_features, \
     get_predictions_and_time_stamps
 from evaluation_protocol.tests_setup.calculate_dtw_distances import calculate_dtw_distances
 from evaluation_protocol.tests_setup.calculate_meta_analysis_statistics import get_meta_analysis_statistics
+from evaluation_protocol.tests_setup.create_tests_conditions import get_candidate_trials
+from evaluation_protocol.tests_setup.distance_backends import DEFAULT_METRIC, DISTANCE_BACKENDS
+from metaeval_core.instrumentation import RunReport, stage
 
 BASIC_OC_CONTRASTS = [('a', 'a:')]
 BASIC_HC_CONTRASTS = [('A', 'i'), ('i', 'I'), ('A', 'E'), ('e', 'E'), ('A', '{')]
@@ -38,19 +47,33 @@ def _run_basic_vowel_discrimination_test(corpus_info_path: Union[str, pathlib.Pa
                                          dtw_distances_csv_file: Union[str, pathlib.Path],
                                          window_shift: Optional[int] = 10,
                                          contrasts: Optional[List[Tuple[str, str]]] = None,
-                                         contrasts_languages: Optional[List[Tuple[str, str]]] = None) -> \
+                                         contrasts_languages: Optional[List[Tuple[str, str]]] = None,
+                                         sampling: Optional[dict] = None,
+                                         metric: Optional[str] = DEFAULT_METRIC,
+                                         distance_matrix_path: Optional[Union[str, pathlib.Path]] = None,
+                                         fused_inference: Optional[dict] = None,
+                                         vowels_segments: Optional[bool] = False,
+                                         segment_index_path: Optional[Union[str, pathlib.Path]] = None) -> \
         List[List[Union[str, int, float]]]:
     # load corpus info
-    with open(corpus_info_path, 'rb') as corpus_info_file:
-        corpus_info = pickle.load(corpus_info_file)
+    with stage('load_corpus_info') as record:
+        corpus_info = load_corpus_info(corpus_info_path)
+        record['trials'] = len(corpus_info)
     # load file_mapping & indices
-    input_feats, file_mapping, indices = read_input_features(input_features_path)
-    if feature_type == 'mfcc':
-        predictions_list, time_stamps_list = get_predictions_and_time_stamps('', indices, predictions=input_feats,
-                                                                             window_shift=window_shift)
-    else:  # apc and cpc
-        predictions_list, time_stamps_list = get_predictions_and_time_stamps(predictions_path, indices,
-                                                                             window_shift=window_shift)
+    with stage('read_features') as record:
+        input_feats, file_mapping, indices = read_input_features(input_features_path)
+        record['frames'] = int(indices.shape[0] * indices.shape[1])
+    with stage('segment') as record:
+        if fused_inference:  # the predictions are calculated with the distances
+            predictions_list, time_stamps_list = [], []
+        elif feature_type == 'mfcc':
+            predictions_list, time_stamps_list = get_predictions_and_time_stamps('', indices, predictions=input_feats,
+                                                                                 window_shift=window_shift)
+        else:  # apc and cpc
+            predictions_list, time_stamps_list = get_predictions_and_time_stamps(predictions_path, indices,
+                                                                                 window_shift=window_shift)
+        record['trials'] = len(predictions_list)
+        record['frames'] = sum(len(prediction) for prediction in predictions_list)
 
     if contrasts is None and contrasts_languages is None:
         if corpus == 'ivc':
@@ -63,17 +86,49 @@ def _run_basic_vowel_discrimination_test(corpus_info_path: Union[str, pathlib.Pa
             contrasts = BASIC_OC_CONTRASTS
             contrasts_languages = BASIC_OC_CONTRASTS_LANGUAGES
 
+    distances = None
     if pathlib.Path(dtw_distances_csv_file).is_file():  # DTW distances are calculated
-        same_distances, different_distances, contrasts, contrasts_languages = read_distances_csv_file(
-            dtw_distances_csv_file)
+        with stage('read_distances') as record:
+            *distances, distances_metric = read_distances_file(dtw_distances_csv_file)
+            record['pairs'] = sum(len(values) for values in distances[0] + distances[1])
+        if distances_metric != metric:  # the distances are calculated again with the metric of the test
+            print(f'Distances of {dtw_distances_csv_file} were calculated with {distances_metric}, not {metric}')
+            distances = None
+    if distances is not None:
+        same_distances, different_distances, contrasts, contrasts_languages = distances
     else:
+        if fused_inference:
+            # Lazy import, only the fused mode needs TensorFlow
+            from pc_predictions_calculation.fused_inference import calculate_fused_segments
+            with stage('fused_inference') as record:
+                languages = sorted(set(language for languages in contrasts_languages for language in languages)) \
+                    if corpus == 'ivc' and contrasts_languages else None
+                trial_ids = get_candidate_trials(corpus_info, file_mapping, corpus, BASIC_FILTERS, languages)
+                # The vowel segments are taken from the batches (IVC trials are isolated vowels)
+                segments_window_shift = window_shift if vowels_segments and corpus != 'ivc' else None
+                predictions_list = calculate_fused_segments(fused_inference['model_path'], feature_type, input_feats,
+                                                            indices, file_mapping, trial_ids, corpus_info,
+                                                            segments_window_shift,
+                                                            batch_size=fused_inference['batch_size'],
+                                                            latents_path=fused_inference['latents_path'],
+                                                            segment_index_path=segment_index_path)
+                record['trials'] = len(trial_ids)
+                record['frames'] = sum(len(prediction) for prediction in predictions_list)
+        # The fused predictions are already the segments of the trials
+        segment_predictions = vowels_segments and not fused_inference
         same_distances, different_distances = calculate_dtw_distances(corpus_info, file_mapping, predictions_list,
                                                                       time_stamps_list, contrasts, BASIC_FILTERS,
                                                                       corpus, contrasts_languages=contrasts_languages,
-                                                                      output_file_path=dtw_distances_csv_file)
+                                                                      output_file_path=dtw_distances_csv_file,
+                                                                      vowels_segments=segment_predictions,
+                                                                      sampling=sampling, window_shift=window_shift,
+                                                                      segment_index_path=segment_index_path,
+                                                                      metric=metric,
+                                                                      distance_matrix_path=distance_matrix_path)
 
     # Calculate statistics and output lists of statistics per contrast
-    statistics = get_meta_analysis_statistics(same_distances, different_distances)
+    with stage('statistics', contrasts=len(contrasts)):
+        statistics = get_meta_analysis_statistics(same_distances, different_distances)
 
     output_lists = []
     for idx, contrast in enumerate(contrasts):
@@ -92,9 +147,19 @@ def run_full_basic_test(corpus_info_path: Union[str, pathlib.Path],
                         window_shift: Optional[int] = 10,
                         contrasts: Optional[List[Tuple[str, str]]] = None,
                         contrasts_languages: Optional[List[Tuple[str, str]]] = None,
-                        feature_types: Optional[List[str]] = None) -> None:
+                        feature_types: Optional[List[str]] = None,
+                        sampling: Optional[dict] = None,
+                        metric: Optional[str] = DEFAULT_METRIC,
+                        distance_matrix_paths: Optional[dict] = None,
+                        fused_inference: Optional[dict] = None,
+                        vowels_segments: Optional[bool] = False,
+                        segment_index_path: Optional[Union[str, pathlib.Path]] = None) -> None:
     if feature_types is None:
         feature_types = ['mfcc', 'apc', 'cpc']
+    if distance_matrix_paths is None:
+        distance_matrix_paths = {}
+    if fused_inference is None:
+        fused_inference = {}
 
     assert set(dtw_distances_csv_files.keys()).issubset(set(feature_types)) or \
            set(feature_types).issubset(set(dtw_distances_csv_files.keys()))
@@ -106,17 +171,24 @@ def run_full_basic_test(corpus_info_path: Union[str, pathlib.Path],
         predictions_path = predictions_path.replace('apc_', f'{feature_type}_')
         predictions_path = predictions_path.replace('cpc_', f'{feature_type}_')
         predictions_path = predictions_path.replace('mfcc_', f'{feature_type}_')
-        rows += _run_basic_vowel_discrimination_test(corpus_info_path, input_features_path, predictions_path, corpus,
-                                                     feature_type, dtw_distances_csv_files[feature_type],
-                                                     window_shift=window_shift, contrasts=contrasts,
-                                                     contrasts_languages=contrasts_languages)
+        with stage(feature_type):
+            rows += _run_basic_vowel_discrimination_test(corpus_info_path, input_features_path, predictions_path,
+                                                         corpus, feature_type, dtw_distances_csv_files[feature_type],
+                                                         window_shift=window_shift, contrasts=contrasts,
+                                                         contrasts_languages=contrasts_languages, sampling=sampling,
+                                                         metric=metric,
+                                                         distance_matrix_path=distance_matrix_paths.get(feature_type),
+                                                         fused_inference=fused_inference.get(feature_type),
+                                                         vowels_segments=vowels_segments,
+                                                         segment_index_path=segment_index_path)
 
     # write csv file
-    pathlib.Path(output_csv_file).parent.mkdir(parents=True, exist_ok=True)
+    with stage('write_results', rows=len(rows) - 1):
+        pathlib.Path(output_csv_file).parent.mkdir(parents=True, exist_ok=True)
 
-    with open(output_csv_file, 'w', newline='') as csv_file:
-        writer = csv.writer(csv_file, delimiter=';')
-        writer.writerows(rows)
+        with open(output_csv_file, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file, delimiter=';')
+            writer.writerows(rows)
 
 
 def read_config_file(file_path: Union[str, pathlib.Path]):
@@ -141,6 +213,48 @@ def read_config_file(file_path: Union[str, pathlib.Path]):
     else:
         config['window_shift'] = None
 
+    if 'sampling' in entries and config['sampling'] is not None:
+        assert isinstance(config['sampling'], dict)
+    else:
+        config['sampling'] = None
+
+    if 'metric' in entries and config['metric'] is not None:
+        assert config['metric'] in DISTANCE_BACKENDS
+    else:
+        config['metric'] = DEFAULT_METRIC
+
+    if 'distance_matrix_paths' in entries and config['distance_matrix_paths'] is not None:
+        assert isinstance(config['distance_matrix_paths'], dict)
+    else:
+        config['distance_matrix_paths'] = None
+
+    if 'fused_inference' in entries and config['fused_inference'] is not None:
+        assert isinstance(config['fused_inference'], dict)
+        for feature_type, fused_inference in config['fused_inference'].items():
+            assert feature_type in ['apc', 'cpc'] and 'model_path' in fused_inference
+            fused_inference.setdefault('batch_size', 256)
+            fused_inference.setdefault('latents_path', None)
+    else:
+        config['fused_inference'] = None
+
+    if 'vowels_segments' in entries and config['vowels_segments'] is not None:
+        assert isinstance(config['vowels_segments'], bool)
+    else:
+        config['vowels_segments'] = False
+
+    if 'segment_index_path' in entries and config['segment_index_path'] is not None:
+        assert isinstance(config['segment_index_path'], str)
+    else:
+        config['segment_index_path'] = None
+
+    if 'report_path' not in entries or config['report_path'] is None:
+        # The run report is saved next to the output csv file by default
+        output_csv_path = pathlib.Path(config['output_csv_path'])
+        config['report_path'] = str(output_csv_path.with_name(f'{output_csv_path.stem}_run_report.json'))
+
+    if 'profile_folder' not in entries:
+        config['profile_folder'] = None
+
     return config
 
 
@@ -164,18 +278,25 @@ if __name__ == '__main__':
     if 'feature_types' in config and config['feature_types'] is not None:
         feature_types = config['feature_types']
 
-    if config['type'] in ['basic', 'basic_non_native']:
-        if config['window_shift']:
-            run_full_basic_test(config['corpus_info_path'], config['input_features_path'], config['predictions_path'],
-                                config['corpus'], config['dtw_distances_csv_files'], config['output_csv_path'],
-                                window_shift=config['window_shift'], contrasts=contrasts,
-                                contrasts_languages=contrasts_languages, feature_types=feature_types)
-        else:
-            run_full_basic_test(config['corpus_info_path'], config['input_features_path'], config['predictions_path'],
-                                config['corpus'], config['dtw_distances_csv_files'], config['output_csv_path'],
-                                contrasts=contrasts, contrasts_languages=contrasts_languages,
-                                feature_types=feature_types)
-
-
-
-
+    with RunReport('test_vowel_discrimination', config['report_path'], config['profile_folder']):
+        if config['type'] in ['basic', 'basic_non_native']:
+            if config['window_shift']:
+                run_full_basic_test(config['corpus_info_path'], config['input_features_path'],
+                                    config['predictions_path'], config['corpus'], config['dtw_distances_csv_files'],
+                                    config['output_csv_path'], window_shift=config['window_shift'],
+                                    contrasts=contrasts, contrasts_languages=contrasts_languages,
+                                    feature_types=feature_types, sampling=config['sampling'],
+                                    metric=config['metric'], distance_matrix_paths=config['distance_matrix_paths'],
+                                    fused_inference=config['fused_inference'],
+                                    vowels_segments=config['vowels_segments'],
+                                    segment_index_path=config['segment_index_path'])
+            else:
+                run_full_basic_test(config['corpus_info_path'], config['input_features_path'],
+                                    config['predictions_path'], config['corpus'], config['dtw_distances_csv_files'],
+                                    config['output_csv_path'], contrasts=contrasts,
+                                    contrasts_languages=contrasts_languages, feature_types=feature_types,
+                                    sampling=config['sampling'], metric=config['metric'],
+                                    distance_matrix_paths=config['distance_matrix_paths'],
+                                    fused_inference=config['fused_inference'],
+                                    vowels_segments=config['vowels_segments'],
+                                    segment_index_path=config['segment_index_path'])
@@ -3,7 +3,7 @@
 """
 
 __docformat__ = ['reStructuredText']
-__all__ = ['create_pc_predictions_file']
+__all__ = ['create_pc_predictions_file', 'load_pc_predictor']
 
 import argparse
 import pathlib
@@ -17,8 +17,8 @@ from evaluation_protocol.io_module.read_predictions_and_features import read_inp
 from pc_predictions_calculation.cpc_utils import FeatureEncoder, ContrastiveLoss
 
 
-def create_pc_predictions_file(model_path: Union[str, pathlib.Path], input_feats: np.ndarray,
-                               output_path: Union[str, pathlib.Path], model_type: Optional[str] = 'cpc') -> None:
+def load_pc_predictor(model_path: Union[str, pathlib.Path], model_type: Optional[str] = 'cpc') -> Model:
+    # Model from the input features to the latent representations
     import tensorflow as tf
     physical_devices = tf.config.list_physical_devices('GPU')
     for physical_device in physical_devices:
@@ -34,7 +34,12 @@ def create_pc_predictions_file(model_path: Union[str, pathlib.Path], input_feats
 
     input_layer = model.get_layer('input_layer').output
 
-    predictor = Model(input_layer, latent_layer)
+    return Model(input_layer, latent_layer)
+
+
+def create_pc_predictions_file(model_path: Union[str, pathlib.Path], input_feats: np.ndarray,
+                               output_path: Union[str, pathlib.Path], model_type: Optional[str] = 'cpc') -> None:
+    predictor = load_pc_predictor(model_path, model_type)
 
     latents = predictor.predict(input_feats)
 
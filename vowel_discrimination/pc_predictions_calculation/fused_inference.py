@@ -0,0 +1,97 @@
+"""
+    Fused inference for the vowel discrimination test: the model predicts the input features batch by batch and the
+    frames of the segments used by the test (whole trials or vowel segments, with the segment index) are copied from
+    each output batch, so the latents of the whole corpus are never kept in memory nor written and read back. The
+    latents can optionally be saved (same `latents` dataset as calculate_pc_predictions), written batch by batch.
+
+    @date 19.10.2026
+"""
+
+__docformat__ = ['reStructuredText']
+__all__ = ['get_segments_ranges', 'calculate_segments_in_batches', 'calculate_fused_segments']
+
+import pathlib
+from typing import Union, Optional, List, Callable
+
+import h5py
+import numpy as np
+
+from corpus_processing.corpus_info_store import CorpusInfo, as_corpus_info
+from evaluation_protocol.tests_setup.extract_vowel_segments import get_segment_index, load_segment_index
+from metaeval_core.h5_io import get_trials_boundaries
+
+DEFAULT_BATCH_SIZE = 256
+
+
+def get_segments_ranges(indices: np.ndarray, file_mapping: List[str], trial_ids: np.ndarray,
+                        corpus_info: Optional[Union[dict, CorpusInfo]] = None,
+                        window_shift: Optional[int] = None,
+                        segment_index_path: Optional[Union[str, pathlib.Path]] = None) -> np.ndarray:
+    # [start, end) of the segment of each trial of the file mapping in the frames of all the samples (flattened), empty
+    # for the trials not in trial_ids. With window_shift, the vowel segments of the segment index are used (loaded from
+    # segment_index_path if given).
+    starts, ends = get_trials_boundaries(indices)
+    assert len(starts) == len(file_mapping), 'Trials of the indices do not match the file mapping'
+    if window_shift is not None:
+        if segment_index_path:
+            segment_starts, segment_ends = load_segment_index(as_corpus_info(corpus_info), file_mapping, window_shift,
+                                                              segment_index_path)
+        else:
+            segment_starts, segment_ends = get_segment_index(as_corpus_info(corpus_info), file_mapping, window_shift)
+        # Slicing clips the segment to the frames of the trial
+        segment_starts = starts + np.minimum(segment_starts, ends - starts)
+        segment_ends = starts + np.minimum(segment_ends, ends - starts)
+        starts, ends = segment_starts, np.maximum(segment_ends, segment_starts)
+
+    ranges = np.zeros((len(file_mapping), 2), dtype=np.int64)
+    ranges[trial_ids] = np.stack((starts, ends), axis=1)[trial_ids]
+    return ranges
+
+
+def calculate_segments_in_batches(predict_batch: Callable[[np.ndarray], np.ndarray], input_feats: np.ndarray,
+                                  ranges: np.ndarray, batch_size: Optional[int] = DEFAULT_BATCH_SIZE,
+                                  latents_path: Optional[Union[str, pathlib.Path]] = None) -> List[np.ndarray]:
+    # predict_batch maps a batch of samples (batch, sample_length, features) into (batch, sample_length, latent_dim)
+    n_samples, sample_length = input_feats.shape[:2]
+    segments = None
+    latents_file = None
+    try:
+        for batch_start in range(0, n_samples, batch_size):
+            latents = np.asarray(predict_batch(input_feats[batch_start:batch_start + batch_size]))
+            if segments is None:
+                segments = [np.zeros((end - start, latents.shape[-1]), dtype=np.float32) for start, end in
+                            ranges.tolist()]
+                if latents_path:
+                    pathlib.Path(latents_path).parent.mkdir(parents=True, exist_ok=True)
+                    latents_file = h5py.File(latents_path, 'w')
+                    latents_file.create_dataset('latents', shape=(n_samples,) + latents.shape[1:],
+                                                dtype=latents.dtype)
+            if latents_file is not None:
+                latents_file['latents'][batch_start:batch_start + len(latents)] = latents
+
+            frames = latents.reshape(-1, latents.shape[-1])
+            first_frame = batch_start * sample_length
+            last_frame = first_frame + len(frames)
+            # Segments (or their parts) in the frames of the batch
+            for trial in np.flatnonzero((ranges[:, 0] < last_frame) & (ranges[:, 1] > first_frame)).tolist():
+                start, end = ranges[trial].tolist()
+                overlap_start, overlap_end = max(start, first_frame), min(end, last_frame)
+                segments[trial][overlap_start - start:overlap_end - start] = \
+                    frames[overlap_start - first_frame:overlap_end - first_frame]
+    finally:
+        if latents_file is not None:
+            latents_file.close()
+    return segments if segments is not None else [np.zeros((0, 0), dtype=np.float32) for _ in ranges]
+
+
+def calculate_fused_segments(model_path: Union[str, pathlib.Path], model_type: str, input_feats: np.ndarray,
+                             indices: np.ndarray, file_mapping: List[str], trial_ids: np.ndarray,
+                             corpus_info: Optional[Union[dict, CorpusInfo]] = None,
+                             window_shift: Optional[int] = None, batch_size: Optional[int] = DEFAULT_BATCH_SIZE,
+                             latents_path: Optional[Union[str, pathlib.Path]] = None,
+                             segment_index_path: Optional[Union[str, pathlib.Path]] = None) -> List[np.ndarray]:
+    # TensorFlow is only imported here
+    from pc_predictions_calculation.calculate_pc_predictions import load_pc_predictor
+    predictor = load_pc_predictor(model_path, model_type)
+    ranges = get_segments_ranges(indices, file_mapping, trial_ids, corpus_info, window_shift, segment_index_path)
+    return calculate_segments_in_batches(predictor.predict_on_batch, input_feats, ranges, batch_size, latents_path)